@@ -1,81 +1,49 @@
-from main import main as face_recognition_main
+from main import main as face_recognition_main, match_face, identity_cache
 from flask import Flask, request, jsonify, render_template, Response
 from flask_cors import CORS, cross_origin
 import os
+import threading
 import cv2
 import numpy as np
-import pytesseract
-from deepface import DeepFace
-from numpy import dot
-from numpy.linalg import norm
+
+from face_recognition_utils import load_known_faces
+from live_recognition import LiveRecognizer, annotate
+from metrics import CONTENT_TYPE, render, timed
+from model_registry import is_warm, warm_up
+from ocr_engine import default_engine
 
 # ---------------- INITIAL SETUP ---------------- #
 app = Flask(__name__)
 CORS(app)
 
-UPLOAD_FOLDER = 'uploads'
-if not os.path.exists(UPLOAD_FOLDER):
-    os.makedirs(UPLOAD_FOLDER)
-
-# Configure Tesseract
-pytesseract.pytesseract.tesseract_cmd = "/usr/local/bin/tesseract"
+# Configure Tesseract (applied when OCR first runs, see ocr_engine.py)
+os.environ.setdefault("TESSERACT_CMD", "/usr/local/bin/tesseract")
 os.environ["TESSDATA_PREFIX"] = "/Users/admin/Downloads/MLBASEDATTENDANCESYSTEMOCRIDFEATURE/tessdata"
 
 
-# ---------------- HELPER FUNCTIONS ---------------- #
-def cosine_distance(a, b):
-    """Compute cosine distance between two embeddings"""
-    return 1 - dot(a, b) / (norm(a) * norm(b))
-
-def load_known_faces(folder="known_faces", model_name="Facenet512"):
-    """Load all images from known_faces folder and store embeddings"""
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    folder_path = os.path.join(base_dir, folder)
-    face_db = {}
-
-    if not os.path.isdir(folder_path):
-        print(f"❌ Folder not found: {folder_path}")
-        return face_db
-
-    for filename in os.listdir(folder_path):
-        filepath = os.path.join(folder_path, filename)
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            try:
-                embedding = DeepFace.represent(
-                    img_path=filepath,
-                    model_name=model_name,
-                    detector_backend="opencv",
-                    enforce_detection=False
-                )[0]["embedding"]
-                face_db[filename] = embedding
-                print(f"✅ Loaded: {filename}")
-            except Exception as e:
-                print(f"⚠️ Error loading {filename}: {e}")
-    return face_db
-
-
-def match_face(frame, known_faces, model_name="Facenet512", threshold=0.35):
-    """Compare live webcam frame with stored embeddings"""
+# ---------------- KNOWN FACES ---------------- #
+# Known faces are loaded and the shared model warmed on a background thread,
+# so the app imports straight away and /ready answers 503 until both are done.
+# A failure is kept in face_startup_error instead of leaving waiters blocked
+known_faces = None
+known_faces_loaded = threading.Event()
+face_startup_error = None
+
+
+def load_face_services():
+    global known_faces, face_startup_error
     try:
-        cv2.imwrite("temp.jpg", frame)
-        live_embedding = DeepFace.represent(
-            img_path="temp.jpg",
-            model_name=model_name,
-            detector_backend="opencv",
-            enforce_detection=False
-        )[0]["embedding"]
-
-        for name, stored_embedding in known_faces.items():
-            distance = cosine_distance(live_embedding, stored_embedding)
-            if distance < threshold:
-                return f"✅ Match Found: {name.split('.')[0]}"
-        return "❌ No Match Found"
+        known_faces = load_known_faces()
+        known_faces_loaded.set()
+        warm_up()
     except Exception as e:
-        return f"⚠️ Error during face match: {e}"
+        face_startup_error = f"{type(e).__name__}: {e}"
+        print(f"❌ Face services failed to start: {face_startup_error}")
+    finally:
+        known_faces_loaded.set()
 
 
-# Load known faces once at startup
-known_faces = load_known_faces()
+threading.Thread(target=load_face_services, name="face-startup", daemon=True).start()
 
 
 # ---------------- ROUTE: HOME ---------------- #
@@ -84,30 +52,61 @@ def home():
     return "🚀 Flask is running with both Face Recognition and OCR!"
 
 
+@app.route("/ready")
+def ready():
+    """Readiness probe for the load balancer"""
+    if face_startup_error:
+        return jsonify({"ready": False, "error": face_startup_error}), 503
+    if not (known_faces_loaded.is_set() and is_warm()):
+        return jsonify({"ready": False}), 503
+    return jsonify({"ready": True})
+
+
 # ---------------- ROUTE: FACE RECOGNITION ---------------- #
 def gen_frames():
     """Generate webcam frames for live feed"""
     cap = cv2.VideoCapture(0)
-    while True:
-        success, frame = cap.read()
-        if not success:
-            break
-        else:
-            result = match_face(frame, known_faces)
-            cv2.putText(frame, result, (30, 40),
-                        cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
-            ret, buffer = cv2.imencode('.jpg', frame)
-            frame = buffer.tobytes()
-            yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    # Frames stream at camera rate; recognition runs in the background
+    live = LiveRecognizer.from_env(
+        lambda face, track_id: match_face(face, known_faces, track_id=track_id)
+    )
+    try:
+        while True:
+            success, frame = cap.read()
+            if not success:
+                break
+            else:
+                annotate(frame, live.process(frame))
+                ret, buffer = cv2.imencode('.jpg', frame)
+                frame = buffer.tobytes()
+                yield (b'--frame\r\n'
+                       b'Content-Type: image/jpeg\r\n\r\n' + frame + b'\r\n')
+    finally:
+        live.close()
+        cap.release()
 
 
 @app.route('/face_feed')
 def face_feed():
     """Route for webcam feed"""
+    known_faces_loaded.wait()
+    if known_faces is None:
+        return jsonify({"error": f"face services failed to start: {face_startup_error}"}), 503
     return Response(gen_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
 
 
+@app.route('/identity_cache')
+def identity_cache_stats():
+    """Hit/miss counters of the recognition cache"""
+    return jsonify(identity_cache.stats())
+
+
+@app.route('/metrics')
+def prometheus_metrics():
+    """Stage latency histograms and outcome counters (Prometheus text format)"""
+    return Response(render(), content_type=CONTENT_TYPE)
+
+
 @app.route('/face_recognition')
 def face_recognition_page():
     """Face recognition webpage"""
@@ -134,23 +133,17 @@ def upload_and_process_image():
     if file.filename == '':
         return jsonify({'error': 'No selected file'}), 400
 
-    file_path = os.path.join(UPLOAD_FOLDER, file.filename)
-    file.save(file_path)
-
-    image = cv2.imread(file_path, cv2.IMREAD_GRAYSCALE)
+    # Decode in memory instead of saving to uploads/ and reading it back
+    image = cv2.imdecode(np.frombuffer(file.read(), np.uint8), cv2.IMREAD_GRAYSCALE)
     if image is None:
         return jsonify({'error': 'Failed to read image'}), 500
 
-    processed_img = cv2.adaptiveThreshold(
-        image, 255,
-        cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-        cv2.THRESH_BINARY, 11, 2)
-
-    custom_config = r'--oem 3 --psm 6'
-    text = pytesseract.image_to_string(processed_img, config=custom_config, lang='eng')
+    # Text lines are cropped and OCR'd in parallel (see ocr_engine.py)
+    with timed("ocr"):
+        text, details = default_engine().read(image)
 
     print(f"[OCR TEXT]:\n{text}")
-    return jsonify({'text': text})
+    return jsonify({'text': text, 'ocr': details})
 
 
 # ---------------- MAIN ---------------- #
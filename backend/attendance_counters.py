@@ -0,0 +1,244 @@
+import argparse
+import asyncio
+import os
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from attendance_stats import ON_TIME, is_on_time, summarize_counts
+from attendance_writer import DUPLICATE_KEY
+
+ALL = "all"
+CLASS = "class"
+
+# Markers only guard the unique-student count of recent days; the rebuild
+# command recomputes anything older
+MARKER_TTL_DAYS = int(os.environ.get("ATTENDANCE_MARKER_TTL_DAYS", 30))
+
+
+def _day(timestamp):
+    if isinstance(timestamp, str):
+        timestamp = datetime.fromisoformat(timestamp)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone(timezone.utc)
+    return timestamp.date().isoformat()
+
+
+def _scopes(doc):
+    """The counter rows a record contributes to: the whole day and its class."""
+    return [(ALL, None), (CLASS, doc.get("class_name"))]
+
+
+def _counter_id(day, scope, class_name):
+    return f"{day}|{scope}|{class_name or ''}"
+
+
+class AttendanceCounters:
+    """Per-day (and per-day, per-class) attendance totals kept up to date on write.
+
+    ``attendance_daily`` holds one document per day and scope with
+    ``present``, ``on_time``, ``late`` and ``unique_students`` counters,
+    bumped with ``$inc`` after every flushed batch. Unique students are
+    tracked with one marker document per (day, scope, class, student) in
+    ``attendance_daily_students``; a student only counts when their marker
+    is new.
+    """
+
+    def __init__(self, db):
+        self.records = db.attendance_records
+        self.counters = db.attendance_daily
+        self.markers = db.attendance_daily_students
+
+    async def ensure_indexes(self):
+        await self.counters.create_index([("day", 1), ("scope", 1)])
+        await self.markers.create_index("created_at", expireAfterSeconds=MARKER_TTL_DAYS * 86400)
+
+    async def _new_markers(self, markers):
+        """Insert markers; returns the (day, scope, class) of each one that was new."""
+        if not markers:
+            return []
+        try:
+            await self.markers.insert_many(markers, ordered=False)
+            duplicates = set()
+        except BulkWriteError as e:
+            duplicates = {
+                error["index"] for error in e.details.get("writeErrors", [])
+                if error.get("code") == DUPLICATE_KEY
+            }
+        return [
+            (marker["day"], marker["scope"], marker["class_name"])
+            for i, marker in enumerate(markers) if i not in duplicates
+        ]
+
+    async def apply(self, docs):
+        """Fold newly inserted attendance records into the counters."""
+        if not docs:
+            return
+        increments = defaultdict(lambda: {"present": 0, "on_time": 0, "late": 0, "unique_students": 0})
+        markers = {}
+        now = datetime.now(timezone.utc)
+        for doc in docs:
+            day = _day(doc["timestamp"])
+            on_time = 1 if is_on_time(doc) else 0
+            for scope, class_name in _scopes(doc):
+                counts = increments[(day, scope, class_name)]
+                counts["present"] += 1
+                counts["on_time"] += on_time
+                counts["late"] += 1 - on_time
+                marker_id = _counter_id(day, scope, class_name) + "|" + doc["student_name"]
+                markers[marker_id] = {
+                    "_id": marker_id, "day": day, "scope": scope,
+                    "class_name": class_name, "created_at": now,
+                }
+
+        for key in await self._new_markers(list(markers.values())):
+            increments[key]["unique_students"] += 1
+
+        await self.counters.bulk_write([
+            UpdateOne(
+                {"_id": _counter_id(day, scope, class_name)},
+                {"$inc": counts, "$setOnInsert": {"day": day, "scope": scope, "class_name": class_name}},
+                upsert=True,
+            )
+            for (day, scope, class_name), counts in increments.items()
+        ], ordered=False)
+
+    async def day_stats(self, day, roster, class_name=None, breakdown=None):
+        """Stats for one day read from the counters instead of the raw records.
+
+        ``roster(class_name)`` is an async callable returning the roster size.
+        """
+        day = day.isoformat()
+        if class_name:
+            row = await self.counters.find_one({"_id": _counter_id(day, CLASS, class_name)})
+        else:
+            row = await self.counters.find_one({"_id": _counter_id(day, ALL, None)})
+
+        stats = summarize_counts(row or {}, await roster(class_name))
+        stats["range"] = {"start": day, "end": day}
+        if breakdown == "class":
+            query = {"day": day, "scope": CLASS}
+            if class_name:
+                query["class_name"] = class_name
+            rows = []
+            async for group in self.counters.find(query).sort("class_name", 1):
+                rows.append({"class": group["class_name"], **summarize_counts(group, await roster(group["class_name"]))})
+            stats["breakdown"] = rows
+        return stats
+
+    async def rebuild(self, start=None, end=None):
+        """Recompute the counters and markers of ``start``..``end`` from raw records.
+
+        With no dates every day is rebuilt. Rebuilt values are upserted in
+        place and only counters and markers with nothing left behind them
+        are deleted afterwards, so stats never read an emptied range.
+        Rebuilding the current day races with live check-ins: increments
+        applied while it runs can be overwritten; rebuild today only when
+        the server is idle (or run it again). Returns the number of days
+        rebuilt.
+        """
+        match, day_filter = {}, {}
+        if start:
+            match["$gte"] = datetime.combine(start, datetime.min.time(), tzinfo=timezone.utc)
+            day_filter["$gte"] = start.isoformat()
+        if end:
+            match["$lt"] = datetime.combine(end + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+            day_filter["$lte"] = end.isoformat()
+        query = {"day": day_filter} if day_filter else {}
+        # Counters that existed before the rebuild; those not recomputed are stale
+        previous = {doc["_id"] async for doc in self.counters.find(query, {"_id": 1})}
+
+        pipeline = [
+            {"$match": {"timestamp": match}} if match else {"$match": {}},
+            {"$group": {
+                "_id": {
+                    "day": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}},
+                    "class_name": "$class_name",
+                    "student_name": "$student_name",
+                },
+                "present": {"$sum": 1},
+                "on_time": {"$sum": ON_TIME},
+            }},
+            # Day by day, so only one day's students are held in memory
+            {"$sort": {"_id.day": 1}},
+        ]
+        totals = defaultdict(lambda: {"present": 0, "on_time": 0, "late": 0, "unique_students": 0})
+        students = defaultdict(set)
+        markers = []
+        current_day = None
+        now = datetime.now(timezone.utc)
+        async for group in self.records.aggregate(pipeline, allowDiskUse=True):
+            key = group["_id"]
+            if key["day"] != current_day:
+                current_day = key["day"]
+                students.clear()
+            for scope, class_name in _scopes(key):
+                counts = totals[(key["day"], scope, class_name)]
+                counts["present"] += group["present"]
+                counts["on_time"] += group["on_time"]
+                counts["late"] += group["present"] - group["on_time"]
+                seen = students[(key["day"], scope, class_name)]
+                if key["student_name"] not in seen:
+                    seen.add(key["student_name"])
+                    counts["unique_students"] += 1
+                    markers.append(UpdateOne(
+                        {"_id": _counter_id(key["day"], scope, class_name) + "|" + key["student_name"]},
+                        {"$set": {"day": key["day"], "scope": scope, "class_name": class_name, "created_at": now}},
+                        upsert=True,
+                    ))
+            if len(markers) >= 1000:
+                await self.markers.bulk_write(markers, ordered=False)
+                markers = []
+        if markers:
+            await self.markers.bulk_write(markers, ordered=False)
+
+        if totals:
+            await self.counters.bulk_write([
+                UpdateOne(
+                    {"_id": _counter_id(day, scope, class_name)},
+                    {"$set": {"day": day, "scope": scope, "class_name": class_name, **counts}},
+                    upsert=True,
+                )
+                for (day, scope, class_name), counts in totals.items()
+            ], ordered=False)
+        # Rebuilt markers carry ``now``; live check-ins during the rebuild add newer ones
+        await self.markers.delete_many({**query, "created_at": {"$lt": now}})
+        stale = previous - {_counter_id(day, scope, class_name) for day, scope, class_name in totals}
+        if stale:
+            await self.counters.delete_many({"_id": {"$in": sorted(stale)}})
+        return len({day for day, _, _ in totals})
+
+    async def missing_days(self):
+        """Days that have attendance records but no counters (e.g. recorded before counters existed)."""
+        pipeline = [
+            {"$group": {"_id": {"$dateToString": {"format": "%Y-%m-%d", "date": "$timestamp"}}}},
+            {"$sort": {"_id": 1}},
+        ]
+        recorded = [group["_id"] async for group in self.records.aggregate(pipeline, allowDiskUse=True)]
+        counted = {doc["day"] async for doc in self.counters.find({"scope": ALL}, {"day": 1})}
+        return [day for day in recorded if day and day not in counted]
+
+    async def backfill(self):
+        """Rebuild the counters of every day in ``missing_days``; returns the days rebuilt."""
+        days = await self.missing_days()
+        for day in days:
+            day = datetime.fromisoformat(day).date()
+            await self.rebuild(day, day)
+        return days
+
+if __name__ == "__main__":
+    from datetime import date
+
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Rebuild the daily attendance counters from attendance_records")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to rebuild (YYYY-MM-DD)")
+    opts = parser.parse_args()
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+    database = AsyncIOMotorClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+    days = asyncio.run(AttendanceCounters(database).rebuild(opts.start, opts.end))
+    print(f"✅ Rebuilt attendance counters for {days} day(s)")
@@ -0,0 +1,162 @@
+import argparse
+import asyncio
+import os
+from datetime import datetime, time, timedelta, timezone
+
+BREAKDOWNS = {"class": "$class_name", "student": "$student_name"}
+
+# Punctuality is the record's ``on_time`` when set; records without it
+# (single check-ins and records from before the field) count as on time
+# when ``verified``
+ON_TIME = {"$cond": [{"$eq": [{"$ifNull": ["$on_time", "$verified"]}, True]}, 1, 0]}
+
+
+def is_on_time(doc):
+    """:data:`ON_TIME` for one record already in memory."""
+    on_time = doc.get("on_time")
+    return bool(doc.get("verified") if on_time is None else on_time)
+
+
+def day_range(start=None, end=None):
+    """UTC ``[from, to)`` datetimes covering the days ``start``..``end`` inclusive.
+
+    Both default to today; a single ``start`` means that one day.
+    """
+    start = start or datetime.now(timezone.utc).date()
+    end = end or start
+    if end < start:
+        raise ValueError("end date is before start date")
+    return (
+        datetime.combine(start, time.min, tzinfo=timezone.utc),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc),
+    )
+
+
+def _counts(group_id):
+    return {
+        "$group": {
+            "_id": group_id,
+            "present": {"$sum": 1},
+            "on_time": {"$sum": ON_TIME},
+            "students": {"$addToSet": "$student_name"},
+        }
+    }
+
+
+def stats_pipeline(since, until, class_name=None, student_name=None, breakdown=None):
+    """Aggregation computing the attendance counts inside MongoDB.
+
+    The ``$match`` on ``timestamp`` is served by the timestamp index, so only
+    the documents in range are read; the result is a single document with
+    the totals and, when ``breakdown`` is "class" or "student", one row per
+    group.
+    """
+    match = {"timestamp": {"$gte": since, "$lt": until}}
+    if class_name:
+        match["class_name"] = class_name
+    if student_name:
+        match["student_name"] = student_name
+
+    facets = {"totals": [_counts(None)]}
+    if breakdown:
+        if breakdown not in BREAKDOWNS:
+            raise ValueError(f"Unknown breakdown {breakdown!r}; expected one of {sorted(BREAKDOWNS)}")
+        facets["groups"] = [_counts(BREAKDOWNS[breakdown]), {"$sort": {"_id": 1}}]
+
+    return [
+        {"$match": match},
+        {"$project": {"_id": 0, "student_name": 1, "class_name": 1, "verified": 1, "on_time": 1}},
+        {"$facet": facets},
+    ]
+
+
+def summarize_counts(counts, total_students, days=1):
+    """Dashboard figures from ``present``/``on_time`` counts and a roster size."""
+    present = counts.get("present", 0)
+    on_time = counts.get("on_time", 0)
+    # Over a range every student can be on time once per day
+    expected = total_students * days
+    return {
+        "total_students": total_students,
+        "on_time_percentage": round(on_time / expected * 100, 1) if expected > 0 else 0,
+        "on_time_today": on_time,
+        "late_today": present - on_time,
+        "present_today": present,
+        "unique_students": counts.get("unique_students", len(counts.get("students", []))),
+    }
+
+
+async def roster_size(db, class_name=None, fallback=0):
+    """Number of students on the roster.
+
+    Uses the ``students`` collection when it is populated (optionally per
+    class) and ``fallback`` (the enrolled known faces) otherwise.
+    """
+    if await db.students.estimated_document_count() == 0:
+        return fallback
+    query = {"class_name": class_name} if class_name else {}
+    return await db.students.count_documents(query)
+
+
+async def attendance_stats(db, start=None, end=None, class_name=None, student_name=None,
+                           breakdown=None, enrolled=0):
+    """Attendance statistics for a date range, computed by one aggregation."""
+    since, until = day_range(start, end)
+    days = (until - since).days
+    pipeline = stats_pipeline(since, until, class_name, student_name, breakdown)
+    results = await db.attendance_records.aggregate(pipeline).to_list(1)
+    facets = results[0] if results else {}
+    totals = facets.get("totals") or [{}]
+
+    total_students = 1 if student_name else await roster_size(db, class_name, fallback=enrolled)
+    stats = summarize_counts(totals[0], total_students, days)
+    stats["range"] = {"start": since.date().isoformat(), "end": (until - timedelta(days=1)).date().isoformat()}
+    if breakdown:
+        rows = []
+        for group in facets.get("groups", []):
+            if breakdown == "student":
+                group_total = 1
+            else:
+                group_total = await roster_size(db, group["_id"], fallback=enrolled)
+            rows.append({breakdown: group["_id"], **summarize_counts(group, group_total, days)})
+        stats["breakdown"] = rows
+    return stats
+
+
+# ----------- COLLECTION SETUP ------------
+async def migrate_timestamps(collection):
+    """Convert legacy ISO-string timestamps to native BSON dates in place."""
+    result = await collection.update_many(
+        {"timestamp": {"$type": "string"}},
+        [{"$set": {"timestamp": {"$dateFromString": {"dateString": "$timestamp"}}}}],
+    )
+    return result.modified_count
+
+
+async def ensure_attendance_indexes(collection):
+    await collection.create_index("timestamp")
+    await collection.create_index([("class_name", 1), ("timestamp", 1)])
+    await collection.create_index([("student_name", 1), ("timestamp", 1)])
+    # Retried kiosk requests carry the same key and are rejected as duplicates
+    await collection.create_index(
+        "idempotency_key", unique=True,
+        partialFilterExpression={"idempotency_key": {"$type": "string"}}
+    )
+
+
+async def prepare_attendance_collection(db):
+    migrated = await migrate_timestamps(db.attendance_records)
+    await ensure_attendance_indexes(db.attendance_records)
+    return migrated
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    parser = argparse.ArgumentParser(description="Migrate attendance timestamps and create the stats indexes")
+    parser.parse_args()
+    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".env"))
+    database = AsyncIOMotorClient(os.environ["MONGO_URL"])[os.environ["DB_NAME"]]
+    count = asyncio.run(prepare_attendance_collection(database))
+    print(f"✅ Migrated {count} attendance timestamps; indexes are in place")
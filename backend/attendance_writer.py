@@ -0,0 +1,153 @@
+import asyncio
+import os
+import time
+
+from pymongo.errors import BulkWriteError
+
+from metrics import timed
+
+DUPLICATE_KEY = 11000
+
+
+class WriteBufferFull(Exception):
+    """Raised when the attendance write buffer already holds its maximum backlog."""
+
+    def __init__(self, capacity):
+        super().__init__(f"attendance write buffer is full ({capacity} records pending)")
+        self.capacity = capacity
+
+
+async def insert_records(collection, docs):
+    """Unordered ``insert_many``; returns one outcome per document.
+
+    Each outcome is "inserted", "duplicate" (its idempotency key was already
+    recorded) or the Exception that rejected it. One bad document never
+    blocks the rest of the batch.
+    """
+    if not docs:
+        return []
+    outcomes = ["inserted"] * len(docs)
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as e:
+        for error in e.details.get("writeErrors", []):
+            if error.get("code") == DUPLICATE_KEY:
+                outcomes[error["index"]] = "duplicate"
+            else:
+                outcomes[error["index"]] = Exception(error.get("errmsg", "write failed"))
+    return outcomes
+
+
+class AttendanceWriter:
+    """Coalesce attendance inserts into ``insert_many`` batches.
+
+    ``write`` queues a record and resolves once its batch is stored, so
+    callers still answer only after the write is durable. A batch is
+    flushed when it reaches ``max_batch_size`` records or ``flush_ms`` after
+    its first record arrived, whichever comes first. ``after_insert(docs)``
+    is awaited with the newly inserted records of every batch before its
+    writers are answered; its failures are logged, not raised.
+    """
+
+    def __init__(self, collection, max_batch_size=200, flush_ms=5.0, max_pending=10000, after_insert=None):
+        self.collection = collection
+        self.after_insert = after_insert
+        self.max_batch_size = max(1, max_batch_size)
+        self.flush_interval = flush_ms / 1000.0
+        self.max_pending = max_pending
+        self.flushed_batches = 0
+        self.flushed_records = 0
+        self._queue = None
+        self._collector = None
+        self._flushes = set()
+
+    @classmethod
+    def from_env(cls, collection, after_insert=None):
+        return cls(
+            collection,
+            after_insert=after_insert,
+            max_batch_size=int(os.environ.get("ATTENDANCE_BATCH_MAX_SIZE", 200)),
+            flush_ms=float(os.environ.get("ATTENDANCE_FLUSH_MS", 5)),
+            max_pending=int(os.environ.get("ATTENDANCE_MAX_PENDING", 10000)),
+        )
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        """Stop collecting and flush whatever is still buffered."""
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+        await asyncio.gather(*self._flushes, return_exceptions=True)
+        leftover = []
+        while self._queue is not None and not self._queue.empty():
+            leftover.append(self._queue.get_nowait())
+        if leftover:
+            await self._flush(leftover)
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def write(self, doc):
+        """Buffer one record; returns "inserted" or "duplicate"."""
+        if self._queue is None:
+            raise RuntimeError("AttendanceWriter.start() has not been called")
+        if self._queue.qsize() >= self.max_pending:
+            raise WriteBufferFull(self.max_pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((doc, future))
+        return await future
+
+    async def _collect(self):
+        while True:
+            batch = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = time.perf_counter() + self.flush_interval
+                while len(batch) < self.max_batch_size:
+                    # Drain whatever is already queued before waiting for more
+                    while len(batch) < self.max_batch_size and not self._queue.empty():
+                        batch.append(self._queue.get_nowait())
+                    remaining = deadline - time.perf_counter()
+                    if len(batch) >= self.max_batch_size or remaining <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Hand a half-collected batch back so stop() flushes it
+                for item in batch:
+                    self._queue.put_nowait(item)
+                raise
+            task = asyncio.create_task(self._flush(batch))
+            self._flushes.add(task)
+            task.add_done_callback(self._flushes.discard)
+
+    async def _flush(self, batch):
+        try:
+            with timed("mongo_insert"):
+                outcomes = await insert_records(self.collection, [doc for doc, _ in batch])
+        except Exception as e:
+            outcomes = [e] * len(batch)
+        self.flushed_batches += 1
+        self.flushed_records += len(batch)
+        if self.after_insert is not None:
+            inserted = [doc for (doc, _), outcome in zip(batch, outcomes) if outcome == "inserted"]
+            try:
+                await self.after_insert(inserted)
+            except Exception as e:
+                print(f"⚠️ Post-insert hook failed for {len(inserted)} attendance records: {e}")
+
+        for (_, future), outcome in zip(batch, outcomes):
+            if future.done():
+                continue
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
@@ -0,0 +1,141 @@
+"""Attendance write throughput: per-request insert_one vs the buffered writer.
+
+Drives ``--clients`` concurrent check-in loops against either a real
+MongoDB (``--mongo-url``) or an in-memory mongomock stand-in that models
+network round trips and per-operation server cost (see LatencyCollection).
+
+    python benchmarks/bench_attendance_writes.py --clients 64 --duration 10
+    python benchmarks/bench_attendance_writes.py --mongo-url mongodb://localhost:27017
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+from common import latency_summary
+
+from attendance_writer import AttendanceWriter
+
+
+class LatencyCollection:
+    """Async facade over a mongomock collection that models a MongoDB server.
+
+    Every call pays ``rtt_ms`` of network round trip, plus server time of
+    ``op_ms`` per operation and ``doc_ms`` per document. Server time is
+    spent on one of ``server_threads`` slots, so calls queue once the
+    server is busy.
+    """
+
+    def __init__(self, collection, rtt_ms, op_ms, doc_ms, server_threads):
+        self.collection = collection
+        self.rtt = rtt_ms / 1000.0
+        self.op_cost = op_ms / 1000.0
+        self.doc_cost = doc_ms / 1000.0
+        self.server = asyncio.Semaphore(server_threads)
+
+    async def _round_trip(self, documents):
+        await asyncio.sleep(self.rtt / 2)
+        async with self.server:
+            await asyncio.sleep(self.op_cost + self.doc_cost * documents)
+        await asyncio.sleep(self.rtt / 2)
+
+    async def insert_one(self, doc):
+        await self._round_trip(1)
+        return self.collection.insert_one(doc)
+
+    async def insert_many(self, docs, ordered=True):
+        await self._round_trip(len(docs))
+        return self.collection.insert_many(docs, ordered=ordered)
+
+    async def count_documents(self, query):
+        return self.collection.count_documents(query)
+
+    async def drop(self):
+        self.collection.drop()
+
+
+def open_collection(opts):
+    if opts.mongo_url:
+        from motor.motor_asyncio import AsyncIOMotorClient
+
+        return AsyncIOMotorClient(opts.mongo_url)["attendance_benchmark"]["attendance_records"]
+    import mongomock
+
+    return LatencyCollection(
+        mongomock.MongoClient()["attendance_benchmark"]["attendance_records"],
+        opts.rtt_ms, opts.op_ms, opts.doc_ms, opts.server_threads
+    )
+
+
+def make_record(client_id):
+    return {
+        "id": str(uuid.uuid4()),
+        "student_name": f"student_{client_id}",
+        "verified": True,
+        "timestamp": datetime.now(timezone.utc),
+        "idempotency_key": str(uuid.uuid4()),
+    }
+
+
+async def drive(write, clients, duration):
+    latencies = []
+    stop_at = time.perf_counter() + duration
+
+    async def client(client_id):
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            await write(make_record(client_id))
+            latencies.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {"records_per_s": round(len(latencies) / elapsed, 1), **latency_summary(latencies)}
+
+
+async def run(opts):
+    collection = open_collection(opts)
+    report = []
+
+    await collection.drop()
+    row = {"mode": "insert_one", "clients": opts.clients,
+           **(await drive(collection.insert_one, opts.clients, opts.duration))}
+    print(json.dumps(row))
+    report.append(row)
+
+    for max_batch_size, flush_ms in opts.configs:
+        await collection.drop()
+        writer = AttendanceWriter(collection, max_batch_size, flush_ms, max_pending=opts.clients * 2)
+        writer.start()
+        row = {"mode": "buffered", "max_batch_size": max_batch_size, "flush_ms": flush_ms,
+               "clients": opts.clients, **(await drive(writer.write, opts.clients, opts.duration))}
+        await writer.stop()
+        row["mean_batch_size"] = round(writer.flushed_records / max(writer.flushed_batches, 1), 1)
+        stored = await collection.count_documents({})
+        if stored != writer.flushed_records:
+            raise AssertionError(f"stored {stored} records, flushed {writer.flushed_records}")
+        print(json.dumps(row))
+        report.append(row)
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=64)
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--mongo-url", help="Benchmark against this MongoDB instead of mongomock")
+    parser.add_argument("--rtt-ms", type=float, default=1.0, help="Simulated network round trip (mongomock)")
+    parser.add_argument("--op-ms", type=float, default=0.2, help="Simulated server time per operation (mongomock)")
+    parser.add_argument("--doc-ms", type=float, default=0.01, help="Simulated server time per document (mongomock)")
+    parser.add_argument("--server-threads", type=int, default=4, help="Simulated server concurrency (mongomock)")
+    parser.add_argument("--configs", nargs="+", default=["50:2", "200:5"],
+                        help="max_batch_size:flush_ms pairs for the buffered writer")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    opts = parser.parse_args()
+    opts.configs = [(int(a), float(b)) for a, b in (c.split(":") for c in opts.configs)]
+    results = asyncio.run(run(opts))
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
@@ -0,0 +1,100 @@
+"""Load test of the face embedding micro-batcher: throughput vs p99 latency.
+
+Drives ``EmbeddingBatcher`` with a fixed number of concurrent clients, each
+sending known_faces images back to back, for several (max batch size,
+max wait) settings. ``1:0`` is the unbatched baseline.
+
+    python benchmarks/bench_batching.py --clients 32 --duration 20 --configs 1:0 8:5 16:10
+"""
+import argparse
+import asyncio
+import json
+import os
+import time
+
+import cv2
+
+from common import BACKEND_DIR, latency_summary
+
+from embedding_batcher import EmbeddingBatcher
+from face_recognition_utils import embed_faces, init_embedding_worker
+from inference_pool import create_face_pool
+
+
+def load_payloads(max_side):
+    """known_faces images re-encoded at webcam-like resolution."""
+    folder = os.path.join(BACKEND_DIR, "known_faces")
+    payloads = []
+    for filename in sorted(os.listdir(folder)):
+        if filename.lower().endswith((".jpg", ".jpeg", ".png")):
+            image = cv2.imread(os.path.join(folder, filename))
+            scale = max_side / max(image.shape[:2])
+            if scale < 1:
+                image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+            payloads.append(cv2.imencode(".jpg", image)[1].tobytes())
+    return payloads
+
+
+async def drive(batcher, payloads, clients, duration):
+    latencies, batch_sizes = [], []
+    stop_at = time.perf_counter() + duration
+
+    async def client(offset):
+        i = offset
+        while time.perf_counter() < stop_at:
+            start = time.perf_counter()
+            _, timings = await batcher.embed(payloads[i % len(payloads)])
+            latencies.append(time.perf_counter() - start)
+            batch_sizes.append(timings["batch_size"])
+            i += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(c) for c in range(clients)))
+    elapsed = time.perf_counter() - started
+    return {
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "mean_batch_size": round(sum(batch_sizes) / max(len(batch_sizes), 1), 2),
+        **latency_summary(latencies),
+    }
+
+
+async def run(configs, clients, duration, warmup, max_side):
+    payloads = load_payloads(max_side)
+    pool = create_face_pool(initializer=init_embedding_worker)
+    report = []
+    try:
+        for max_batch_size, max_wait_ms in configs:
+            batcher = EmbeddingBatcher(pool, embed_faces, max_batch_size, max_wait_ms)
+            batcher.start()
+            await drive(batcher, payloads, clients, warmup)
+            row = {
+                "max_batch_size": max_batch_size,
+                "max_wait_ms": max_wait_ms,
+                "clients": clients,
+                **(await drive(batcher, payloads, clients, duration)),
+            }
+            await batcher.stop()
+            print(json.dumps(row))
+            report.append(row)
+    finally:
+        pool.shutdown()
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--warmup", type=float, default=5.0)
+    parser.add_argument("--configs", nargs="+", default=["1:0", "4:5", "8:5", "16:10"],
+                        help="max_batch_size:max_wait_ms pairs")
+    parser.add_argument("--max-side", type=int, default=640, help="Downscale frames to this size")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    opts = parser.parse_args()
+    configs = [(int(a), float(b)) for a, b in (c.split(":") for c in opts.configs)]
+    # Let every client queue without tripping the 503 backpressure
+    os.environ.setdefault("INFERENCE_FACE_QUEUE", str(opts.clients))
+    results = asyncio.run(run(configs, opts.clients, opts.duration, opts.warmup, opts.max_side))
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
@@ -0,0 +1,84 @@
+"""Classroom snapshot throughput: one upload per face vs one multi-face frame.
+
+Builds a class photo by tiling the known_faces portraits into a grid
+(``--repeat`` tiles each student more than once, which also exercises the
+one-face-per-student assignment) and compares, in-process:
+
+  per_face   match_face on every portrait separately (one upload per student)
+  classroom  embed_classroom on the whole frame (all crops embedded in one
+             forward pass) + match_embeddings (one batched search)
+
+    python benchmarks/bench_classroom.py --rounds 3 --repeat 1 2
+"""
+import argparse
+import json
+import math
+import os
+import time
+
+import cv2
+import numpy as np
+
+from common import BACKEND_DIR
+
+from face_recognition_utils import embed_classroom, load_known_faces, match_embeddings, match_face
+from face_store import IMAGE_EXTENSIONS
+from model_registry import warm_up
+
+KNOWN_FACES_DIR = os.path.join(BACKEND_DIR, "known_faces")
+
+
+def class_photo(portraits, tile=400, gap=40):
+    """Tile portraits (BGR) into one grid image on a plain background."""
+    columns = math.ceil(math.sqrt(len(portraits)))
+    rows = math.ceil(len(portraits) / columns)
+    photo = np.full((rows * (tile + gap) + gap, columns * (tile + gap) + gap, 3), 200, np.uint8)
+    for i, portrait in enumerate(portraits):
+        scale = tile / max(portrait.shape[:2])
+        resized = cv2.resize(portrait, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        y = gap + (i // columns) * (tile + gap)
+        x = gap + (i % columns) * (tile + gap)
+        photo[y:y + resized.shape[0], x:x + resized.shape[1]] = resized
+    return photo
+
+
+def per_face(portraits, index):
+    results = [match_face(cv2.imencode(".jpg", p)[1].tobytes(), index) for p in portraits]
+    return sum(bool(r.get("success")) for r in results), len(results)
+
+
+def classroom(photo_bytes, index):
+    faces, embeddings = embed_classroom(photo_bytes)
+    results = match_embeddings(embeddings, index)
+    return sum(r["success"] for r in results), len(faces)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--repeat", type=int, nargs="+", default=[1, 2],
+                        help="Times each student appears in the class photo")
+    opts = parser.parse_args()
+
+    index = load_known_faces(KNOWN_FACES_DIR)
+    warm_up()
+    students = [
+        cv2.imread(os.path.join(KNOWN_FACES_DIR, f))
+        for f in sorted(os.listdir(KNOWN_FACES_DIR)) if f.lower().endswith(IMAGE_EXTENSIONS)
+    ]
+    for repeat in opts.repeat:
+        portraits = students * repeat
+        photo = cv2.imencode(".jpg", class_photo(portraits), [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+        for mode, run in (("per_face", lambda: per_face(portraits, index)),
+                          ("classroom", lambda: classroom(photo, index))):
+            run()  # warm up
+            durations = []
+            for _ in range(opts.rounds):
+                started = time.perf_counter()
+                recognized, faces = run()
+                durations.append(time.perf_counter() - started)
+            seconds = float(np.median(durations))
+            print(json.dumps({
+                "mode": mode, "portraits": len(portraits), "faces": faces, "recognized": recognized,
+                "seconds": round(seconds, 3), "faces_per_s": round(faces / seconds, 2),
+            }))
@@ -0,0 +1,119 @@
+"""Per-request cost of the old temp.jpg round trip vs in-memory decoding.
+
+The legacy path decoded uploads with PIL, re-encoded them to a shared
+``temp.jpg`` and let DeepFace read the file back. The current path decodes
+the upload once with ``cv2.imdecode`` and hands the ndarray to the model.
+
+The concurrency check decodes different images from many threads at once
+and verifies every caller gets back its own pixels; the legacy path is run
+the same way to show how the shared file leaks frames between requests.
+Pass ``--with-model`` to also run ``match_face`` concurrently on the
+known_faces images and check each request recognises its own student.
+
+    python benchmarks/bench_decode.py --repeat 50 --threads 16
+"""
+import argparse
+import json
+import os
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+import cv2
+import numpy as np
+from PIL import Image
+
+from common import BACKEND_DIR, latency_summary, time_calls
+
+from face_recognition_utils import decode_frame
+
+KNOWN_FACES_DIR = os.path.join(BACKEND_DIR, "known_faces")
+
+
+def legacy_decode(image_bytes, temp_path):
+    """The pre-change path: PIL decode, JPEG encode to disk, read back."""
+    img = Image.open(BytesIO(image_bytes))
+    frame = cv2.cvtColor(np.array(img.convert("RGB")), cv2.COLOR_RGB2BGR)
+    cv2.imwrite(temp_path, frame)
+    return cv2.imread(temp_path)
+
+
+def load_samples():
+    samples = {}
+    for filename in sorted(os.listdir(KNOWN_FACES_DIR)):
+        if filename.lower().endswith((".jpg", ".jpeg", ".png")):
+            with open(os.path.join(KNOWN_FACES_DIR, filename), "rb") as fh:
+                samples[filename] = fh.read()
+    return samples
+
+
+def fingerprint(frame):
+    if frame is None:
+        return None
+    return frame.shape, int(frame[::7, ::7].sum())
+
+
+def benchmark(samples, repeat, temp_path):
+    payloads = list(samples.values()) * repeat
+    _, legacy = time_calls(legacy_decode, [(b, temp_path) for b in payloads])
+    _, in_memory = time_calls(decode_frame, [(b,) for b in payloads])
+    return {"legacy_temp_file": latency_summary(legacy), "in_memory": latency_summary(in_memory)}
+
+
+def concurrency_check(samples, threads, rounds, decode):
+    # Expected output is the same decode run serially, so lossy re-encoding
+    # in the legacy path is not mistaken for contamination
+    expected = {name: fingerprint(decode(data)) for name, data in samples.items()}
+    jobs = list(samples.items()) * rounds
+
+    def run(job):
+        name, data = job
+        return name, fingerprint(decode(data))
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, jobs))
+    crossed = sum(1 for name, got in results if got != expected[name])
+    return {"requests": len(results), "cross_contaminated": crossed}
+
+
+def model_concurrency_check(samples, threads):
+    from face_recognition_utils import load_known_faces, match_face
+
+    known_faces = load_known_faces()
+    jobs = list(samples.items())
+
+    def run(job):
+        name, data = job
+        return name.split(".")[0], match_face(data, known_faces).get("name")
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = list(pool.map(run, jobs))
+    mismatched = [r for r in results if r[0] != r[1]]
+    return {"requests": len(results), "mismatched": mismatched}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--with-model", action="store_true")
+    opts = parser.parse_args()
+
+    samples = load_samples()
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_temp = os.path.join(tmp, "temp.jpg")
+        report = {
+            "latency": benchmark(samples, opts.repeat, shared_temp),
+            "concurrency": {
+                "legacy_temp_file": concurrency_check(
+                    samples, opts.threads, opts.repeat, lambda data: legacy_decode(data, shared_temp)
+                ),
+                "in_memory": concurrency_check(samples, opts.threads, opts.repeat, decode_frame),
+            },
+        }
+    if opts.with_model:
+        report["concurrency"]["match_face"] = model_concurrency_check(samples, opts.threads)
+    print(json.dumps(report, indent=2))
+
+    if report["concurrency"]["in_memory"]["cross_contaminated"]:
+        raise SystemExit("❌ In-memory decoding returned another request's frame")
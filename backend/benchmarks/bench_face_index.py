@@ -0,0 +1,76 @@
+"""Recall/latency benchmark of the face index backends.
+
+Compares every backend against the exact brute-force baseline on a roster
+built from the cached Facenet512 embeddings (run the server or
+``load_known_faces`` once to populate the cache) scaled up synthetically.
+
+    python benchmarks/bench_face_index.py --sizes 10000 50000 200000 --nprobe 4 8 16
+"""
+import argparse
+import json
+import time
+
+from common import latency_summary, load_reference_embeddings, noisy_queries, synthetic_roster, time_calls
+
+from face_index import BruteForceIndex, IVFIndex
+
+
+def recall_at_k(results, truth, k):
+    hits = 0
+    for got, expected in zip(results, truth):
+        expected_names = {name for name, _ in expected[:k]}
+        hits += len(expected_names & {name for name, _ in got[:k]}) / max(len(expected_names), 1)
+    return round(hits / max(len(truth), 1), 4)
+
+
+def run(sizes, nprobes, queries, k):
+    reference = load_reference_embeddings()
+    if reference is None:
+        print("⚠️ No cached Facenet512 embeddings found; using random vectors.")
+    report = []
+    for size in sizes:
+        roster = synthetic_roster(size, reference)
+        names = [f"student_{i}" for i in range(size)]
+        _, query_vectors = noisy_queries(roster, queries)
+        args = [(q, k) for q in query_vectors]
+
+        start = time.perf_counter()
+        brute = BruteForceIndex(names, roster)
+        brute_build = time.perf_counter() - start
+        truth, durations = time_calls(brute.search, args)
+        report.append({
+            "size": size, "backend": "brute", "build_s": round(brute_build, 3),
+            "recall@1": 1.0, f"recall@{k}": 1.0, **latency_summary(durations),
+        })
+
+        start = time.perf_counter()
+        ivf = IVFIndex(names, roster)
+        ivf_build = time.perf_counter() - start
+        for nprobe in nprobes:
+            results, durations = time_calls(
+                lambda q, kk: ivf.search(q, k=kk, nprobe=nprobe), args
+            )
+            report.append({
+                "size": size, "backend": f"ivf(nlist={ivf.centroids.shape[0]},nprobe={nprobe})",
+                "build_s": round(ivf_build, 3),
+                "recall@1": recall_at_k(results, truth, 1),
+                f"recall@{k}": recall_at_k(results, truth, k),
+                **latency_summary(durations),
+            })
+        for row in report[-(len(nprobes) + 1):]:
+            print(json.dumps(row))
+    return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[4, 8, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    opts = parser.parse_args()
+    results = run(opts.sizes, opts.nprobe, opts.queries, opts.k)
+    if opts.output:
+        with open(opts.output, "w", encoding="utf-8") as fh:
+            json.dump(results, fh, indent=2)
@@ -0,0 +1,67 @@
+"""Several photos per student: one reference photo vs flat scan vs gallery index.
+
+Each synthetic student (drawn from the cached Facenet512 embeddings when
+available) gets ``--photos`` reference photos and is queried with another
+photo, all perturbed copies of the same identity. Compares top-1 accuracy
+and latency of:
+
+  single   one reference photo per student (the old layout)
+  flat     every photo as its own row, scanned in full (cost grows with photos)
+  gallery  GalleryIndex: centroid templates first, then the shortlisted
+           students' photos (cost grows with students)
+
+    python benchmarks/bench_gallery.py --sizes 1000 10000 --photos 5 --noise 1.0
+"""
+import argparse
+import json
+
+import numpy as np
+
+from common import latency_summary, load_reference_embeddings, synthetic_roster, time_calls
+
+from face_index import BruteForceIndex, GalleryIndex
+
+
+def perturb(vectors, spread, noise, rng):
+    """Another photo of the same people: per-dimension noise relative to the roster's spread."""
+    return (vectors + rng.normal(size=vectors.shape) * spread * noise).astype(np.float32)
+
+
+def top1(index, queries, targets, name_of=lambda name: name):
+    results, durations = time_calls(index.search, [(q, 1) for q in queries])
+    correct = sum(bool(r) and name_of(r[0][0]) == f"s{t}" for r, t in zip(results, targets))
+    return {"top1": round(correct / len(targets), 4), **latency_summary(durations)}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000])
+    parser.add_argument("--photos", type=int, default=5)
+    parser.add_argument("--noise", type=float, default=1.0, help="Photo-to-photo variation, relative to the spread between students")
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--shortlist", type=int, default=16)
+    opts = parser.parse_args()
+
+    reference = load_reference_embeddings()
+    if reference is None:
+        print("⚠️ No cached Facenet512 embeddings found; using random vectors.")
+    rng = np.random.default_rng(0)
+    for size in opts.sizes:
+        students = synthetic_roster(size, reference)
+        spread = students.std(axis=0)
+        photos = perturb(np.repeat(students, opts.photos, axis=0), spread, opts.noise, rng)
+        files = [f"s{i}.jpg" if j == 0 else f"s{i}/photo-{j}.jpg" for i in range(size) for j in range(opts.photos)]
+        targets = rng.choice(size, opts.queries)
+        queries = perturb(students[targets], spread, opts.noise, rng)
+
+        single = BruteForceIndex([f"s{i}" for i in range(size)], photos[::opts.photos])
+        flat = BruteForceIndex(files, photos)
+        gallery = GalleryIndex(files, photos, shortlist=opts.shortlist)
+        for label, index, name_of in (
+            ("single", single, lambda name: name),
+            ("flat", flat, lambda name: name.split("/")[0].split(".")[0]),
+            ("gallery", gallery, lambda name: name),
+        ):
+            print(json.dumps({"size": size, "photos": opts.photos, "index": label,
+                              "rows": len(index.names) if label != "flat" else len(files),
+                              **top1(index, queries, targets, name_of)}))
@@ -0,0 +1,98 @@
+"""Live feed frame rate: recognition on every frame vs LiveRecognizer.
+
+Simulates a webcam from a known_faces image drifting across a 640x480
+canvas (with a stretch of empty frames) and reports frames/s and how many
+frames reached the recognition model.
+
+    python benchmarks/bench_live.py --frames 300
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from common import BACKEND_DIR
+
+from face_recognition_utils import load_known_faces, match_face
+from live_recognition import FaceTracker, LiveRecognizer, annotate
+
+
+def synthetic_feed(image_path, frames, size=(640, 480)):
+    """Yield frames of a face drifting across a grey canvas; the last quarter is empty."""
+    face = cv2.imread(image_path)
+    # Frame the face like a webcam would: head and shoulders, not a full portrait
+    boxes = FaceTracker(detect_width=640)._detect(face)
+    if len(boxes):
+        x, y, w, h = max(boxes, key=lambda b: b[2] * b[3])
+        face = face[max(0, y - h // 2):y + 3 * h // 2, max(0, x - w // 2):x + 3 * w // 2]
+    scale = 0.6 * size[1] / max(face.shape[:2])
+    face = cv2.resize(face, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    h, w = face.shape[:2]
+    for i in range(frames):
+        canvas = np.full((size[1], size[0], 3), 90, dtype=np.uint8)
+        if i < frames * 3 // 4:
+            x = int((size[0] - w) * (0.5 + 0.3 * np.sin(i / 40)))
+            y = (size[1] - h) // 2
+            canvas[y:y + h, x:x + w] = face
+        yield canvas
+
+
+def run_sync(frames, recognize):
+    calls = 0
+    started = time.perf_counter()
+    for frame in frames:
+        result = recognize(frame)
+        calls += 1
+        cv2.putText(frame, result.get("message", ""), (30, 40), cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        cv2.imencode(".jpg", frame)
+    return calls, time.perf_counter() - started
+
+
+def run_live(frames, recognize, camera_fps):
+    calls = 0
+
+    def counted(face, track_id):
+        nonlocal calls
+        calls += 1
+        return recognize(face)
+
+    live = LiveRecognizer.from_env(counted)
+    started = time.perf_counter()
+    for i, frame in enumerate(frames):
+        annotate(frame, live.process(frame))
+        cv2.imencode(".jpg", frame)
+        # Pace like a real camera so background recognition gets CPU time
+        delay = started + (i + 1) / camera_fps - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+    elapsed = time.perf_counter() - started
+    live.close()
+    return calls, elapsed
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=300)
+    parser.add_argument("--camera-fps", type=float, default=30.0)
+    parser.add_argument("--image", default=None, help="Face image (default: first known_faces image)")
+    opts = parser.parse_args()
+
+    folder = os.path.join(BACKEND_DIR, "known_faces")
+    image = opts.image or os.path.join(folder, sorted(os.listdir(folder))[0])
+    known_faces = load_known_faces()
+
+    def recognize(frame):
+        return match_face(frame, known_faces)
+
+    recognize(next(synthetic_feed(image, 1)))  # warm up the model
+    report = []
+    for mode, runner in (("every_frame", lambda f: run_sync(f, recognize)),
+                         ("live", lambda f: run_live(f, recognize, opts.camera_fps))):
+        calls, elapsed = runner(synthetic_feed(image, opts.frames))
+        row = {"mode": mode, "frames": opts.frames, "fps": round(opts.frames / elapsed, 1),
+               "model_calls": calls}
+        print(json.dumps(row))
+        report.append(row)
@@ -0,0 +1,144 @@
+"""ID card OCR: the original whole-image pass vs the region pipeline.
+
+Cards are synthesized from the known_faces photos (name, ID number and
+department printed next to the photo, then "photographed" at phone
+resolution on a desk with blur and noise), or read from ``--cards DIR``
+where every image has a ``.txt`` file with its expected text next to it.
+Each mode reports per-card latency percentiles and accuracy: the
+character similarity of the output to the expected text and how many
+cards had their name read exactly.
+
+    python benchmarks/bench_ocr.py --cards-count 20 --workers 1 2 4
+
+Without a Tesseract binary only the preprocessing stages (card crop, DPI
+resize, line detection) are timed.
+"""
+import argparse
+import difflib
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+import pytesseract
+
+from common import BACKEND_DIR, latency_summary
+
+from ocr_engine import CARD_WIDTH_IN, FULL_PAGE, REGIONS, OcrEngine
+
+KNOWN_FACES_DIR = os.path.join(BACKEND_DIR, "known_faces")
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+HEADER = "GOVT COLLEGE OF ENGINEERING"
+
+
+def render_card(photo, lines, dpi=300):
+    """A white ID-1 card at ``dpi`` with a header band, the photo and ``lines``."""
+    width, height = int(CARD_WIDTH_IN * dpi), int(2.125 * dpi)
+    card = np.full((height, width, 3), 245, dtype=np.uint8)
+    cv2.rectangle(card, (0, 0), (width, int(0.2 * height)), (120, 60, 20), -1)
+    cv2.putText(card, HEADER, (30, int(0.13 * height)),
+                cv2.FONT_HERSHEY_DUPLEX, 1.1, (255, 255, 255), 2, cv2.LINE_AA)
+    face = cv2.resize(photo, (int(0.28 * width), int(0.6 * height)), interpolation=cv2.INTER_AREA)
+    card[int(0.3 * height):int(0.3 * height) + face.shape[0], 30:30 + face.shape[1]] = face
+    x = 60 + face.shape[1]
+    for i, line in enumerate(lines):
+        cv2.putText(card, line, (x, int(0.38 * height) + i * 70),
+                    cv2.FONT_HERSHEY_DUPLEX, 0.95, (20, 20, 20), 2, cv2.LINE_AA)
+    return card
+
+
+def photograph(card, seed, phone_width=3000):
+    """The card lying on a desk as a phone would capture it."""
+    rng = np.random.default_rng(seed)
+    scale = 0.6 * phone_width / card.shape[1]
+    card = cv2.resize(card, None, fx=scale, fy=scale, interpolation=cv2.INTER_CUBIC)
+    height = int(phone_width * 0.75)
+    scene = np.full((height, phone_width, 3), (70, 90, 110), dtype=np.uint8)
+    y = int(rng.integers(0, height - card.shape[0]))
+    x = int(rng.integers(0, phone_width - card.shape[1]))
+    scene[y:y + card.shape[0], x:x + card.shape[1]] = card
+    scene = cv2.GaussianBlur(scene, (5, 5), 1.2)
+    noise = rng.normal(0, 6, scene.shape)
+    return cv2.cvtColor(np.clip(scene + noise, 0, 255).astype(np.uint8), cv2.COLOR_BGR2GRAY)
+
+
+def synthetic_cards(count):
+    photos = sorted(f for f in os.listdir(KNOWN_FACES_DIR) if f.lower().endswith(IMAGE_EXTENSIONS))
+    cards = []
+    for i in range(count):
+        filename = photos[i % len(photos)]
+        name = os.path.splitext(filename)[0].replace("_", " ").upper()
+        lines = [f"NAME: {name}", f"ID NO: 1GC{21 + i % 4}CS{100 + i:03d}", "DEPT: COMPUTER SCIENCE"]
+        card = render_card(cv2.imread(os.path.join(KNOWN_FACES_DIR, filename)), lines)
+        cards.append((photograph(card, seed=i), "\n".join([HEADER] + lines), name))
+    return cards
+
+
+def folder_cards(folder):
+    cards = []
+    for filename in sorted(os.listdir(folder)):
+        stem, ext = os.path.splitext(filename)
+        truth = os.path.join(folder, stem + ".txt")
+        if ext.lower() in IMAGE_EXTENSIONS and os.path.exists(truth):
+            with open(truth) as f:
+                expected = f.read().strip()
+            name = next((l.split(":", 1)[1].strip() for l in expected.splitlines() if l.upper().startswith("NAME")), None)
+            cards.append((cv2.imread(os.path.join(folder, filename), cv2.IMREAD_GRAYSCALE), expected, name))
+    return cards
+
+
+def similarity(expected, text):
+    normalize = lambda s: " ".join(s.upper().split())
+    return difflib.SequenceMatcher(None, normalize(expected), normalize(text)).ratio()
+
+
+def run_mode(cards, engine, mode):
+    engine.mode = mode
+    durations, scores, names = [], [], 0
+    for grey, expected, name in cards:
+        started = time.perf_counter()
+        text, details = engine.read(grey)
+        durations.append(time.perf_counter() - started)
+        scores.append(similarity(expected, text))
+        names += bool(name) and name in " ".join(text.upper().split())
+    return {
+        "latency": latency_summary(durations),
+        "similarity": round(float(np.mean(scores)), 4),
+        "names_read": f"{names}/{len(cards)}",
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cards", help="Folder of card images with .txt ground truth")
+    parser.add_argument("--cards-count", type=int, default=20, help="Synthetic cards to generate")
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--dpi", type=int, default=300)
+    opts = parser.parse_args()
+
+    cards = folder_cards(opts.cards) if opts.cards else synthetic_cards(opts.cards_count)
+    print(f"📦 {len(cards)} cards, {cards[0][0].shape[1]}x{cards[0][0].shape[0]} px")
+
+    durations, found = [], []
+    locator = OcrEngine(dpi=opts.dpi, workers=1)
+    for grey, expected, _ in cards:
+        started = time.perf_counter()
+        _, boxes = locator.locate_lines(grey)
+        durations.append(time.perf_counter() - started)
+        found.append(len(boxes) / len(expected.splitlines()))
+    print(json.dumps({"stage": "preprocess", "latency": latency_summary(durations),
+                      "lines_found_per_expected": round(float(np.mean(found)), 2)}))
+
+    try:
+        pytesseract.get_tesseract_version()
+    except pytesseract.TesseractNotFoundError:
+        print("⚠️ Tesseract not found; skipping recognition")
+        raise SystemExit(0)
+
+    print(json.dumps({"mode": FULL_PAGE, **run_mode(cards, OcrEngine(dpi=opts.dpi, workers=1), FULL_PAGE)}))
+    for workers in opts.workers:
+        engine = OcrEngine(dpi=opts.dpi, workers=workers)
+        print(json.dumps({"mode": REGIONS, "workers": workers, "backend": engine.backend,
+                          **run_mode(cards, engine, REGIONS)}))
+        engine.close()
@@ -0,0 +1,150 @@
+"""Roster memory and match accuracy: float lists vs float32 vs int8/float16.
+
+For each roster size (synthetic, drawn from the cached Facenet512
+embeddings when available) reports the memory per identity and top-1 /
+recall@k against exact float64 search for:
+
+  float_list  the original {name: [512 Python floats]} roster
+  float32     BruteForceIndex (a normalised float32 copy per process)
+  int8        QuantizedIndex, int8 rows + per-row scale, re-ranked
+  float16     QuantizedIndex, float16 rows, re-ranked
+
+``--workers N`` also loads each index in N spawned processes from the
+same memory-mapped store and reports their private vs shared memory
+(Linux only, from /proc/self/smaps_rollup).
+
+    python benchmarks/bench_quantized.py --sizes 10000 100000 --rerank 0 32
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+
+from common import latency_summary, load_reference_embeddings, noisy_queries, synthetic_roster, time_calls
+
+from face_index import BruteForceIndex, QuantizedIndex, normalize_rows
+
+
+def exact_top(roster, queries, k):
+    """Ground truth: float64 cosine top-k row indices per query."""
+    matrix = roster.astype(np.float64)
+    matrix /= np.linalg.norm(matrix, axis=1, keepdims=True)
+    scores = normalize_rows(queries).astype(np.float64) @ matrix.T
+    return np.argsort(-scores, axis=1)[:, :k]
+
+
+def accuracy(results, truth, k):
+    top1 = sum(bool(r) and r[0][0] == f"s{t[0]}" for r, t in zip(results, truth))
+    recall = sum(len({name for name, _ in r[:k]} & {f"s{i}" for i in t}) for r, t in zip(results, truth))
+    return {"top1": round(top1 / len(truth), 4), f"recall@{k}": round(recall / (k * len(truth)), 4)}
+
+
+def list_bytes_per_identity(roster, sample=1000):
+    """Heap bytes of the legacy ``{name: list(embedding)}`` roster, per identity."""
+    tracemalloc.start()
+    legacy = {f"s{i}": [float(v) for v in row] for i, row in enumerate(roster[:sample])}
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / len(legacy)
+
+
+def smaps_mb():
+    """(private, shared) resident MB of this process."""
+    fields = {}
+    with open("/proc/self/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    private = fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0)
+    shared = fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0)
+    return private / 1024, shared / 1024
+
+
+def load_in_worker(matrix_path, index_dir, backend, queries):
+    """Spawned worker: open the store matrix, build the index, search, report memory growth."""
+    before = smaps_mb()
+    matrix = np.load(matrix_path, mmap_mode="r")
+    names = [f"s{i}" for i in range(matrix.shape[0])]
+    if backend == "float32":
+        index = BruteForceIndex(names, matrix)
+    else:
+        index = QuantizedIndex(names, matrix, dtype=backend, path=index_dir)
+    index.search_many(queries, 5)
+    after = smaps_mb()
+    return round(after[0] - before[0], 1), round(after[1] - before[1], 1)
+
+
+def worker_memory(roster, queries, backends, workers):
+    with tempfile.TemporaryDirectory() as tmp:
+        matrix_path = os.path.join(tmp, "store.npy")
+        np.save(matrix_path, roster)
+        # Quantize once up front, as the first server worker would
+        for backend in backends:
+            if backend != "float32":
+                QuantizedIndex([f"s{i}" for i in range(len(roster))], np.load(matrix_path, mmap_mode="r"),
+                               dtype=backend, path=tmp)
+        report = {}
+        context = multiprocessing.get_context("spawn")
+        for backend in backends:
+            with context.Pool(workers) as pool:
+                usage = pool.starmap(load_in_worker, [(matrix_path, tmp, backend, queries)] * workers)
+            report[backend] = {
+                "private_mb_per_worker": max(private for private, _ in usage),
+                "shared_mb_per_worker": max(shared for _, shared in usage),
+            }
+        return report
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rerank", type=int, nargs="+", default=[0, 32])
+    parser.add_argument("--noise", type=float, default=0.35)
+    parser.add_argument("--workers", type=int, default=0)
+    parser.add_argument("-k", type=int, default=5)
+    opts = parser.parse_args()
+
+    reference = load_reference_embeddings()
+    if reference is None:
+        print("⚠️ No cached Facenet512 embeddings found; using random vectors.")
+    for size in opts.sizes:
+        roster = synthetic_roster(size, reference)
+        names = [f"s{i}" for i in range(size)]
+        _, queries = noisy_queries(roster, opts.queries, noise=opts.noise)
+        truth = exact_top(roster, queries, opts.k)
+        args = [(q, opts.k) for q in queries]
+
+        rows = [{"size": size, "backend": "float_list",
+                 "bytes_per_identity": round(list_bytes_per_identity(roster))}]
+        brute = BruteForceIndex(names, roster)
+        results, durations = time_calls(brute.search, args)
+        rows.append({"size": size, "backend": "float32", "bytes_per_identity": brute.matrix.nbytes / size,
+                     **accuracy(results, truth, opts.k), **latency_summary(durations)})
+        for dtype in QuantizedIndex.DTYPES:
+            for rerank in opts.rerank:
+                started = time.perf_counter()
+                index = QuantizedIndex(names, roster, dtype=dtype, rerank=rerank)
+                build_s = time.perf_counter() - started
+                results, durations = time_calls(index.search, args)
+                started = time.perf_counter()
+                index.search_many(queries, opts.k)
+                batch_ms = (time.perf_counter() - started) * 1000 / len(queries)
+                rows.append({
+                    "size": size, "backend": f"{dtype}(rerank={rerank})",
+                    "bytes_per_identity": index.nbytes / size, "build_s": round(build_s, 3),
+                    **accuracy(results, truth, opts.k), **latency_summary(durations),
+                    "batched_ms_per_query": round(batch_ms, 3),
+                })
+        for row in rows:
+            print(json.dumps(row))
+        if opts.workers:
+            print(json.dumps({"size": size, "workers": opts.workers, **worker_memory(
+                roster, queries[:8], ["float32", *QuantizedIndex.DTYPES], opts.workers
+            )}))
@@ -0,0 +1,92 @@
+"""ID card parsing and roster lookup: token scanning vs templates + trigram index.
+
+Card texts are generated for a synthetic roster of multi-word names with
+OCR-style damage (a substituted letter, a trailing initial). Reports how
+often each parser recovers the full name, and the per-lookup latency of
+RosterIndex against a linear edit-distance scan of the roster.
+
+    python benchmarks/bench_roster_match.py --sizes 1000 10000 100000
+"""
+import argparse
+import json
+import random
+import string
+
+from common import latency_summary, time_calls
+
+from ocr_utils import parse_id_card_info
+from roster_index import RosterIndex, levenshtein, normalize_name
+
+SYLLABLES = ["MU", "SA", "RA", "NI", "KA", "SH", "AN", "TH", "PO", "JA", "VI",
+             "NA", "YA", "GO", "WD", "RI", "HA", "BO", "DE", "EN", "TA", "LI"]
+
+
+def legacy_parse(text):
+    """The pre-template parser: whitespace tokens and substring checks."""
+    info = {"name": None, "id_number": None}
+    lines = text.split()
+    for i, line in enumerate(lines):
+        if any(keyword in line.upper() for keyword in ['NAME', 'NOME', 'NAAM']):
+            if i + 1 < len(lines):
+                info['name'] = lines[i + 1].strip()
+        if any(keyword in line.upper() for keyword in ['ID', 'NUMBER', 'NO.']):
+            if i + 1 < len(lines):
+                info['id_number'] = lines[i + 1].strip()
+    return info
+
+
+def synthetic_names(count, rng):
+    return [
+        " ".join("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4)))
+                 for _ in range(rng.randint(2, 3)))
+        for _ in range(count)
+    ]
+
+
+def ocr_damage(name, rng):
+    letters = list(name)
+    i = rng.randrange(len(letters))
+    if letters[i] != " ":
+        letters[i] = rng.choice(string.ascii_uppercase)
+    return "".join(letters) + " " + rng.choice(string.ascii_uppercase)
+
+
+def linear_match(roster_keys, name, max_distance):
+    key = normalize_name(name)
+    best = min(roster_keys, key=lambda candidate: levenshtein(key, candidate))
+    return best if levenshtein(key, best) <= max_distance else None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--scan-queries", type=int, default=5, help="Queries for the (slow) linear scan")
+    opts = parser.parse_args()
+    rng = random.Random(0)
+
+    names = synthetic_names(opts.queries, rng)
+    texts = [f"GOVT COLLEGE OF ENGINEERING\nNAME: {name}\nID NO: 1GC21CS{i:03d}\nDEPT: CSE"
+             for i, name in enumerate(names)]
+    for label, parse in (("token_scan", legacy_parse), ("template", parse_id_card_info)):
+        parsed, durations = time_calls(parse, [(text,) for text in texts])
+        print(json.dumps({"parser": label, "latency": latency_summary(durations),
+                          "full_names": sum(p["name"] == n for p, n in zip(parsed, names)),
+                          "cards": len(texts)}))
+
+    for size in opts.sizes:
+        roster = synthetic_names(size, rng)
+        index = RosterIndex(roster)
+        targets = [rng.choice(roster) for _ in range(opts.queries)]
+        queries = [ocr_damage(name, rng) for name in targets]
+        matches, durations = time_calls(index.match, [(q,) for q in queries])
+        row = {
+            "roster": size,
+            "index": latency_summary(durations),
+            "correct": sum(m is not None and m["name"] == t for m, t in zip(matches, targets)),
+            "queries": len(queries),
+        }
+        scan_args = [(index.keys, q, max(1, len(normalize_name(q)) // 5)) for q in queries[:opts.scan_queries]]
+        _, durations = time_calls(linear_match, scan_args)
+        row["linear_scan"] = latency_summary(durations)
+        print(json.dumps(row))
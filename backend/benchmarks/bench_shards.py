@@ -0,0 +1,172 @@
+"""Scatter-gather scaling: one roster split over 1, 2, 4... uvicorn shard processes.
+
+For each shard count the synthetic roster (drawn from the cached
+Facenet512 embeddings when available) is hash-partitioned with the same
+ring the servers use, every shard is started as its own uvicorn process
+serving /api/shard/search over its slice, and a ShardCoordinator
+measures, against a fixed total roster:
+
+  latency     sequential scatter-gather queries (p50/p95)
+  throughput  queries per second with ``--concurrency`` in flight
+  efficiency  throughput speed-up over one shard, divided by the shard count
+  agreement   merged top-1 equal to an in-process exact search
+
+``--kill-one`` then stops one shard and checks that queries still answer
+(``partial``, with the missing shard listed). Shards only run in parallel
+with at least as many free cores as shards; on fewer cores they share
+the CPU and the efficiency drops accordingly.
+
+    python benchmarks/bench_shards.py --size 200000 --shards 1 2 4 --concurrency 8
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+import numpy as np
+
+from common import latency_summary, load_reference_embeddings, noisy_queries, synthetic_roster
+
+from face_index import BruteForceIndex, GalleryIndex
+from face_shards import HashRing, ShardCoordinator, ShardMembership, shard_router
+
+
+def serve_shard(roster_path, shard, nodes, port, backend):
+    """Child process: index this shard's slice of the roster and serve it with uvicorn."""
+    import uvicorn
+    from fastapi import FastAPI
+
+    roster = np.load(roster_path, mmap_mode="r")
+    membership = ShardMembership(HashRing(nodes), shard)
+    rows = [i for i in range(roster.shape[0]) if membership(f"s{i}")]
+    index = GalleryIndex([f"s{i}" for i in rows], np.asarray(roster[rows], dtype=np.float32), backend)
+    app = FastAPI()
+    app.include_router(shard_router(lambda: (index, 0), shard), prefix="/api")
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_shards(roster_path, count, backend):
+    nodes = [f"shard{i}" for i in range(count)]
+    processes, shards = [], {}
+    for shard in nodes:
+        port = free_port()
+        processes.append(subprocess.Popen([
+            sys.executable, os.path.abspath(__file__), "--serve", roster_path, shard, ",".join(nodes),
+            str(port), backend
+        ]))
+        shards[shard] = [f"http://127.0.0.1:{port}"]
+    return processes, shards
+
+
+async def wait_ready(shards, timeout_s=300):
+    """Poll every shard's roster until all answer; returns ``{shard: rows}``."""
+    deadline = time.monotonic() + timeout_s
+    counts = {}
+    async with httpx.AsyncClient() as client:
+        while len(counts) < len(shards):
+            for shard, (url,) in shards.items():
+                try:
+                    counts[shard] = (await client.get(url + "/api/shard/roster")).json()["count"]
+                except httpx.HTTPError:
+                    pass
+            if time.monotonic() > deadline:
+                raise TimeoutError("Shards did not come up")
+            if len(counts) < len(shards):
+                await asyncio.sleep(0.5)
+    return counts
+
+
+async def measure(coordinator, queries, concurrency):
+    durations, results = [], []
+    for query in queries:
+        started = time.perf_counter()
+        found, _ = await coordinator.search(query, k=5)
+        durations.append(time.perf_counter() - started)
+        results.append(found)
+
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(query):
+        async with semaphore:
+            await coordinator.search(query, k=5)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(query) for query in queries))
+    throughput = len(queries) / (time.perf_counter() - started)
+    return results, durations, throughput
+
+
+async def run(count, roster_path, queries, truth, opts):
+    processes, shards = start_shards(roster_path, count, opts.backend)
+    coordinator = ShardCoordinator(shards, timeout_s=opts.timeout_ms / 1000)
+    coordinator.start()
+    try:
+        counts = await wait_ready(shards)
+        await measure(coordinator, queries[:20], opts.concurrency)  # warm up connections
+        results, durations, throughput = await measure(coordinator, queries, opts.concurrency)
+        agreement = sum(bool(r) and r[0][0] == t for r, t in zip(results, truth)) / len(truth)
+        row = {
+            "shards": count, "cpus": os.cpu_count(), "rows_per_shard": sorted(counts.values()),
+            "agreement": round(agreement, 4), **latency_summary(durations),
+            "throughput_per_s": round(throughput, 1),
+        }
+        if opts.kill_one and count > 1:
+            processes[0].terminate()
+            processes[0].wait()
+            found, failed = await coordinator.search(queries[0], k=5)
+            row["degraded"] = {"answered": bool(found), "failed_shards": failed}
+        return row
+    finally:
+        await coordinator.stop()
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--serve":
+        roster_path, shard, nodes, port, backend = sys.argv[2:7]
+        serve_shard(roster_path, shard, nodes.split(","), int(port), backend)
+        sys.exit(0)
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--queries", type=int, default=300)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--backend", default="brute", help="Index backend inside each shard")
+    parser.add_argument("--timeout-ms", type=float, default=5000)
+    parser.add_argument("--kill-one", action="store_true", help="Stop one shard and query again")
+    opts = parser.parse_args()
+
+    reference = load_reference_embeddings()
+    if reference is None:
+        print("⚠️ No cached Facenet512 embeddings found; using random vectors.")
+    roster = synthetic_roster(opts.size, reference)
+    _, queries = noisy_queries(roster, opts.queries)
+    truth = [name for name, _ in (r[0] for r in BruteForceIndex(
+        [f"s{i}" for i in range(opts.size)], roster).search_many(queries, 1))]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        roster_path = os.path.join(tmp, "roster.npy")
+        np.save(roster_path, roster)
+        del roster
+        baseline = None
+        for count in opts.shards:
+            row = asyncio.run(run(count, roster_path, queries, truth, opts))
+            baseline = baseline or row["throughput_per_s"] / count
+            row["scaling_efficiency"] = round(row["throughput_per_s"] / (baseline * count), 3)
+            print(json.dumps(row))
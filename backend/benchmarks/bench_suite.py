@@ -0,0 +1,467 @@
+"""Reproducible benchmark suite for recognition, OCR, ID card parsing and the API.
+
+Runs every scenario in-process with fixed seeds and writes one JSON file
+per run (commit, machine, configuration and per-case results), so two
+commits can be compared on the same machine:
+
+    python benchmarks/bench_suite.py                          # all scenarios
+    python benchmarks/bench_suite.py --only search parse --sizes 1000 10000
+    python benchmarks/bench_suite.py --compare benchmarks/results/<old>.json
+
+Scenarios:
+  load    load_known_faces with an empty embedding cache (cold) and a full one
+  match   match_face on the known_faces photos (in-process model)
+  search  match_embedding over synthetic rosters scaled from the real embeddings
+  parse   parse_id_card_info and RosterIndex lookups on synthetic card text
+  ocr     extract_text_from_id_card on synthetic card photos (needs Tesseract)
+  api     FastAPI routes through the in-process TestClient, with MongoDB
+          replaced by mongomock (see mongo_standin.py) unless --mongo-url
+  startup fresh interpreters importing server.py (per SERVER_PROFILE) and
+          app.py up to their first answered request: time, resident memory
+          and which heavy libraries (TensorFlow, pytesseract...) got loaded
+
+Each case reports p50/p95/p99 latency, throughput and the peak Python heap
+allocated by a few extra calls (tracemalloc; model and native buffers are
+not traced); the run also records the peak RSS of this process (face pool workers of
+the API scenario are separate processes).
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import cv2
+import numpy as np
+
+from common import BACKEND_DIR, latency_summary, noisy_queries, synthetic_roster
+
+KNOWN_FACES_DIR = os.path.join(BACKEND_DIR, "known_faces")
+RESULTS_DIR = os.path.join(BACKEND_DIR, "benchmarks", "results")
+SCENARIOS = ("load", "match", "search", "parse", "ocr", "api", "startup")
+
+# Compared by --compare: metric -> True when higher is better
+COMPARED_METRICS = {
+    "p50_ms": False, "p95_ms": False, "p99_ms": False, "throughput_per_s": True, "rss_mb": False
+}
+
+
+def measure(fn, calls, warmup=1, memory_calls=3, concurrency=1):
+    """Time ``fn(*args)`` over ``calls``; returns (results, metrics).
+
+    With ``concurrency`` > 1 the calls are spread over that many threads and
+    throughput is calls per wall-clock second.
+    """
+    for args in calls[:warmup]:
+        fn(*args)
+
+    def timed_call(args):
+        started = time.perf_counter()
+        result = fn(*args)
+        return result, time.perf_counter() - started
+
+    started = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            outcomes = list(pool.map(timed_call, calls))
+    else:
+        outcomes = [timed_call(args) for args in calls]
+    wall = time.perf_counter() - started
+
+    tracemalloc.start()
+    for args in calls[:memory_calls]:
+        fn(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    results = [result for result, _ in outcomes]
+    metrics = {
+        **latency_summary([duration for _, duration in outcomes]),
+        "throughput_per_s": round(len(calls) / wall, 3) if wall else None,
+        "peak_alloc_mb": round(peak / 2 ** 20, 3),
+    }
+    return results, metrics
+
+
+def face_photos(limit=None):
+    from face_store import IMAGE_EXTENSIONS
+
+    names = sorted(f for f in os.listdir(KNOWN_FACES_DIR) if f.lower().endswith(IMAGE_EXTENSIONS))
+    return names[:limit] if limit else names
+
+
+def tesseract_available():
+    import ocr_engine
+    import ocr_utils  # noqa: F401  (sets the TESSERACT_CMD the app uses)
+
+    if ocr_engine.tesserocr is not None:
+        return True
+    try:
+        ocr_engine.tesseract().get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+# ----------- SCENARIOS ------------
+def bench_load(opts):
+    from face_recognition_utils import load_known_faces
+
+    started = time.perf_counter()
+    index = load_known_faces(KNOWN_FACES_DIR, cache_dir=opts.cache_dir)
+    cold = time.perf_counter() - started
+    yield "cold", {**latency_summary([cold]), "faces": len(index)}
+
+    _, metrics = measure(lambda: load_known_faces(KNOWN_FACES_DIR, cache_dir=opts.cache_dir),
+                         [()] * opts.rounds)
+    yield "cached", {**metrics, "faces": len(index)}
+
+
+def bench_match(opts):
+    from face_recognition_utils import load_known_faces, match_face
+
+    index = load_known_faces(KNOWN_FACES_DIR, cache_dir=opts.cache_dir)
+    photos = face_photos()
+    frames = []
+    for filename in photos:
+        with open(os.path.join(KNOWN_FACES_DIR, filename), "rb") as f:
+            frames.append((f.read(), os.path.splitext(filename)[0]))
+    calls = [(frame,) for frame, _ in frames] * opts.rounds
+    results, metrics = measure(lambda frame: match_face(frame, index), calls)
+    expected = [name for _, name in frames] * opts.rounds
+    metrics["recognized"] = sum(r.get("name") == name for r, name in zip(results, expected))
+    metrics["rejected"] = sum(bool(r.get("rejected")) for r in results)
+    yield "known_faces", metrics
+
+
+def bench_search(opts):
+    from common import load_reference_embeddings
+    from face_index import build_index, index_config_from_env
+    from face_recognition_utils import match_embedding
+
+    reference = load_reference_embeddings()
+    backend, params = index_config_from_env()
+    for size in opts.sizes:
+        roster = synthetic_roster(size, reference)
+        names = [f"student_{i}" for i in range(size)]
+        started = time.perf_counter()
+        index = build_index(names, roster, backend=backend, **params)
+        build_s = time.perf_counter() - started
+        targets, queries = noisy_queries(roster, opts.queries)
+        results, metrics = measure(lambda q: match_embedding(q, index), [(q,) for q in queries])
+        metrics["top1"] = round(sum(
+            bool(r["candidates"]) and r["candidates"][0]["name"] == f"student_{t}"
+            for r, t in zip(results, targets)
+        ) / len(targets), 4)
+        metrics["build_s"] = round(build_s, 3)
+        metrics["embeddings"] = "facenet512" if reference is not None else "random"
+        yield f"{backend}/{size}", metrics
+
+
+def bench_parse(opts):
+    from bench_roster_match import ocr_damage, synthetic_names
+    from ocr_utils import parse_id_card_info
+    from roster_index import RosterIndex
+
+    rng = random.Random(0)
+    names = synthetic_names(opts.queries, rng)
+    texts = [f"GOVT COLLEGE OF ENGINEERING\nNAME: {name}\nID NO: 1GC21CS{i:03d}\nDEPT: CSE"
+             for i, name in enumerate(names)]
+    results, metrics = measure(parse_id_card_info, [(text,) for text in texts])
+    metrics["full_names"] = sum(r["name"] == n for r, n in zip(results, names))
+    yield "parse_id_card_info", metrics
+
+    for size in opts.sizes:
+        roster = synthetic_names(size, rng)
+        started = time.perf_counter()
+        index = RosterIndex(roster)
+        build_s = time.perf_counter() - started
+        targets = [rng.choice(roster) for _ in range(opts.queries)]
+        results, metrics = measure(index.match, [(ocr_damage(name, rng),) for name in targets])
+        metrics["correct"] = sum(r is not None and r["name"] == t for r, t in zip(results, targets))
+        metrics["build_s"] = round(build_s, 3)
+        yield f"roster_match/{size}", metrics
+
+
+def bench_ocr(opts):
+    if not tesseract_available():
+        yield "id_cards", {"skipped": "Tesseract not available"}
+        return
+    from bench_ocr import synthetic_cards
+    from ocr_utils import extract_text_from_id_card
+
+    cards = [(cv2.imencode(".png", grey)[1].tobytes(), name) for grey, _, name in synthetic_cards(opts.cards)]
+    results, metrics = measure(extract_text_from_id_card, [(card,) for card, _ in cards])
+    metrics["names_found"] = sum(name in r.get("text", "").upper() for r, (_, name) in zip(results, cards))
+    yield "id_cards", metrics
+
+
+def standin_database(server):
+    """Point the app's collections, counters and write buffer at mongomock."""
+    from attendance_counters import AttendanceCounters
+    from attendance_writer import AttendanceWriter
+    from mongo_standin import StandInDatabase
+
+    server.db = StandInDatabase()
+    server.attendance_counters = AttendanceCounters(server.db)
+    server.attendance_writer = AttendanceWriter.from_env(
+        server.db.attendance_records, after_insert=server.attendance_counters.apply
+    )
+
+
+def pad_roster(server, size):
+    """Grow the live face index to ``size`` with synthetic identities."""
+    snapshot = server.face_registry.snapshot()
+    extra = size - len(snapshot.index)
+    if extra <= 0:
+        return
+    from common import load_reference_embeddings
+
+    vectors = synthetic_roster(extra + len(snapshot.index), load_reference_embeddings())[len(snapshot.index):]
+    server.face_registry._publish(snapshot.index.updated([f"synthetic_{i}" for i in range(extra)], vectors))
+
+
+def bench_api(opts):
+    from fastapi.testclient import TestClient
+
+    import server
+
+    if not opts.mongo_url:
+        standin_database(server)
+    photos = face_photos(opts.students)
+    frames = []
+    for filename in photos:
+        with open(os.path.join(KNOWN_FACES_DIR, filename), "rb") as f:
+            frames.append(f.read())
+    with_ocr = tesseract_available()
+    if with_ocr:
+        from bench_ocr import synthetic_cards
+
+        cards = [cv2.imencode(".png", grey)[1].tobytes() for grey, _, _ in synthetic_cards(len(frames))]
+
+    with TestClient(server.app) as client:
+        started = time.perf_counter()
+        while client.get("/api/ready").status_code != 200:
+            if time.perf_counter() - started > opts.ready_timeout:
+                raise RuntimeError("server not ready")
+            time.sleep(0.2)
+        # Let the background known-faces refresh finish before padding the roster
+        while client.get("/api/known-faces-count").json().get("version", 0) < 1:
+            time.sleep(0.2)
+        yield "startup", {**latency_summary([time.perf_counter() - started])}
+        if opts.api_roster:
+            pad_roster(server, opts.api_roster)
+        roster = len(server.face_registry.snapshot().index)
+
+        def request(method, url, kwargs):
+            return getattr(client, method)(url, **kwargs).status_code
+
+        cases = [
+            ("GET /api/known-faces-count", [("get", "/api/known-faces-count", {})] * opts.api_requests),
+            ("POST /api/face-recognition", [
+                ("post", "/api/face-recognition", {"files": {"file": ("frame.jpg", frames[i % len(frames)])}})
+                for i in range(opts.api_requests)
+            ]),
+            ("POST /api/attendance/record", [
+                ("post", "/api/attendance/record",
+                 {"params": {"student_name": f"student_{i}", "class_name": f"class_{i % 8}", "face_confidence": 90.0}})
+                for i in range(opts.api_requests)
+            ]),
+            ("GET /api/attendance/stats", [
+                ("get", "/api/attendance/stats", {"params": {"breakdown": "class"}})
+            ] * opts.api_requests),
+        ]
+        if with_ocr:
+            cases += [
+                ("POST /api/ocr/id-card", [
+                    ("post", "/api/ocr/id-card", {"files": {"file": ("card.png", cards[i % len(cards)])}})
+                    for i in range(opts.api_requests)
+                ]),
+                ("POST /api/attendance/verify", [
+                    ("post", "/api/attendance/verify", {"files": {
+                        "face": ("frame.jpg", frames[i % len(frames)]), "id_card": ("card.png", cards[i % len(cards)])
+                    }})
+                    for i in range(opts.api_requests)
+                ]),
+            ]
+        for label, calls in cases:
+            statuses, metrics = measure(request, calls, concurrency=opts.concurrency)
+            metrics["errors"] = sum(status >= 400 for status in statuses)
+            metrics["roster"] = roster
+            yield label, metrics
+        if not with_ocr:
+            yield "POST /api/ocr/id-card", {"skipped": "Tesseract not available"}
+
+
+# Run as ``python -c STARTUP_PROBE <module> <backend dir>`` in a fresh
+# interpreter: imports the app module, answers one request (server.py with
+# its lifespan startup, on the mongomock stand-in) and prints a JSON line
+STARTUP_PROBE = """
+import json, os, resource, sys, time
+started = time.perf_counter()
+sys.path[:0] = [sys.argv[2], os.path.join(sys.argv[2], "benchmarks")]
+module = __import__(sys.argv[1])
+imported = time.perf_counter() - started
+if sys.argv[1] == "server":
+    from fastapi.testclient import TestClient
+    from bench_suite import standin_database
+    standin_database(module)
+    resumed = time.perf_counter()
+    with TestClient(module.app) as client:
+        client.get("/api/")
+        answered = imported + time.perf_counter() - resumed
+else:
+    module.app.test_client().get("/ready")
+    answered = time.perf_counter() - started
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / (2 ** 20 if sys.platform == "darwin" else 2 ** 10)
+heavy = ("tensorflow", "deepface", "pytesseract", "pandas", "cv2", "motor")
+print(json.dumps({"import_s": imported, "first_response_s": answered, "rss_mb": peak,
+                  "loaded": [name for name in heavy if name in sys.modules]}))
+"""
+
+
+def bench_startup(opts):
+    targets = [(f"server.py SERVER_PROFILE={profile}", "server", profile) for profile in ("stats", "inference", "full")]
+    for case, module, profile in targets + [("app.py (Flask)", "app", None)]:
+        env = dict(os.environ, SERVER_PROFILE=profile) if profile else os.environ
+        runs = []
+        for _ in range(opts.rounds):
+            probe = subprocess.run([sys.executable, "-c", STARTUP_PROBE, module, BACKEND_DIR], env=env,
+                                   capture_output=True, text=True, timeout=opts.ready_timeout)
+            if probe.returncode:
+                raise RuntimeError(f"{case} failed:\n{probe.stderr[-2000:]}")
+            runs.append(json.loads(probe.stdout.strip().splitlines()[-1]))
+        yield case, {
+            **latency_summary([run["first_response_s"] for run in runs]),
+            "import_ms": round(float(np.median([run["import_s"] for run in runs])) * 1000, 1),
+            "rss_mb": round(float(np.median([run["rss_mb"] for run in runs])), 1),
+            "loaded": runs[-1]["loaded"],
+        }
+
+
+RUNNERS = {
+    "load": bench_load, "match": bench_match, "search": bench_search,
+    "parse": bench_parse, "ocr": bench_ocr, "api": bench_api, "startup": bench_startup,
+}
+
+
+# ----------- RESULTS ------------
+def git_revision():
+    def git(*args):
+        return subprocess.run(["git", *args], cwd=BACKEND_DIR, capture_output=True, text=True).stdout.strip()
+    try:
+        return {"commit": git("rev-parse", "HEAD") or None, "dirty": bool(git("status", "--porcelain", "--", "."))}
+    except OSError:
+        return {"commit": None, "dirty": None}
+
+
+def peak_rss_mb():
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (2 ** 20 if sys.platform == "darwin" else 2 ** 10), 1)
+
+
+def run_metadata(opts):
+    return {
+        **git_revision(),
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "options": {key: value for key, value in vars(opts).items() if key not in ("output", "compare")},
+        "env": {key: value for key, value in sorted(os.environ.items())
+                if key.startswith(("FACE_", "INFERENCE_", "IDENTITY_CACHE_", "OCR_", "ATTENDANCE_"))},
+    }
+
+
+def compare(baseline_path, report, tolerance):
+    """Print metric changes against an earlier run; returns the number of regressions."""
+    with open(baseline_path) as f:
+        baseline = {(row["scenario"], row["case"]): row for row in json.load(f)["results"]}
+    regressions = 0
+    print(f"\nCompared with {baseline_path} (tolerance {tolerance:.0%}):")
+    for row in report["results"]:
+        old = baseline.get((row["scenario"], row["case"]))
+        if old is None:
+            continue
+        changes = []
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            before, after = old.get(metric), row.get(metric)
+            if not before or after is None:
+                continue
+            change = after / before - 1
+            worse = -change if higher_is_better else change
+            flag = ""
+            if worse > tolerance:
+                flag, regressions = " ⚠️", regressions + 1
+            changes.append(f"{metric} {before:g} -> {after:g} ({change:+.1%}){flag}")
+        if changes:
+            print(f"  {row['scenario']} / {row['case']}: " + ", ".join(changes))
+    return regressions
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", nargs="+", choices=SCENARIOS, default=list(SCENARIOS))
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000],
+                        help="Synthetic roster sizes for the search and roster lookup scenarios")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=3, help="Passes over known_faces for load/match")
+    parser.add_argument("--cards", type=int, default=10)
+    parser.add_argument("--students", type=int, default=5, help="Known faces used by the API scenario")
+    parser.add_argument("--api-requests", type=int, default=30)
+    parser.add_argument("--api-roster", type=int, default=0, help="Pad the API's face index to this many identities")
+    parser.add_argument("--concurrency", type=int, default=1, help="Concurrent API clients")
+    parser.add_argument("--ready-timeout", type=float, default=600)
+    parser.add_argument("--mongo-url", help="Use a real MongoDB instead of the mongomock stand-in")
+    parser.add_argument("--cache-dir", help="Embedding cache (default: a fresh temporary directory)")
+    parser.add_argument("--output", help="Result file (default: benchmarks/results/<time>-<commit>.json)")
+    parser.add_argument("--compare", help="Earlier result file to compare with")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="Relative slowdown reported as a regression")
+    opts = parser.parse_args()
+
+    # A fresh embedding cache makes the cold load reproducible; the API
+    # server and the search scenario read the same cache
+    temporary_cache = opts.cache_dir is None
+    opts.cache_dir = opts.cache_dir or tempfile.mkdtemp(prefix="attendance-bench-")
+    os.environ["FACE_CACHE_DIR"] = opts.cache_dir
+    os.environ["KNOWN_FACES_DIR"] = KNOWN_FACES_DIR
+    os.environ["MONGO_URL"] = opts.mongo_url or os.environ.get("MONGO_URL", "mongodb://localhost:27017")
+    os.environ.setdefault("DB_NAME", "attendance_benchmark")
+    # Measure the full pipeline, not the caches in front of it
+    os.environ.setdefault("IDENTITY_CACHE_SIZE", "0")
+    os.environ.setdefault("ATTENDANCE_STATS_CACHE_TTL", "0")
+
+    report = {"meta": run_metadata(opts), "results": []}
+    try:
+        for scenario in (s for s in SCENARIOS if s in opts.only):
+            print(f"🔄 {scenario}")
+            for case, metrics in RUNNERS[scenario](opts):
+                row = {"scenario": scenario, "case": case, **metrics}
+                report["results"].append(row)
+                print(json.dumps(row))
+    finally:
+        if temporary_cache:
+            shutil.rmtree(opts.cache_dir, ignore_errors=True)
+    report["meta"]["peak_rss_mb"] = peak_rss_mb()
+
+    output = opts.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now():%Y%m%d-%H%M%S}-{(report['meta']['commit'] or 'nogit')[:8]}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"✅ Results written to {output}")
+
+    if opts.compare and compare(opts.compare, report, opts.tolerance):
+        sys.exit(1)
@@ -0,0 +1,70 @@
+"""Kiosk check-in latency: three sequential calls vs /api/attendance/verify.
+
+The kiosk flow posts the face frame to /api/face-recognition, then the ID
+card to /api/ocr/id-card, then the check-in to /api/attendance/record. The
+combined endpoint takes both images in one request and runs face matching
+and OCR concurrently. Run against a live server:
+
+    python benchmarks/bench_verify.py --url http://localhost:5000 --rounds 20
+
+Face frames come from known_faces; cards are synthesized with the same
+student's name (see bench_ocr.py).
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import requests
+
+from common import BACKEND_DIR, latency_summary
+
+from bench_ocr import photograph, render_card
+
+KNOWN_FACES_DIR = os.path.join(BACKEND_DIR, "known_faces")
+
+
+def load_pairs(limit):
+    """(face jpeg, card png) pairs for the first ``limit`` known faces."""
+    pairs = []
+    for filename in sorted(os.listdir(KNOWN_FACES_DIR))[:limit]:
+        image = cv2.imread(os.path.join(KNOWN_FACES_DIR, filename))
+        name = os.path.splitext(filename)[0].replace("_", " ").upper()
+        card = photograph(render_card(image, [f"NAME: {name}", "ID NO: 1GC21CS100"]), seed=len(pairs))
+        pairs.append((cv2.imencode(".jpg", image)[1].tobytes(), cv2.imencode(".png", card)[1].tobytes()))
+    return pairs
+
+
+def sequential(session, api, face, card):
+    face_result = session.post(f"{api}/face-recognition", files={"file": ("frame.jpg", face)}).json()
+    card_result = session.post(f"{api}/ocr/id-card", files={"file": ("idcard.png", card)}).json()
+    session.post(f"{api}/attendance/record", params={
+        "student_name": face_result.get("name") or "Unknown",
+        "face_confidence": face_result.get("confidence"),
+        "verified": bool(face_result.get("success") and card_result.get("success")),
+    })
+
+
+def combined(session, api, face, card):
+    session.post(f"{api}/attendance/verify", files={"face": ("frame.jpg", face), "id_card": ("idcard.png", card)})
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--url", default="http://localhost:5000")
+    parser.add_argument("--rounds", type=int, default=20)
+    parser.add_argument("--students", type=int, default=5)
+    opts = parser.parse_args()
+
+    api = opts.url.rstrip("/") + "/api"
+    pairs = load_pairs(opts.students)
+    session = requests.Session()
+    for mode, flow in (("sequential", sequential), ("verify", combined)):
+        flow(session, api, *pairs[0])  # warm up
+        durations = []
+        for i in range(opts.rounds):
+            started = time.perf_counter()
+            flow(session, api, *pairs[i % len(pairs)])
+            durations.append(time.perf_counter() - started)
+        print(json.dumps({"mode": mode, **latency_summary(durations)}))
@@ -0,0 +1,72 @@
+"""Shared helpers for the backend benchmark scripts."""
+import os
+import sys
+import time
+
+import numpy as np
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+
+def latency_summary(samples_s):
+    """Summarise a list of durations (seconds) as millisecond percentiles."""
+    samples = np.asarray(samples_s, dtype=np.float64) * 1000.0
+    if samples.size == 0:
+        return {"count": 0}
+    return {
+        "count": int(samples.size),
+        "mean_ms": round(float(samples.mean()), 3),
+        "p50_ms": round(float(np.percentile(samples, 50)), 3),
+        "p95_ms": round(float(np.percentile(samples, 95)), 3),
+        "p99_ms": round(float(np.percentile(samples, 99)), 3),
+    }
+
+
+def time_calls(fn, args_list):
+    """Call ``fn(*args)`` for each entry and return (results, durations)."""
+    results, durations = [], []
+    for args in args_list:
+        start = time.perf_counter()
+        results.append(fn(*args))
+        durations.append(time.perf_counter() - start)
+    return results, durations
+
+
+def load_reference_embeddings(model_name="Facenet512", detector_backend="opencv"):
+    """Return the cached known-face embeddings, or None if no cache exists."""
+    from face_store import FaceStore
+
+    cache_dir = os.environ.get("FACE_CACHE_DIR", os.path.join(BACKEND_DIR, ".face_cache"))
+    store = FaceStore(cache_dir, model_name=model_name, detector_backend=detector_backend)
+    if not len(store):
+        return None
+    return np.asarray(store.matrix, dtype=np.float32)
+
+
+def synthetic_roster(size, reference=None, dim=512, seed=0):
+    """Generate ``size`` identity embeddings.
+
+    When real Facenet512 embeddings are available the synthetic roster is
+    drawn from a Gaussian fitted to them, so its geometry resembles the real
+    embedding space; otherwise unit Gaussian vectors are used.
+    """
+    rng = np.random.default_rng(seed)
+    if reference is not None and len(reference) > 1:
+        mean = reference.mean(axis=0)
+        std = reference.std(axis=0) + 1e-6
+        roster = rng.normal(mean, std, size=(size, reference.shape[1]))
+        roster[:len(reference)] = reference[:size]
+    else:
+        roster = rng.normal(size=(size, dim))
+    return roster.astype(np.float32)
+
+
+def noisy_queries(roster, count, noise=0.35, seed=1):
+    """Perturb random roster rows to mimic a second photo of the same person."""
+    rng = np.random.default_rng(seed)
+    targets = rng.choice(len(roster), size=count, replace=False if count <= len(roster) else True)
+    scale = np.linalg.norm(roster[targets], axis=1, keepdims=True) / np.sqrt(roster.shape[1])
+    queries = roster[targets] + rng.normal(size=(count, roster.shape[1])) * scale * noise
+    return targets, queries.astype(np.float32)
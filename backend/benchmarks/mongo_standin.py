@@ -0,0 +1,69 @@
+"""In-memory stand-in for the Motor database used by server.py.
+
+Wraps a mongomock database in the subset of Motor's async API the backend
+calls (awaitable collection methods, async cursors with ``sort`` and
+``to_list``), so the FastAPI app can be benchmarked without a MongoDB
+server. Needs ``pip install mongomock``.
+"""
+import mongomock
+
+
+class StandInCursor:
+    def __init__(self, cursor):
+        self.cursor = cursor
+        self._iterator = None
+
+    def sort(self, *args, **kwargs):
+        self.cursor = self.cursor.sort(*args, **kwargs)
+        return self
+
+    def __aiter__(self):
+        self._iterator = iter(self.cursor)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iterator)
+        except StopIteration:
+            raise StopAsyncIteration
+
+    async def to_list(self, length=None):
+        documents = list(self.cursor)
+        return documents[:length] if length else documents
+
+
+class StandInCollection:
+    """Awaitable wrapper over a mongomock collection."""
+
+    def __init__(self, collection):
+        self.collection = collection
+
+    def __getattr__(self, name):
+        method = getattr(self.collection, name)
+
+        async def call(*args, **kwargs):
+            return method(*args, **kwargs)
+        return call
+
+    def find(self, *args, **kwargs):
+        return StandInCursor(self.collection.find(*args, **kwargs))
+
+    def aggregate(self, pipeline, **kwargs):
+        return StandInCursor(self.collection.aggregate(pipeline))
+
+    async def bulk_write(self, operations, ordered=True):
+        # mongomock cannot consume current pymongo operation objects; replay
+        # the UpdateOne upserts the attendance counters issue
+        for op in operations:
+            self.collection.update_one(op._filter, op._doc, upsert=op._upsert)
+
+
+class StandInDatabase:
+    def __init__(self, name="attendance_benchmark"):
+        self.database = mongomock.MongoClient()[name]
+
+    def __getattr__(self, name):
+        return StandInCollection(self.database[name])
+
+    def __getitem__(self, name):
+        return StandInCollection(self.database[name])
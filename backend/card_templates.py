@@ -0,0 +1,124 @@
+import json
+import os
+import re
+
+# Fallback template for cards no institution template claims. Every field
+# has a ``label`` regex (the printed caption), a ``value`` regex the text
+# after the caption (or on the next line) must start with, and optionally a
+# ``line`` hint: the line index to read when the caption was not OCR'd.
+# A caption may follow a word naming the card holder ("Student ID"); other
+# prefixes ("Father's Name", "Phone Number") belong to someone else's field.
+HOLDER_PREFIX = r"(?:STUDENT|CANDIDATE|EMPLOYEE|STAFF|MEMBER)(?:'?S)?\s+"
+
+GENERIC_TEMPLATE = {
+    "name": "generic",
+    "match": None,
+    "fields": {
+        "name": {
+            "label": r"NA[MN]E|NOME|NAAM",
+            "value": r"[A-Z][A-Z.' ]*[A-Z.]",
+        },
+        "id_number": {
+            "label": r"IDENTIFICATION\s*(?:NO|NUMBER)|(?:IDENTITY\s+)?CARD\s*NO|ID(?:\s*(?:NO|NUMBER|CARD\s*NO))?|USN|ROLL\s*(?:NO|NUMBER)|REG(?:ISTRATION)?\s*NO|ENROLL?MENT\s*NO|NUMBER",
+            "value": r"(?=[A-Z0-9/-]*\d)[A-Z0-9][A-Z0-9/-]{3,}",
+        },
+    },
+}
+
+
+class CardTemplate:
+    """Field layout of one institution's ID card, with its regexes compiled once.
+
+    ``match`` (a regex searched in the whole OCR text, e.g. the college
+    name in the header) decides whether the template applies; the generic
+    template has none and applies to every card. All field captions are
+    compiled into a single alternation, so each line is tested once.
+    Several captions may share a line ("Name: JOHN SMITH ID: 12345"):
+    each value ends where the next caption starts.
+    """
+
+    def __init__(self, name, fields, match=None):
+        self.name = name
+        self.match = re.compile(match, re.IGNORECASE) if match else None
+        self.fields = list(fields)
+        for field in self.fields:
+            if not field.isidentifier() or field.startswith("_"):
+                raise ValueError(f"Invalid field name in card template {name!r}: {field!r}")
+        self.values = {field: re.compile(spec["value"], re.IGNORECASE) for field, spec in fields.items()}
+        self.lines = {field: spec["line"] for field, spec in fields.items() if spec.get("line") is not None}
+        self.labelled = [field for field, spec in fields.items() if spec.get("label")]
+        captions = "|".join(f"(?P<{field}>{fields[field]['label']})" for field in self.labelled)
+        labels = "|".join(f"(?:{fields[field]['label']})" for field in self.labelled)
+        self.captions = self.next_caption = None
+        if captions:
+            self.captions = re.compile(
+                rf"^\W*(?:{HOLDER_PREFIX})?(?:{captions})\b\W*(?P<_value>.*)$", re.IGNORECASE
+            )
+            self.next_caption = re.compile(rf"\b(?:{HOLDER_PREFIX})?(?:{labels})\b", re.IGNORECASE)
+
+    @classmethod
+    def from_dict(cls, spec):
+        return cls(spec["name"], spec["fields"], spec.get("match"))
+
+    def applies_to(self, text):
+        return self.match is None or self.match.search(text) is not None
+
+    def _value(self, field, text):
+        found = self.values[field].match(text.strip())
+        return found.group(0).strip(" .:-") if found else None
+
+    def parse(self, text):
+        """Read every field from OCR text in one pass over its lines.
+
+        A caption's value is the rest of its line up to the next caption,
+        or the next line when the caption stands alone. The first value
+        found for a field wins.
+        """
+        info = {field: None for field in self.fields}
+        lines = [" ".join(line.split()) for line in text.splitlines() if line.strip()]
+        pending = None
+        for line in lines:
+            caption = self.captions.match(line) if self.captions else None
+            if caption is None:
+                if pending is not None:
+                    info[pending] = self._value(pending, line)
+                    pending = None
+                continue
+            pending = None
+            while caption is not None:
+                field = next(f for f in self.labelled if caption.group(f) is not None)
+                value = caption.group("_value")
+                following = self.next_caption.search(value)
+                rest = value[following.start():] if following else ""
+                if following:
+                    value = value[:following.start()]
+                if info[field] is None:
+                    info[field] = self._value(field, value)
+                    if info[field] is None and not rest:
+                        pending = field
+                caption = self.captions.match(rest) if rest else None
+        for field, index in self.lines.items():
+            if info[field] is None and -len(lines) <= index < len(lines):
+                info[field] = self._value(field, lines[index])
+        return info
+
+
+def load_templates(path=None):
+    """Card templates from ``path`` (a JSON list), followed by the generic one.
+
+    ``path`` defaults to the ID_CARD_TEMPLATES environment variable.
+    """
+    path = path or os.environ.get("ID_CARD_TEMPLATES")
+    specs = []
+    if path:
+        with open(path) as f:
+            specs = json.load(f)
+    return [CardTemplate.from_dict(spec) for spec in specs] + [CardTemplate.from_dict(GENERIC_TEMPLATE)]
+
+
+def parse_card(text, templates):
+    """Fields of the first template that applies to ``text``, plus ``template``."""
+    template = next(t for t in templates if t.applies_to(text))
+    info = template.parse(text)
+    info["template"] = template.name
+    return info
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import time
+
+from inference_pool import PoolSaturated
+from metrics import POOL_SATURATED
+
+
+class EmbeddingBatcher:
+    """Coalesce concurrent embedding requests into batched forward passes.
+
+    Requests wait at most ``max_wait_ms`` for company; as soon as
+    ``max_batch_size`` requests are queued (or the wait expires) the batch
+    is sent to ``pool`` as one ``batch_fn(payloads)`` call and the results
+    are fanned back out. At most one batch per pool worker is in flight, so
+    requests arriving while every worker is busy form the next, larger
+    batch instead of queueing inside the pool. ``batch_fn`` returns one
+    entry per payload, either an embedding or an Exception for that payload
+    alone.
+    """
+
+    def __init__(self, pool, batch_fn, max_batch_size=16, max_wait_ms=5.0):
+        self.pool = pool
+        self.batch_fn = batch_fn
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_pending = pool.capacity * self.max_batch_size
+        self._queue = None
+        self._slots = None
+        self._collector = None
+        self._batches = set()
+
+    @classmethod
+    def from_env(cls, pool, batch_fn):
+        return cls(
+            pool,
+            batch_fn,
+            max_batch_size=int(os.environ.get("FACE_BATCH_MAX_SIZE", 16)),
+            max_wait_ms=float(os.environ.get("FACE_BATCH_MAX_WAIT_MS", 5)),
+        )
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._slots = asyncio.Semaphore(self.pool.workers)
+        self._collector = asyncio.create_task(self._collect())
+
+    async def stop(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, return_exceptions=True)
+            self._collector = None
+        await asyncio.gather(*self._batches, return_exceptions=True)
+
+    @property
+    def pending(self):
+        return self._queue.qsize() if self._queue is not None else 0
+
+    async def embed(self, payload):
+        """Queue one payload; returns ``(embedding, timings)``."""
+        if self._queue is None:
+            raise RuntimeError("EmbeddingBatcher.start() has not been called")
+        if self._queue.qsize() >= self.max_pending:
+            POOL_SATURATED.inc(pool="face batch")
+            raise PoolSaturated("face batch", self.max_pending)
+
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((payload, future, time.perf_counter()))
+        return await future
+
+    async def _collect(self):
+        while True:
+            await self._slots.acquire()
+            batch = [await self._queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = asyncio.create_task(self._dispatch(batch))
+            self._batches.add(task)
+            task.add_done_callback(self._batch_done)
+
+    def _batch_done(self, task):
+        self._batches.discard(task)
+        self._slots.release()
+
+    async def _dispatch(self, batch):
+        dispatched = time.perf_counter()
+        payloads = [payload for payload, _, _ in batch]
+        try:
+            results, pool_timings = await self.pool.run(self.batch_fn, payloads)
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, enqueued), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+                continue
+            future.set_result((result, {
+                "batch_wait_ms": round((dispatched - enqueued) * 1000, 2),
+                "batch_size": len(batch),
+                **pool_timings,
+            }))
@@ -0,0 +1,224 @@
+import argparse
+import hashlib
+import io
+import os
+import re
+import time
+import uuid
+import zipfile
+from concurrent.futures import ThreadPoolExecutor
+
+from face_recognition_utils import detect_face, embed_crops, open_face_store
+from face_store import IMAGE_EXTENSIONS, identity_of, list_images
+
+
+class EnrollmentJob:
+    """Progress and per-image failures of one bulk enrollment run."""
+
+    def __init__(self, source=None):
+        self.job_id = str(uuid.uuid4())
+        self.source = source
+        self.status = "pending"
+        self.processed = 0
+        self.enrolled = []
+        self.failed = []
+        self.started_at = None
+        self.finished_at = None
+
+    def fail(self, filename, error):
+        self.failed.append({"file": filename, "error": str(error)})
+
+    def to_dict(self):
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 2)
+        return {
+            "job_id": self.job_id,
+            "source": self.source,
+            "status": self.status,
+            "processed": self.processed,
+            "enrolled": len(self.enrolled),
+            "failed": self.failed,
+            "elapsed_s": elapsed,
+        }
+
+
+def iter_images(source):
+    """Yield ``(key, bytes)`` from a directory, a .zip path or zip bytes.
+
+    Keys follow the known_faces layout (see ``face_store.list_images``):
+    ``Student.jpg``, or ``Student/photo.jpg`` for a photo inside a
+    student's folder. A folder wrapping the whole archive (a zipped intake
+    folder) is skipped. Archives are read member by member, so large
+    intakes are never fully held in memory.
+    """
+    if isinstance(source, str) and os.path.isdir(source):
+        for key, path in list_images(source).items():
+            with open(path, "rb") as fh:
+                yield key, fh.read()
+        return
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    with zipfile.ZipFile(source) as archive:
+        members = []
+        for info in archive.infolist():
+            parts = [part for part in info.filename.split("/") if part]
+            if info.is_dir() or not parts or "__MACOSX" in parts or any(p.startswith(".") for p in parts):
+                continue
+            if parts[-1].lower().endswith(IMAGE_EXTENSIONS):
+                members.append((parts, info))
+        if all(len(parts) > 1 for parts, _ in members) and len({parts[0] for parts, _ in members}) == 1:
+            members = [(parts[1:], info) for parts, info in members]
+        for parts, info in members:
+            yield "/".join(parts[-2:]), archive.read(info)
+
+
+def safe_filename(filename):
+    return re.sub(r"[^A-Za-z0-9_.-]", "_", os.path.basename(filename))
+
+
+def safe_key(key):
+    """``safe_filename`` for each part of a ``Student/photo.jpg`` key; ``.``/``..`` parts are dropped."""
+    return "/".join(safe_filename(part) for part in key.split("/") if part.strip("."))
+
+
+def prepare_image(data, gate=None):
+    """Decode an image and return its largest face, cropped by the quality gate.
+
+    Raises FaceRejected (a ValueError) when the image cannot be decoded or
+    its face is not accepted, exactly as for single enrollment.
+    """
+    crop, _ = detect_face(data, gate)
+    return crop
+
+
+def _bounded_map(executor, fn, items, window):
+    """Like ``executor.map`` but keeps at most ``window`` items in flight."""
+    pending = []
+    for item in items:
+        pending.append(executor.submit(fn, *item))
+        if len(pending) >= window:
+            yield pending.pop(0)
+    yield from pending
+
+
+def run_enrollment(source, folder_path, store, embed_fn=embed_crops, batch_size=32,
+                   workers=None, job=None, progress=None, prepare_fn=prepare_image, commit=None, include=None):
+    """Enroll every image from ``source`` into ``folder_path`` and ``store``.
+
+    Images are decoded and face-cropped by ``prepare_fn`` in parallel
+    threads, embedded in batches of ``batch_size`` and upserted into the
+    store in one step at the end, so the matrix is rebuilt and saved once.
+    Accepted images are copied into ``folder_path`` so a later refresh sees
+    them as unchanged. ``progress(job)`` is called after every batch.
+    ``commit(items)`` replaces that last step (the ``(key, sha1, embedding)``
+    rows) when the store is shared, e.g. by a FaceRegistry. With
+    ``include``, photos of students it rejects (those another hash shard
+    owns) are failed without being embedded or copied.
+    """
+    job = job or EnrollmentJob(source if isinstance(source, str) else None)
+    job.status = "running"
+    job.started_at = time.time()
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(folder_path, exist_ok=True)
+    batch, items = [], []
+
+    def flush():
+        if not batch:
+            return
+        try:
+            embeddings = embed_fn([crop for _, _, _, crop in batch])
+        except Exception as e:
+            for filename, _, _, _ in batch:
+                job.fail(filename, f"embedding failed: {e}")
+            batch.clear()
+            return
+        for (filename, sha1, data, _), embedding in zip(batch, embeddings):
+            target = os.path.join(folder_path, *filename.split("/"))
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with open(target + ".tmp", "wb") as fh:
+                fh.write(data)
+            os.replace(target + ".tmp", target)
+            items.append((filename, sha1, embedding))
+            job.enrolled.append(filename)
+        batch.clear()
+        if progress:
+            progress(job)
+
+    def prepare(filename, data):
+        try:
+            return filename, data, prepare_fn(data), None
+        except Exception as e:
+            return filename, data, None, e
+
+    seen = set()
+
+    def unique(images):
+        # Two members mapping to one key would overwrite each other's photo
+        for key, data in images:
+            key = safe_key(key)
+            if key in seen:
+                job.processed += 1
+                job.fail(key, "another image in the intake has the same name")
+                continue
+            seen.add(key)
+            if include is not None and not include(identity_of(key)):
+                job.processed += 1
+                job.fail(key, "the student belongs to another shard")
+                continue
+            yield key, data
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="enroll") as executor:
+            images = unique(iter_images(source))
+            for future in _bounded_map(executor, prepare, images, window=2 * batch_size):
+                job.processed += 1
+                filename, data, crop, error = future.result()
+                if error is not None:
+                    job.fail(filename, error)
+                    continue
+                batch.append((filename, hashlib.sha1(data).hexdigest(), data, crop))
+                if len(batch) >= batch_size:
+                    flush()
+            flush()
+        if commit is not None:
+            commit(items)
+        else:
+            store.upsert(items)
+            store.save()
+        job.status = "completed"
+    except Exception as e:
+        job.status = "failed"
+        job.fail(None, e)
+    finally:
+        job.finished_at = time.time()
+    return job
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Bulk-enroll known faces from a directory or .zip archive")
+    parser.add_argument("source", help="Directory of images or .zip archive")
+    parser.add_argument("--folder", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "known_faces"))
+    parser.add_argument("--model-name", default="Facenet512")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    opts = parser.parse_args()
+
+    def report(job):
+        print(f"📦 {job.processed} processed, {len(job.enrolled)} enrolled, {len(job.failed)} failed")
+
+    result = run_enrollment(
+        opts.source,
+        opts.folder,
+        open_face_store(opts.model_name),
+        embed_fn=lambda crops: embed_crops(crops, opts.model_name),
+        batch_size=opts.batch_size,
+        workers=opts.workers,
+        progress=report,
+    )
+    summary = result.to_dict()
+    print(f"✅ Enrollment {summary['status']}: {summary['enrolled']} enrolled, "
+          f"{len(summary['failed'])} failed in {summary['elapsed_s']} s")
+    for failure in summary["failed"]:
+        print(f"⚠️ {failure['file']}: {failure['error']}")
@@ -0,0 +1,585 @@
+import glob
+import hashlib
+import os
+
+import numpy as np
+
+from face_store import identity_of
+
+
+def normalize_rows(matrix):
+    """Return a float32 copy of ``matrix`` with unit-length rows."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if matrix.ndim == 1:
+        matrix = matrix[np.newaxis, :]
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k(scores, k):
+    """Indices of the ``k`` highest scores, best first."""
+    k = min(k, scores.shape[0])
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < scores.shape[0]:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(scores.shape[0])
+    return candidates[np.argsort(-scores[candidates], kind="stable")]
+
+
+class BruteForceIndex:
+    """Exact cosine search over a pre-normalised embedding matrix.
+
+    A single matrix-vector product scores every identity, so a query costs
+    one BLAS call regardless of roster size.
+    """
+
+    def __init__(self, names, embeddings):
+        self.names = list(names)
+        if self.names:
+            self.matrix = normalize_rows(embeddings)
+        else:
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    @classmethod
+    def from_dict(cls, face_db):
+        """Build an index from a ``{name: embedding}`` mapping."""
+        names = list(face_db.keys())
+        return cls(names, [face_db[name] for name in names])
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, embedding, k=1):
+        """Return up to ``k`` ``(name, cosine_distance)`` pairs, nearest first."""
+        if not self.names:
+            return []
+        query = normalize_rows(embedding)[0]
+        scores = self.matrix @ query
+        return [(self.names[i], float(1.0 - scores[i])) for i in top_k(scores, k)]
+
+    def search_many(self, embeddings, k=1):
+        """Batch form of :meth:`search`: one matrix product scores every query."""
+        queries = normalize_rows(embeddings)
+        if not self.names or queries.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+        scores = queries @ self.matrix.T
+        return [
+            [(self.names[i], float(1.0 - row[i])) for i in top_k(row, k)]
+            for row in scores
+        ]
+
+    def updated(self, add_names=(), add_embeddings=(), remove=()):
+        """Return a new index with ``remove`` dropped and rows added or replaced.
+
+        The current index is left untouched, so readers holding it keep a
+        consistent view while the new one is built.
+        """
+        add_names = list(add_names)
+        drop = set(remove) | set(add_names)
+        keep = [i for i, name in enumerate(self.names) if name not in drop]
+        parts = [self.matrix[keep]] if keep else []
+        if add_names:
+            parts.append(normalize_rows(add_embeddings))
+
+        index = BruteForceIndex.__new__(BruteForceIndex)
+        index.names = [self.names[i] for i in keep] + add_names
+        index.matrix = np.vstack(parts) if parts else np.zeros((0, 0), dtype=np.float32)
+        return index
+
+
+class IVFIndex:
+    """Approximate cosine search with an inverted-file (IVF) layout.
+
+    Rows are clustered with spherical k-means into ``nlist`` lists; a query
+    only scores the rows in its ``nprobe`` closest lists. Rows are stored
+    grouped by list so each probe is a contiguous slice of the matrix.
+    """
+
+    def __init__(self, names, embeddings, nlist=None, nprobe=8, iterations=10, seed=0):
+        self.names = list(names)
+        self.nprobe = nprobe
+        self.params = {"nlist": nlist, "nprobe": nprobe, "iterations": iterations, "seed": seed}
+        n = len(self.names)
+        if n == 0:
+            self.centroids = np.zeros((0, 0), dtype=np.float32)
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+            self.order = np.empty(0, dtype=np.int64)
+            self.offsets = np.zeros(1, dtype=np.int64)
+            return
+
+        vectors = normalize_rows(embeddings)
+        nlist = nlist or max(1, int(np.sqrt(n)))
+        nlist = min(nlist, n)
+        self.centroids = self._train(vectors, nlist, iterations, seed)
+        assignment = self._assign(vectors)
+
+        self.order = np.argsort(assignment, kind="stable")
+        self.matrix = vectors[self.order]
+        counts = np.bincount(assignment, minlength=nlist)
+        self.offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    def _train(self, vectors, nlist, iterations, seed):
+        rng = np.random.default_rng(seed)
+        sample_size = min(vectors.shape[0], 64 * nlist)
+        sample = vectors[rng.choice(vectors.shape[0], sample_size, replace=False)]
+        centroids = sample[rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(iterations):
+            labels = self._nearest(sample, centroids)
+            order = np.argsort(labels, kind="stable")
+            counts = np.bincount(labels, minlength=nlist)
+            starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            empty = counts == 0
+            sums = np.zeros_like(centroids)
+            sums[~empty] = np.add.reduceat(sample[order], starts[~empty], axis=0)
+            # Re-seed empty lists from random samples so no list is wasted
+            sums[empty] = sample[rng.choice(sample_size, int(empty.sum()))]
+            centroids = normalize_rows(sums)
+        return centroids
+
+    @staticmethod
+    def _nearest(vectors, centroids, chunk_size=16384):
+        labels = np.empty(vectors.shape[0], dtype=np.int64)
+        for start in range(0, vectors.shape[0], chunk_size):
+            block = vectors[start:start + chunk_size]
+            labels[start:start + chunk_size] = np.argmax(block @ centroids.T, axis=1)
+        return labels
+
+    def _assign(self, vectors):
+        return self._nearest(vectors, self.centroids)
+
+    def __len__(self):
+        return len(self.names)
+
+    def updated(self, add_names=(), add_embeddings=(), remove=()):
+        """Return a new index with ``remove`` dropped and rows added or replaced.
+
+        New rows go to their nearest existing list without retraining the
+        centroids; the current index is left untouched.
+        """
+        add_names = list(add_names)
+        if not self.names:
+            return IVFIndex(add_names, add_embeddings, **self.params)
+
+        drop = set(remove) | set(add_names)
+        labels = np.repeat(np.arange(self.centroids.shape[0]), np.diff(self.offsets))
+        keep = np.array([
+            r for r in range(self.matrix.shape[0]) if self.names[self.order[r]] not in drop
+        ], dtype=np.int64)
+        names = [self.names[self.order[r]] for r in keep] + add_names
+        vectors, row_labels = self.matrix[keep], labels[keep]
+        if add_names:
+            added = normalize_rows(add_embeddings)
+            vectors = np.vstack([vectors, added])
+            row_labels = np.concatenate([row_labels, self._assign(added)])
+
+        index = IVFIndex.__new__(IVFIndex)
+        index.nprobe = self.nprobe
+        index.params = self.params
+        index.centroids = self.centroids
+        order = np.argsort(row_labels, kind="stable")
+        index.names = [names[i] for i in order]
+        index.matrix = vectors[order]
+        index.order = np.arange(len(index.names))
+        counts = np.bincount(row_labels, minlength=self.centroids.shape[0])
+        index.offsets = np.concatenate(([0], np.cumsum(counts)))
+        return index
+
+    def search(self, embedding, k=1, nprobe=None):
+        """Return up to ``k`` ``(name, cosine_distance)`` pairs, nearest first."""
+        if not self.names:
+            return []
+        query = normalize_rows(embedding)[0]
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        lists = top_k(self.centroids @ query, nprobe)
+        rows = np.concatenate([
+            np.arange(self.offsets[i], self.offsets[i + 1]) for i in lists
+        ])
+        if rows.size == 0:
+            return []
+        scores = self.matrix[rows] @ query
+        best = top_k(scores, k)
+        return [
+            (self.names[self.order[rows[i]]], float(1.0 - scores[i]))
+            for i in best
+        ]
+
+    def search_many(self, embeddings, k=1, nprobe=None):
+        """Batch form of :meth:`search`; each query probes its own lists."""
+        return [self.search(query, k, nprobe) for query in normalize_rows(embeddings)]
+
+
+class QuantizedIndex:
+    """Cosine search over a compact int8 (or float16) copy of the roster.
+
+    Rows are normalised, then quantized: int8 rows keep one float32 scale
+    each (``max |x| / 127``), a quarter of the float32 size. Queries are
+    scored on the quantized rows, chunk by chunk, and the best ``rerank``
+    candidates are re-scored against the full-precision embeddings, so the
+    returned distances are exact. Given a memory-mapped FaceStore matrix,
+    the full-precision rows stay on disk except those re-ranked: they are
+    read by row id (``rows``, in order by default), and ``updated`` keeps
+    reading the same matrix, holding only the rows it adds in memory.
+
+    With ``path`` the quantized matrix is written there once (named by a
+    digest of the embeddings) and memory-mapped read-only: every worker
+    process loading the same roster shares one copy of its pages. Files of
+    older rosters in ``path`` are removed, so each store needs its own.
+    """
+
+    DTYPES = ("int8", "float16")
+    # Rows widened to float32 at a time; small blocks stay in cache
+    CHUNK_SIZE = 512
+
+    def __init__(self, names, embeddings, dtype="int8", rerank=32, path=None, rows=None, extra=None):
+        if dtype not in self.DTYPES:
+            raise ValueError(f"Unknown quantized dtype '{dtype}' (expected one of: {', '.join(self.DTYPES)})")
+        self.names = list(names)
+        self.dtype = dtype
+        self.rerank = rerank
+        self.params = {"dtype": dtype, "rerank": rerank, "path": path}
+        if not self.names:
+            self.full = np.zeros((0, 0), dtype=np.float32)
+            self.rows = np.zeros(0, dtype=np.int64)
+            self.extra = self.full
+            self.codes = np.zeros((0, 0), dtype=dtype)
+            self.scales = None
+            return
+        # Keep memory-mapped store matrices as they are; copy anything else once
+        self.full = embeddings if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2 \
+            else np.asarray(embeddings, dtype=np.float32)
+        # Row of each name: rows of ``full``, then rows of ``extra`` (added by ``updated``)
+        self.rows = np.arange(len(self.names), dtype=np.int64) if rows is None else np.asarray(rows, dtype=np.int64)
+        self.extra = np.zeros((0, self.full.shape[1]), dtype=np.float32) if extra is None else extra
+        self.codes, self.scales = self._load_or_quantize(path) if path else self._quantize()
+
+    def _full_rows(self, ids):
+        """Full-precision rows of the names at ``ids``, read from ``full`` in place."""
+        rows = self.rows[ids]
+        if not len(self.extra):
+            return np.asarray(self.full[rows], dtype=np.float32)
+        stored = rows < self.full.shape[0]
+        found = np.empty((len(rows), self.full.shape[1]), dtype=np.float32)
+        found[stored] = self.full[rows[stored]]
+        found[~stored] = self.extra[rows[~stored] - self.full.shape[0]]
+        return found
+
+    def _chunks(self):
+        for start in range(0, len(self.names), self.CHUNK_SIZE):
+            yield start, self._full_rows(np.arange(start, min(start + self.CHUNK_SIZE, len(self.names))))
+
+    def _quantize(self):
+        codes = np.empty((len(self.names), self.full.shape[1]), dtype=self.dtype)
+        scales = np.empty(len(self.names), dtype=np.float32) if self.dtype == "int8" else None
+        for start, block in self._chunks():
+            block = normalize_rows(block)
+            if scales is None:
+                codes[start:start + len(block)] = block
+                continue
+            scale = np.abs(block).max(axis=1) / 127.0
+            scale[scale == 0] = 1.0
+            codes[start:start + len(block)] = np.rint(block / scale[:, np.newaxis])
+            scales[start:start + len(block)] = scale
+        return codes, scales
+
+    def _load_or_quantize(self, path):
+        digest = hashlib.sha1()
+        for _, block in self._chunks():
+            digest.update(block)
+        digest = digest.hexdigest()[:16]
+        stem = os.path.join(path, f"quantized_{self.dtype}_")
+        codes_path, scales_path = f"{stem}{digest}.npy", f"{stem}{digest}.scales.npy"
+        if not os.path.exists(codes_path):
+            codes, scales = self._quantize()
+            os.makedirs(path, exist_ok=True)
+            # Scales first: once the codes file exists, both are complete.
+            # Workers building the same roster concurrently write the same bytes
+            for target, array in ((scales_path, scales), (codes_path, codes)):
+                if array is not None:
+                    tmp = f"{target}.{os.getpid()}.tmp.npy"
+                    np.save(tmp, array)
+                    os.replace(tmp, target)
+            # Older rosters' files of this store (``path`` is per store); processes
+            # still mapping them keep their pages
+            for stale in glob.glob(f"{stem}*.npy"):
+                if not stale.startswith(f"{stem}{digest}"):
+                    try:
+                        os.remove(stale)
+                    except OSError:
+                        pass
+        codes = np.load(codes_path, mmap_mode="r")
+        scales = np.load(scales_path, mmap_mode="r") if self.dtype == "int8" else None
+        return codes, scales
+
+    def __len__(self):
+        return len(self.names)
+
+    @property
+    def nbytes(self):
+        """Bytes of the quantized rows (and scales) scanned by every query."""
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def _approximate(self, queries):
+        """Approximate cosine scores of every row, shape ``(len(queries), n)``."""
+        scores = np.empty((queries.shape[0], self.codes.shape[0]), dtype=np.float32)
+        for start in range(0, self.codes.shape[0], self.CHUNK_SIZE):
+            block = np.asarray(self.codes[start:start + self.CHUNK_SIZE], dtype=np.float32)
+            block_scores = queries @ block.T
+            if self.scales is not None:
+                block_scores *= self.scales[start:start + block.shape[0]]
+            scores[:, start:start + block.shape[0]] = block_scores
+        return scores
+
+    def _rerank(self, query, scores, k):
+        candidates = np.sort(top_k(scores, max(k, self.rerank)))
+        exact = normalize_rows(self._full_rows(candidates)) @ query
+        return [(self.names[candidates[i]], float(1.0 - exact[i])) for i in top_k(exact, k)]
+
+    def search(self, embedding, k=1):
+        """Return up to ``k`` ``(name, cosine_distance)`` pairs, nearest first."""
+        return self.search_many(embedding, k)[0] if self.names else []
+
+    def search_many(self, embeddings, k=1):
+        """Batch form of :meth:`search`: one pass over the quantized rows for all queries."""
+        queries = normalize_rows(embeddings)
+        if not self.names or queries.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+        scores = self._approximate(queries)
+        return [self._rerank(query, row, k) for query, row in zip(queries, scores)]
+
+    def updated(self, add_names=(), add_embeddings=(), remove=()):
+        """Return a new index with ``remove`` dropped and rows added or replaced.
+
+        Kept rows are still read from the same ``full`` matrix; only added
+        rows (and earlier additions still in use) are held in ``extra``.
+        """
+        add_names = list(add_names)
+        drop = set(remove) | set(add_names)
+        keep = [i for i, name in enumerate(self.names) if name not in drop]
+        names = [self.names[i] for i in keep] + add_names
+        if not self.full.shape[0]:
+            return QuantizedIndex(names, np.asarray(add_embeddings, dtype=np.float32) if add_names else [],
+                                  **self.params)
+        base = self.full.shape[0]
+        rows = self.rows[keep]
+        added = rows >= base
+        extra = self.extra[rows[added] - base]
+        rows[added] = base + np.arange(len(extra))
+        if add_names:
+            rows = np.concatenate([rows, base + len(extra) + np.arange(len(add_names))])
+            extra = np.vstack([extra, np.asarray(add_embeddings, dtype=np.float32)])
+        return QuantizedIndex(names, self.full, rows=rows, extra=extra, **self.params)
+
+
+INDEX_BACKENDS = {
+    "brute": BruteForceIndex,
+    "ivf": IVFIndex,
+    "quantized": QuantizedIndex,
+}
+
+
+class GalleryIndex:
+    """Several reference photos per student, searched in two passes.
+
+    Rows are photos (``Student.jpg``, ``Student/<photo>.jpg``) grouped by
+    student. Each student's normalised photos are averaged into a centroid
+    template and the templates are indexed with the configured backend.
+    A query first searches the templates, then re-scores the ``shortlist``
+    closest students by the mean of their template score and their best
+    photo's score, so per-query cost grows with the number of students,
+    not photos.
+    Names are students; ``updated`` takes photo keys and recomputes only
+    the touched students' templates.
+    """
+
+    # Photos added by ``updated`` are kept in memory next to the (memory-mapped)
+    # matrix; beyond this many (or the matrix size) the next update rebuilds
+    COMPACT_ROWS = 4096
+
+    def __init__(self, files, embeddings, backend="brute", shortlist=16, **params):
+        # Photo ids index ``files``: matrix rows first, then ``extra`` rows.
+        # None marks a row that is not indexed: a removed photo (until the
+        # next rebuild) or, in a shared store, another shard's student
+        self.files = list(files)
+        self.ids = {f: i for i, f in enumerate(self.files) if f is not None}
+        self.backend = backend
+        self.shortlist = shortlist
+        self.params = params
+        # Memory-mapped store matrices stay on disk; rows are normalised when read
+        self.matrix = embeddings if isinstance(embeddings, np.ndarray) and embeddings.ndim == 2 \
+            else np.asarray(embeddings, dtype=np.float32)
+        self.extra = np.zeros((0, self.matrix.shape[1] if self.matrix.ndim == 2 else 0), dtype=np.float32)
+        identities = {i: identity_of(f) for i, f in enumerate(self.files) if f is not None}
+        self.rows = np.array(sorted(identities, key=identities.get), dtype=np.int64)
+        self.names, starts = [], []
+        for position, row in enumerate(self.rows):
+            if not self.names or identities[row] != self.names[-1]:
+                self.names.append(identities[row])
+                starts.append(position)
+        self.offsets = np.array(starts + [len(self.rows)], dtype=np.int64)
+        self.positions = {name: i for i, name in enumerate(self.names)}
+        self.single = len(self.names) == len(self.rows)
+        if self.single and self.names and backend == "quantized":
+            # One photo per student: the photos are the templates, re-ranked
+            # straight from the (memory-mapped) photo matrix by row id
+            self.templates = QuantizedIndex(self.names, self.matrix, rows=self.rows, **params)
+        else:
+            self.templates = build_index(self.names, self._centroids(), backend=backend, **params)
+
+    def _centroids(self, chunk_size=16384):
+        if not self.names:
+            return []
+        if self.single:
+            # One photo per student: the photos are the templates (the brute
+            # and IVF backends keep their own normalised copy regardless)
+            in_order = np.array_equal(self.rows, np.arange(len(self.rows)))
+            return self.matrix if in_order else np.asarray(self.matrix[self.rows], dtype=np.float32)
+        owner = np.repeat(np.arange(len(self.names)), np.diff(self.offsets))
+        sums = np.zeros((len(self.names), self.matrix.shape[1]), dtype=np.float32)
+        for start in range(0, len(self.rows), chunk_size):
+            rows = self.rows[start:start + chunk_size]
+            np.add.at(sums, owner[start:start + chunk_size], self._photos(rows))
+        return sums
+
+    def _photos(self, ids):
+        """Normalised photos by id."""
+        if not len(self.extra):
+            return normalize_rows(self.matrix[ids])
+        stored = ids < self.matrix.shape[0]
+        photos = np.empty((len(ids), self.extra.shape[1]), dtype=np.float32)
+        photos[stored] = self.matrix[ids[stored]]
+        photos[~stored] = self.extra[ids[~stored] - self.matrix.shape[0]]
+        return normalize_rows(photos)
+
+    def __len__(self):
+        return len(self.names)
+
+    def search(self, embedding, k=1):
+        """Return up to ``k`` ``(student, cosine_distance)`` pairs, nearest first."""
+        return self.search_many(embedding, k)[0] if self.names else []
+
+    def search_many(self, embeddings, k=1):
+        queries = normalize_rows(embeddings)
+        if not self.names or queries.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+        shortlists = self.templates.search_many(queries, k=max(k, self.shortlist))
+        if self.single:
+            return [shortlist[:k] for shortlist in shortlists]
+        results = []
+        for query, shortlist in zip(queries, shortlists):
+            # An IVF template index can come back empty when the probed lists are empty
+            if not shortlist:
+                results.append([])
+                continue
+            students = [self.positions[name] for name, _ in shortlist]
+            spans = [np.arange(self.offsets[i], self.offsets[i + 1]) for i in students]
+            scores = self._photos(self.rows[np.concatenate(spans)]) @ query
+            starts = np.cumsum([0] + [len(span) for span in spans[:-1]])
+            # Blend the template score with the best photo: the centroid averages
+            # out per-photo noise, the best photo keeps distinct looks reachable
+            template = 1.0 - np.array([distance for _, distance in shortlist], dtype=np.float32)
+            combined = (template + np.maximum.reduceat(scores, starts)) / 2
+            results.append([(self.names[students[i]], float(1.0 - combined[i])) for i in top_k(combined, k)])
+        return results
+
+    def updated(self, add_names=(), add_embeddings=(), remove=()):
+        """Return a new index with photos ``remove`` dropped and photos added or replaced.
+
+        Only the touched students' templates are recomputed; they go through
+        the template index's own ``updated`` (no retraining or re-quantizing
+        of the rest) and the photo matrix is shared with this index.
+        """
+        add_names = list(add_names)
+        added = normalize_rows(add_embeddings) if add_names else None
+        if self.needs_rebuild(len(add_names)):
+            return self._rebuilt(add_names, added, remove)
+        base = self.matrix.shape[0]
+
+        drop = (set(remove) | set(add_names)) & self.ids.keys()
+        touched = sorted({identity_of(f) for f in drop} | {identity_of(f) for f in add_names})
+        index = GalleryIndex.__new__(GalleryIndex)
+        index.backend, index.shortlist, index.params = self.backend, self.shortlist, self.params
+        index.matrix = self.matrix
+        index.files = self.files + add_names
+        index.ids = dict(self.ids)
+        for f in drop:
+            index.files[index.ids.pop(f)] = None
+        first = base + len(self.extra)
+        index.ids.update((f, first + j) for j, f in enumerate(add_names))
+        index.extra = np.vstack([self.extra, added]) if add_names else self.extra
+
+        # Touched students are taken out of the grouping and appended again
+        # with their remaining photos; everyone else keeps their span
+        positions = [self.positions[s] for s in touched if s in self.positions]
+        photos = {s: [] for s in touched}
+        kept_rows = np.ones(len(self.rows), dtype=bool)
+        for p in positions:
+            span = self.rows[self.offsets[p]:self.offsets[p + 1]]
+            photos[self.names[p]] = [i for i in span if index.files[i] is not None]
+            kept_rows[self.offsets[p]:self.offsets[p + 1]] = False
+        for f in add_names:
+            photos[identity_of(f)].append(index.ids[f])
+        photos = {s: np.array(ids, dtype=np.int64) for s, ids in photos.items() if ids}
+        kept = np.ones(len(self.names), dtype=bool)
+        kept[positions] = False
+
+        index.names = [name for name, keep in zip(self.names, kept) if keep] + list(photos)
+        index.positions = {name: i for i, name in enumerate(index.names)}
+        index.rows = np.concatenate([self.rows[kept_rows], *photos.values()]).astype(np.int64)
+        counts = np.concatenate([np.diff(self.offsets)[kept], [len(ids) for ids in photos.values()]])
+        index.offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+        index.single = len(index.names) == len(index.rows)
+        templates = [index._photos(ids).sum(axis=0) for ids in photos.values()]
+        index.templates = self.templates.updated(
+            list(photos), templates, remove=[s for s in touched if s not in photos]
+        )
+        return index
+
+    def needs_rebuild(self, adding):
+        """Whether ``updated`` adding this many photos falls back to a full rebuild.
+
+        The rebuilt index holds its photo matrix in memory; an owner with a
+        saved FaceStore rebuilds from the store instead, to keep it mapped.
+        """
+        base = self.matrix.shape[0] if self.matrix.ndim == 2 else 0
+        return not base or len(self.extra) + adding > max(self.COMPACT_ROWS, base)
+
+    def _rebuilt(self, add_names, added, remove):
+        """Full rebuild over the live photos, with the photo matrix in memory."""
+        drop = set(remove) | set(add_names)
+        live = np.array([i for i, f in enumerate(self.files) if f is not None and f not in drop], dtype=np.int64)
+        parts = [self._photos(live)] if len(live) else []
+        if add_names:
+            parts.append(added)
+        files = [self.files[i] for i in live] + add_names
+        return GalleryIndex(files, np.vstack(parts) if parts else [], self.backend, self.shortlist, **self.params)
+
+
+def index_config_from_env():
+    """Read the face index backend and its parameters from the environment."""
+    backend = os.environ.get("FACE_INDEX_BACKEND", "brute").lower()
+    params = {}
+    if backend == "ivf":
+        if os.environ.get("FACE_INDEX_NLIST"):
+            params["nlist"] = int(os.environ["FACE_INDEX_NLIST"])
+        if os.environ.get("FACE_INDEX_NPROBE"):
+            params["nprobe"] = int(os.environ["FACE_INDEX_NPROBE"])
+    elif backend == "quantized":
+        params["dtype"] = os.environ.get("FACE_INDEX_DTYPE", "int8").lower()
+        if os.environ.get("FACE_INDEX_RERANK"):
+            params["rerank"] = int(os.environ["FACE_INDEX_RERANK"])
+    return backend, params
+
+
+def build_index(names, embeddings, backend="brute", **params):
+    """Construct the configured index backend over ``names``/``embeddings``."""
+    try:
+        index_cls = INDEX_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(
+            f"Unknown face index backend '{backend}' "
+            f"(expected one of: {', '.join(INDEX_BACKENDS)})"
+        )
+    return index_cls(names, embeddings, **params)
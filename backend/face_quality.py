@@ -0,0 +1,171 @@
+import os
+
+import cv2
+
+# Rejection reasons reported to clients
+DECODE_FAILED = "decode_failed"
+NO_FACE = "no_face"
+FACE_TOO_SMALL = "face_too_small"
+TOO_BLURRY = "too_blurry"
+TOO_DARK = "too_dark"
+TOO_BRIGHT = "too_bright"
+
+_REJECT_MESSAGES = {
+    DECODE_FAILED: "Failed to decode image — check your uploaded image",
+    NO_FACE: "No face detected",
+    FACE_TOO_SMALL: "Face is too small — move closer to the camera",
+    TOO_BLURRY: "Face is too blurry — hold still",
+    TOO_DARK: "Face is too dark — improve the lighting",
+    TOO_BRIGHT: "Face is overexposed — reduce the lighting",
+}
+
+
+class FaceRejected(ValueError):
+    """Raised when a frame fails the quality gate; ``reason`` says why."""
+
+    def __init__(self, reason, quality=None):
+        super().__init__(_REJECT_MESSAGES.get(reason, reason))
+        self.reason = reason
+        self.quality = quality or {}
+
+    def __reduce__(self):
+        # Keep reason and quality when crossing a process pool
+        return FaceRejected, (self.reason, self.quality)
+
+
+class QualityGate:
+    """Cheap checks that run before a frame is embedded.
+
+    Frames are downscaled to ``max_side`` and a near-black frame is turned
+    away before detection. The face is then detected and aligned once; the
+    largest face must be at least ``min_face_size`` pixels on its short side
+    (in the downscaled frame, which is what gets embedded), sharp enough
+    (variance of the Laplacian) and neither too dark nor overexposed (mean
+    grey level). ``check`` returns the aligned crop, ready to embed with
+    ``detector_backend="skip"``, or raises FaceRejected.
+    """
+
+    # Sharpness is measured at a fixed size so it does not depend on resolution
+    SHARPNESS_SIZE = 160
+
+    def __init__(self, min_face_size=48, min_sharpness=25.0, min_brightness=40.0,
+                 max_brightness=220.0, max_side=960, detector_backend="opencv"):
+        self.max_side = max_side
+        self.min_face_size = min_face_size
+        self.min_sharpness = min_sharpness
+        self.min_brightness = min_brightness
+        self.max_brightness = max_brightness
+        self.detector_backend = detector_backend
+
+    @classmethod
+    def from_env(cls, detector_backend="opencv"):
+        return cls(
+            min_face_size=int(os.environ.get("FACE_MIN_SIZE", 48)),
+            min_sharpness=float(os.environ.get("FACE_MIN_SHARPNESS", 25)),
+            min_brightness=float(os.environ.get("FACE_MIN_BRIGHTNESS", 40)),
+            max_brightness=float(os.environ.get("FACE_MAX_BRIGHTNESS", 220)),
+            max_side=int(os.environ.get("FACE_DETECT_MAX_SIDE", 960)),
+            detector_backend=detector_backend,
+        )
+
+    def measure(self, crop):
+        """Sharpness and brightness of a BGR face crop."""
+        grey = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        sized = cv2.resize(grey, (self.SHARPNESS_SIZE, self.SHARPNESS_SIZE), interpolation=cv2.INTER_AREA)
+        return {
+            "sharpness": round(float(cv2.Laplacian(sized, cv2.CV_64F).var()), 2),
+            "brightness": round(float(grey.mean()), 2),
+        }
+
+    def _detect(self, image):
+        """Downscale ``image`` and detect its faces; returns ``(faces, scale)``."""
+        if image is None:
+            raise FaceRejected(DECODE_FAILED)
+        # Detection cost grows with resolution; faces stay large enough to embed
+        scale = min(1, self.max_side / max(image.shape[:2])) if self.max_side else 1
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        # A frame this dark has no usable face; skip detection altogether
+        if image.mean() < self.min_brightness / 2:
+            raise FaceRejected(TOO_DARK, {"brightness": round(float(image.mean()), 2)})
+        # Imported here: DeepFace loads TensorFlow, which only face workers need
+        from deepface.modules import detection
+        try:
+            faces = detection.detect_faces(self.detector_backend, image, align=True)
+        except ValueError:
+            faces = []
+        if not faces:
+            raise FaceRejected(NO_FACE)
+        return faces, scale
+
+    def _assess(self, face, scale):
+        """Return ``(crop, quality)`` for one detected face, or raise FaceRejected."""
+        area = face.facial_area
+        quality = {
+            "face_size": int(min(area.w, area.h)),
+            # Box in the caller's (full-resolution) coordinates
+            "box": [int(round(v / scale)) for v in (area.x, area.y, area.w, area.h)],
+        }
+        if quality["face_size"] < self.min_face_size:
+            raise FaceRejected(FACE_TOO_SMALL, quality)
+        if face.img is None or face.img.size == 0:
+            raise FaceRejected(NO_FACE, quality)
+
+        quality.update(self.measure(face.img))
+        if quality["brightness"] < self.min_brightness:
+            raise FaceRejected(TOO_DARK, quality)
+        if quality["brightness"] > self.max_brightness:
+            raise FaceRejected(TOO_BRIGHT, quality)
+        if quality["sharpness"] < self.min_sharpness:
+            raise FaceRejected(TOO_BLURRY, quality)
+        return face.img, quality
+
+    def check(self, image):
+        """Return ``(crop, quality)`` for the largest face in a BGR image."""
+        faces, scale = self._detect(image)
+        face = max(faces, key=lambda f: f.facial_area.w * f.facial_area.h)
+        return self._assess(face, scale)
+
+    def check_all(self, image):
+        """Gate every face in a BGR image, left to right.
+
+        Returns one ``(crop, quality)`` or FaceRejected per detected face;
+        a frame with no usable face at all raises FaceRejected.
+        """
+        faces, scale = self._detect(image)
+        results = []
+        for face in sorted(faces, key=lambda f: (f.facial_area.x, f.facial_area.y)):
+            try:
+                results.append(self._assess(face, scale))
+            except FaceRejected as e:
+                results.append(e)
+        return results
+
+
+_default_gate = None
+
+
+def default_gate():
+    """Process-wide gate configured from the FACE_* environment variables."""
+    global _default_gate
+    if _default_gate is None:
+        _default_gate = QualityGate.from_env()
+    return _default_gate
+
+
+_classroom_gate = None
+
+
+def classroom_gate():
+    """Gate for whole-class snapshots: keeps more resolution and accepts smaller faces.
+
+    Configured like the default gate, with CLASSROOM_DETECT_MAX_SIDE and
+    CLASSROOM_MIN_FACE_SIZE overriding the detection size and face size.
+    """
+    global _classroom_gate
+    if _classroom_gate is None:
+        gate = QualityGate.from_env()
+        gate.max_side = int(os.environ.get("CLASSROOM_DETECT_MAX_SIDE", 2560))
+        gate.min_face_size = int(os.environ.get("CLASSROOM_MIN_FACE_SIZE", 32))
+        _classroom_gate = gate
+    return _classroom_gate
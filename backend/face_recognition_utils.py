@@ -1,6 +1,5 @@
 import os
 import cv2
-from deepface import DeepFace
 from numpy import dot
 from numpy.linalg import norm
 # import cv2
@@ -8,82 +7,353 @@ import numpy as np
 # from deepface import DeepFace
 # from numpy import dot
 # from numpy.linalg import norm
-from io import BytesIO
-from PIL import Image
+
+import model_registry
+from face_index import BruteForceIndex, GalleryIndex, build_index, index_config_from_env
+from face_quality import FaceRejected, classroom_gate, default_gate
+from identity_cache import perceptual_hash
+from metrics import FACE_REJECTIONS, FACE_RESULTS, timed
+from face_store import FaceStore, identity_of
+
 def cosine_distance(a, b):
     """Calculate cosine distance between two embeddings."""
     return 1 - dot(a, b) / (norm(a) * norm(b))
 
-def load_known_faces(folder="known_faces", model_name="Facenet512"):
-    """Load all known faces and store embeddings in a dictionary."""
+def open_face_store(model_name="Facenet512", cache_dir=None, shard=None):
+    """Open the persistent embedding store (FACE_CACHE_DIR by default).
+
+    A hash shard passes its name to get a store of its own.
+    """
+    if cache_dir is None:
+        base_dir = os.path.dirname(os.path.abspath(__file__))
+        cache_dir = os.environ.get("FACE_CACHE_DIR", os.path.join(base_dir, ".face_cache"))
+    return FaceStore(cache_dir, model_name=model_name, detector_backend="opencv", shard=shard)
+
+
+def index_from_store(store, index_backend=None, membership=None, **index_params):
+    """Build the face index over every photo in ``store``.
+
+    Photos are grouped per student (see GalleryIndex); the student
+    templates are indexed with the configured backend. With
+    ``membership(student)`` (a hash shard) other students' rows are left out.
+    """
+    if index_backend is None:
+        index_backend, index_params = index_config_from_env()
+    if index_backend == "quantized":
+        # Quantized rows are memory-mapped next to the store, shared by all
+        # workers; one folder per store so shards never delete each other's files
+        index_params = {"path": os.path.join(store.cache_dir, f"{store.stem}.quantized"), **index_params}
+    shortlist = int(os.environ.get("FACE_GALLERY_SHORTLIST", 16))
+    names = store.names
+    if membership is not None:
+        # Other students' rows stay in the (memory-mapped) matrix, unindexed
+        names = [name if membership(identity_of(name)) else None for name in names]
+    return GalleryIndex(names, store.matrix, index_backend, shortlist, **index_params)
+
+
+def load_known_faces(folder="known_faces", model_name="Facenet512", cache_dir=None,
+                     index_backend=None, **index_params):
+    """Load all known faces into a searchable face index.
+
+    Embeddings are persisted in a FaceStore so restarts only re-embed new or
+    changed images; deleted images are dropped from the store. Photos are
+    grouped by student in a GalleryIndex whose template backend ("brute",
+    "ivf" or "quantized") defaults to FACE_INDEX_BACKEND.
+    """
+    if index_backend is None:
+        index_backend, index_params = index_config_from_env()
+
     base_dir = os.path.dirname(os.path.abspath(__file__))
     folder_path = os.path.join(base_dir, folder)
-    face_db = {}
 
     if not os.path.isdir(folder_path):
         print(f"❌ Folder not found: {folder_path}")
-        return face_db
-
-    for filename in os.listdir(folder_path):
-        filepath = os.path.join(folder_path, filename)
-        if filename.lower().endswith(('.jpg', '.jpeg', '.png')):
-            try:
-                embedding = DeepFace.represent(
-                    img_path=filepath,
-                    model_name=model_name,
-                    detector_backend="opencv",
-                    enforce_detection=False
-                )[0]["embedding"]
-                face_db[filename] = embedding
-                print(f"✅ Loaded: {filename}")
-            except Exception as e:
-                print(f"⚠️ Error loading {filename}: {e}")
-
-    return face_db
-
-
-def match_face(frame, known_faces, model_name="Facenet512", threshold=0.35):
-    """Match uploaded face image (bytes) with known faces."""
-    try:
-        # ✅ Convert bytes to NumPy array if needed
-        if isinstance(frame, bytes):
-            img = Image.open(BytesIO(frame))
-            frame = cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
-
-        # ✅ Save temporary image (optional, helps DeepFace)
-        temp_path = "temp.jpg"
-        cv2.imwrite(temp_path, frame)
-
-        # ✅ Ensure image actually saved (not blank)
-        if os.path.getsize(temp_path) == 0:
-            return {
-                "success": False,
-                "message": "⚠️ temp.jpg is blank — check your uploaded image"
-            }
+        return build_index([], [], backend=index_backend, **index_params)
+
+    store = open_face_store(model_name, cache_dir)
+    summary = store.refresh(
+        folder_path,
+        lambda filepath: embed_file(filepath, model_name)
+    )
+    print(
+        f"✅ Face store: {len(store)} faces "
+        f"({len(summary['added'])} added, {len(summary['updated'])} updated, "
+        f"{len(summary['removed'])} removed, {summary['unchanged']} cached)"
+    )
+    return index_from_store(store, index_backend, **index_params)
+
+
+def _display_name(filename):
+    return filename.split('.')[0]
+
 
-        live_embedding = DeepFace.represent(
-            img_path=temp_path,
-            model_name=model_name,
-            detector_backend="opencv",
-            enforce_detection=False
-        )[0]["embedding"]
-
-        for name, stored_embedding in known_faces.items():
-            distance = cosine_distance(live_embedding, stored_embedding)
-            if distance < threshold:
-                return {
-                    "success": True,
-                    "message": f"✅ Face recognized: {name.split('.')[0]}",
-                    "confidence": round((1 - distance) * 100, 2),
-                    "name": name.split('.')[0]
-                }
+def match_embedding(embedding, known_faces, threshold=0.35, top_k=3):
+    """Score an embedding against every known face and return the best match.
 
+    ``known_faces`` is any face index backend (a plain ``{name: embedding}``
+    dict is converted to a BruteForceIndex on the fly). The nearest identity wins, not the first one
+    under the threshold; the top-k candidates are returned alongside it.
+    """
+    if isinstance(known_faces, dict):
+        known_faces = BruteForceIndex.from_dict(known_faces)
+    return match_result(known_faces.search(embedding, k=top_k), threshold)
+
+
+def match_result(found, threshold=0.35):
+    """Recognition result for the ``(name, distance)`` hits of one search, nearest first."""
+    candidates = [
+        {
+            "name": _display_name(name),
+            "distance": round(distance, 4),
+            "confidence": round((1 - distance) * 100, 2)
+        }
+        for name, distance in found
+    ]
+
+    if candidates and candidates[0]["distance"] < threshold:
+        best = candidates[0]
         return {
-            "success": False,
-            "message": "❌ Face not recognized"
+            "success": True,
+            "message": f"✅ Face recognized: {best['name']}",
+            "confidence": best["confidence"],
+            "name": best["name"],
+            "candidates": candidates
         }
 
+    return {
+        "success": False,
+        "message": "❌ Face not recognized",
+        "candidates": candidates
+    }
+
+
+def match_embeddings(embeddings, known_faces, threshold=0.35, top_k=3):
+    """Match several faces from one frame, each identity to at most one face.
+
+    All faces are scored in one batched search. Candidate pairs under the
+    threshold are then assigned closest first, so when two faces resemble
+    the same student the closer one gets that identity and the other falls
+    back to its next candidate, or stays unrecognized (``duplicate: True``).
+    """
+    if isinstance(known_faces, dict):
+        known_faces = BruteForceIndex.from_dict(known_faces)
+    return assign_matches(known_faces.search_many(embeddings, k=top_k) if len(embeddings) else [], threshold)
+
+
+def assign_matches(searched, threshold=0.35):
+    """Results for several faces' search hits, each identity given to its closest face."""
+    pairs = sorted(
+        (distance, face, name)
+        for face, found in enumerate(searched)
+        for name, distance in found
+        if distance < threshold
+    )
+    assigned, taken = {}, set()
+    for distance, face, name in pairs:
+        if face not in assigned and name not in taken:
+            assigned[face] = (name, distance)
+            taken.add(name)
+
+    results = []
+    for face, found in enumerate(searched):
+        candidates = [
+            {
+                "name": _display_name(name),
+                "distance": round(distance, 4),
+                "confidence": round((1 - distance) * 100, 2)
+            }
+            for name, distance in found
+        ]
+        if face in assigned:
+            name, distance = assigned[face]
+            results.append({
+                "success": True,
+                "message": f"✅ Face recognized: {_display_name(name)}",
+                "confidence": round((1 - distance) * 100, 2),
+                "name": _display_name(name),
+                "candidates": candidates
+            })
+        else:
+            duplicate = bool(found) and found[0][1] < threshold
+            results.append({
+                "success": False,
+                "message": "❌ Face matches a student already recognized in this frame"
+                           if duplicate else "❌ Face not recognized",
+                "duplicate": duplicate,
+                "candidates": candidates
+            })
+    return results
+
+
+def decode_frame(frame):
+    """Return a BGR ndarray for raw image bytes or an already-decoded frame.
+
+    Bytes are decoded once with ``cv2.imdecode``; ``None`` means the payload
+    is not a readable image.
+    """
+    if isinstance(frame, (bytes, bytearray, memoryview)):
+        buffer = np.frombuffer(frame, dtype=np.uint8)
+        if buffer.size == 0:
+            return None
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    if frame is None or getattr(frame, "size", 0) == 0:
+        return None
+    return frame
+
+
+def embed_crops(crops, model_name="Facenet512"):
+    """Embed pre-cropped faces in one forward pass; returns an (n, d) matrix."""
+    faces = model_registry.deepface().represent(
+        img_path=list(crops),
+        model_name=model_name,
+        detector_backend="skip",
+        enforce_detection=False
+    )
+    # DeepFace unwraps single-image batches
+    if len(crops) == 1:
+        faces = [faces]
+    return np.asarray([image_faces[0]["embedding"] for image_faces in faces], dtype=np.float32)
+
+
+def detect_face(frame, gate=None):
+    """Decode ``frame`` and return ``(crop, quality)`` for its largest face.
+
+    Raises FaceRejected when the frame fails the quality gate.
+    """
+    return (gate or default_gate()).check(decode_frame(frame))
+
+
+def detect_faces(frames, gate=None):
+    """Batch form of :func:`detect_face`: one ``(crop, quality)`` or FaceRejected per frame."""
+    results = []
+    for frame in frames:
+        try:
+            results.append(detect_face(frame, gate))
+        except FaceRejected as e:
+            results.append(e)
+    return results
+
+
+def embed_face(frame, model_name="Facenet512", gate=None):
+    """Return the embedding of the largest face in ``frame`` (bytes or ndarray).
+
+    The frame goes through the quality gate first; blank, tiny, blurred or
+    badly lit faces raise FaceRejected without paying for an embedding.
+    """
+    # ✅ Decode uploads straight into an ndarray; nothing touches the disk
+    crop, _ = detect_face(frame, gate)
+    return embed_crops([crop], model_name)[0]
+
+
+def embed_file(filepath, model_name="Facenet512", gate=None):
+    """:func:`embed_face` for an image file.
+
+    Every writer of the face store (folder refresh, single and bulk
+    enrollment) embeds through the quality gate like this, so a stored
+    vector never depends on which path enrolled the photo.
+    """
+    with open(filepath, "rb") as fh:
+        return embed_face(fh.read(), model_name, gate)
+
+
+def embed_faces(frames, model_name="Facenet512", gate=None):
+    """Embed a batch of frames with a single forward pass.
+
+    Returns one entry per frame: the embedding of its largest face, or the
+    exception that frame alone raised (FaceRejected for undecodable uploads
+    and frames that fail the quality gate). Only accepted crops are embedded.
+    """
+    gate = gate or default_gate()
+    results = [None] * len(frames)
+    crops, positions = [], []
+    for i, frame in enumerate(frames):
+        try:
+            crop, _ = gate.check(decode_frame(frame))
+        except FaceRejected as e:
+            results[i] = e
+            continue
+        crops.append(crop)
+        positions.append(i)
+
+    if crops:
+        for i, embedding in zip(positions, embed_crops(crops, model_name)):
+            results[i] = embedding
+
+    return results
+
+
+def embed_classroom(frame, model_name="Facenet512", gate=None):
+    """Detect every face in a class snapshot and embed them in one forward pass.
+
+    Returns ``(faces, embeddings)``: one ``{"quality"}`` or ``{"rejected",
+    "reason", "quality"}`` entry per detected face, left to right, and the
+    ``(n, d)`` embeddings of the accepted faces in the same order. Raises
+    FaceRejected when the frame has no usable face at all.
+    """
+    gate = gate or classroom_gate()
+    faces, crops = [], []
+    for outcome in gate.check_all(decode_frame(frame)):
+        if isinstance(outcome, FaceRejected):
+            faces.append({"rejected": True, "reason": outcome.reason, "quality": outcome.quality})
+        else:
+            crop, quality = outcome
+            faces.append({"quality": quality})
+            crops.append(crop)
+    embeddings = embed_crops(crops, model_name) if crops else np.zeros((0, 0), dtype=np.float32)
+    return faces, embeddings
+
+
+def init_embedding_worker(model_name="Facenet512"):
+    """Process-pool initializer: load and warm the model before the first request."""
+    model_registry.warm_up(model_name)
+
+
+def rejection_result(error):
+    """Fast response for a frame the quality gate turned away."""
+    return {
+        "success": False,
+        "rejected": True,
+        "reason": error.reason,
+        "message": f"⚠️ {error}",
+        "quality": error.quality
+    }
+
+
+def match_face(frame, known_faces, model_name="Facenet512", threshold=0.35, top_k=3,
+               cache=None, track_id=None):
+    """Match uploaded face image (bytes) with known faces.
+
+    With an IdentityCache, a face that looks like one recognized moments ago
+    (same perceptual hash neighbourhood, or same live-feed ``track_id``)
+    reuses that result without running the model.
+    """
+    try:
+        with timed("decode"):
+            frame = decode_frame(frame)
+        with timed("detection", expected=FaceRejected):
+            crop, _ = detect_face(frame)
+        if cache is not None:
+            phash = perceptual_hash(crop)
+            cached = cache.lookup(phash, track_id)
+            if cached is not None:
+                FACE_RESULTS.inc(result="match" if cached["success"] else "no_match")
+                return {**cached, "cached": True}
+
+        with timed("embedding"):
+            live_embedding = embed_crops([crop], model_name)[0]
+        with timed("search"):
+            result = match_embedding(live_embedding, known_faces, threshold=threshold, top_k=top_k)
+        FACE_RESULTS.inc(result="match" if result["success"] else "no_match")
+        if cache is not None:
+            cache.store(phash, result, track_id)
+        return result
+
+    except FaceRejected as e:
+        FACE_RESULTS.inc(result="rejected")
+        FACE_REJECTIONS.inc(reason=e.reason)
+        return rejection_result(e)
     except Exception as e:
+        FACE_RESULTS.inc(result="error")
         return {
             "success": False,
             "message": f"⚠️ Error during face match: {e}"
@@ -97,8 +367,15 @@ if __name__ == "__main__":
         print("⚠️ No known faces found. Check the folder path.")
         exit()
 
+    from identity_cache import IdentityCache
+    from live_recognition import LiveRecognizer, annotate
+
     print("📸 Starting webcam...")
     cap = cv2.VideoCapture(0)
+    identity_cache = IdentityCache.from_env()
+    live = LiveRecognizer.from_env(
+        lambda face, track_id: match_face(face, known_faces, cache=identity_cache, track_id=track_id)
+    )
 
     while True:
         ret, frame = cap.read()
@@ -106,20 +383,14 @@ if __name__ == "__main__":
             print("⚠️ Unable to access webcam.")
             break
 
-        result = match_face(frame, known_faces)
-        cv2.putText(
-            frame,
-            result["message"],
-            (50, 50),
-            cv2.FONT_HERSHEY_SIMPLEX,
-            1,
-            (0, 255, 0),
-            2
-        )
+        # Recognition runs in the background on tracked faces only
+        annotate(frame, live.process(frame), (50, 50))
         cv2.imshow("Face Recognition", frame)
 
         if cv2.waitKey(1) & 0xFF == ord('q'):
             break
 
+    live.close()
+    print(f"📦 Identity cache: {identity_cache.stats()}")
     cap.release()
     cv2.destroyAllWindows()
@@ -0,0 +1,217 @@
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+from face_index import index_config_from_env
+from face_recognition_utils import index_from_store, open_face_store
+from face_shards import membership_from_env
+from face_store import IMAGE_EXTENSIONS, identity_of, list_images
+
+FaceSnapshot = namedtuple("FaceSnapshot", ["index", "version"])
+
+
+class NotOnShard(ValueError):
+    """The student belongs to another hash shard than this one."""
+
+
+class FaceRegistry:
+    """Hot-reloadable known-faces index.
+
+    Readers call ``snapshot()`` and get an immutable ``(index, version)``
+    pair; writers build a new index off to the side (copy-on-write) and
+    publish it with a single reference swap, so in-flight matches are never
+    blocked or see a half-updated index. Writers are serialised by a lock
+    and every publish bumps the version.
+
+    On a hash shard (FACE_SHARD_NAME / FACE_SHARD_NODES) only the students
+    the ring assigns to this shard are embedded and indexed, and writes
+    for the other students are refused (or, in bulk, left out).
+    """
+
+    def __init__(self, folder_path, model_name="Facenet512", cache_dir=None):
+        self.folder_path = folder_path
+        self.model_name = model_name
+        self.membership = membership_from_env()
+        # Each hash shard keeps its own store, even on a shared FACE_CACHE_DIR
+        self.store = open_face_store(model_name, cache_dir, self.membership and self.membership.shard)
+        self.index_backend, self.index_params = index_config_from_env()
+        self._write_lock = threading.Lock()
+        self._snapshot = FaceSnapshot(self._build_index(), 0)
+
+    def _build_index(self):
+        return index_from_store(self.store, self.index_backend, self.membership, **self.index_params)
+
+    def snapshot(self):
+        return self._snapshot
+
+    def _updated(self, add=(), embeddings=(), remove=()):
+        """The live index with photos added and removed, once they are saved in the store.
+
+        When the in-memory rows of the live index are due for compaction,
+        the index is rebuilt from the store instead, so it keeps reading
+        the memory-mapped store matrix.
+        """
+        index = self._snapshot.index
+        if index.needs_rebuild(len(add)):
+            return self._build_index()
+        return index.updated(add, embeddings, remove=remove)
+
+    def _publish(self, index):
+        self._snapshot = FaceSnapshot(index, self._snapshot.version + 1)
+        return self._snapshot
+
+    def owns(self, student):
+        """True when this shard indexes ``student`` (always, when not sharded)."""
+        return self.membership is None or self.membership(student)
+
+    def _check_owned(self, student):
+        if not self.owns(student):
+            raise NotOnShard(f"'{student}' belongs to shard '{self.membership.ring.node_for(student)}', "
+                             f"not '{self.membership.shard}'")
+
+    def _filename_for(self, name):
+        """Resolve a student name or filename to the stored filename."""
+        for filename in self.store.names:
+            if filename == name or os.path.splitext(filename)[0] == name:
+                return filename
+        return None
+
+    # ----------- BULK ------------
+    def refresh(self, embed_fn):
+        """Re-sync with the known-faces folder, embedding only changed files."""
+        with self._write_lock:
+            if not os.path.isdir(self.folder_path):
+                print(f"❌ Folder not found: {self.folder_path}")
+                return None
+            summary = self.store.refresh(self.folder_path, embed_fn, include=self.membership)
+            changed = summary["added"] + summary["updated"]
+            if changed or summary["removed"] or self._snapshot.version == 0:
+                if self._snapshot.version == 0:
+                    index = self._build_index()
+                else:
+                    rows = {name: i for i, name in enumerate(self.store.names)}
+                    index = self._updated(
+                        changed, [self.store.matrix[rows[name]] for name in changed], remove=summary["removed"]
+                    )
+                self._publish(index)
+            return summary
+
+    def upsert_photos(self, items):
+        """Store ``(key, sha1, embedding)`` rows of images already copied into the folder.
+
+        Bulk enrollment embeds without the lock and only takes it here, for
+        one upsert, save and publish. Rows of students another shard owns
+        are dropped.
+        """
+        items = [item for item in items if self.owns(identity_of(item[0]))]
+        if not items:
+            return self._snapshot
+        with self._write_lock:
+            self.store.upsert(items)
+            self.store.save()
+            keys = [key for key, _, _ in items]
+            return self._publish(self._updated(keys, [embedding for _, _, embedding in items]))
+
+    # ----------- SINGLE STUDENT ------------
+    def enroll(self, filename, data, embedding):
+        """Add or replace one student's photo and embedding.
+
+        A previous photo of the same student under another extension is
+        dropped in the same publish.
+        """
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            raise ValueError(f"Unsupported image type: {filename}")
+        self._check_owned(identity_of(filename))
+        with self._write_lock:
+            os.makedirs(self.folder_path, exist_ok=True)
+            target = os.path.join(self.folder_path, filename)
+            with open(target + ".tmp", "wb") as fh:
+                fh.write(data)
+            os.replace(target + ".tmp", target)
+
+            previous = self._filename_for(os.path.splitext(filename)[0])
+            stale = [previous] if previous not in (None, filename) else []
+            for old in stale:
+                old_path = os.path.join(self.folder_path, old)
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+            self.store.remove(stale)
+            self.store.upsert([(filename, hashlib.sha1(data).hexdigest(), embedding)])
+            self.store.save()
+            return self._publish(self._updated([filename], [embedding], remove=stale))
+
+    def add_photo(self, name, filename, data, embedding, keep_latest=None, prefix=""):
+        """Add a photo to an enrolled student's gallery (``<folder>/<name>/<filename>``).
+
+        With ``keep_latest``, only that many of the student's gallery photos
+        named ``prefix*`` are kept; names sort by age, oldest dropped first.
+        """
+        if not filename.lower().endswith(IMAGE_EXTENSIONS):
+            raise ValueError(f"Unsupported image type: {filename}")
+        self._check_owned(name)
+        with self._write_lock:
+            gallery = os.path.join(self.folder_path, name)
+            os.makedirs(gallery, exist_ok=True)
+            target = os.path.join(gallery, filename)
+            with open(target + ".tmp", "wb") as fh:
+                fh.write(data)
+            os.replace(target + ".tmp", target)
+
+            key = f"{name}/{filename}"
+            stale = []
+            if keep_latest is not None:
+                siblings = sorted(f for f in self.store.names if f.startswith(f"{name}/{prefix}") and f != key)
+                stale = siblings[:max(0, len(siblings) + 1 - keep_latest)]
+            for old in stale:
+                old_path = os.path.join(self.folder_path, *old.split("/"))
+                if os.path.exists(old_path):
+                    os.remove(old_path)
+            self.store.remove(stale)
+            self.store.upsert([(key, hashlib.sha1(data).hexdigest(), embedding)])
+            self.store.save()
+            return self._publish(self._updated([key], [embedding], remove=stale))
+
+    def photos(self, name):
+        """Stored photo keys of one student."""
+        return [f for f in self.store.names if identity_of(f) == name]
+
+    def remove(self, name):
+        """Delete a student (every photo) by name or filename; returns the new snapshot or None."""
+        with self._write_lock:
+            student = self.identity_for(name)
+            if student is None:
+                return None
+            photos = self.photos(student)
+            for photo in photos:
+                path = os.path.join(self.folder_path, *photo.split("/"))
+                if os.path.exists(path):
+                    os.remove(path)
+            gallery = os.path.join(self.folder_path, student)
+            if os.path.isdir(gallery) and not os.listdir(gallery):
+                os.rmdir(gallery)
+            self.store.remove(photos)
+            self.store.save()
+            return self._publish(self._updated(remove=photos))
+
+    def identity_for(self, name):
+        """Student an enrolled name or filename refers to, or None."""
+        filename = self._filename_for(name)
+        if filename is not None:
+            return identity_of(filename)
+        return name if self.photos(name) else None
+
+    def contains(self, name):
+        return self.identity_for(name) is not None
+
+
+def folder_signature(folder_path):
+    """Cheap change detector for the watcher: (key, size, mtime) of every image and gallery photo."""
+    try:
+        signature = []
+        for key, path in list_images(folder_path).items():
+            stat = os.stat(path)
+            signature.append((key, stat.st_size, stat.st_mtime_ns))
+        return tuple(signature)
+    except FileNotFoundError:
+        return ()
@@ -0,0 +1,225 @@
+"""Sharded face index: consistent-hash routing and scatter-gather search.
+
+The roster can be split across several server processes or nodes
+(shards), each indexing only part of it:
+
+  by campus  every shard runs with its own KNOWN_FACES_DIR
+  by hash    every shard reads the same folder; FACE_SHARD_NODES lists all
+             shard names and FACE_SHARD_NAME is this one. A consistent-hash
+             ring assigns each student to one shard, so adding a shard
+             moves only about 1/N of the students.
+
+A coordinator (a server started with FACE_SHARDS) detects and embeds the
+frame itself, sends the embedding to every shard in parallel and merges
+their top-k lists. A shard that fails or times out is skipped and the
+result is marked partial; replicas of a shard are tried in order.
+"""
+import asyncio
+import bisect
+import hashlib
+import heapq
+import os
+import time
+
+import httpx
+import numpy as np
+from fastapi import APIRouter, Request
+from starlette.responses import JSONResponse
+
+from metrics import REGISTRY
+
+SHARD_CALLS = REGISTRY.counter(
+    "attendance_shard_calls_total", "Coordinator calls to each shard by outcome (ok, error)", ["shard", "result"]
+)
+SHARD_SECONDS = REGISTRY.histogram(
+    "attendance_shard_call_duration_seconds", "Coordinator round trip to each shard", ["shard"]
+)
+
+
+class HashRing:
+    """Consistent hashing of student names onto shard names.
+
+    Each shard owns ``vnodes`` points on the ring; a student belongs to the
+    first point at or after the hash of their name.
+    """
+
+    def __init__(self, nodes, vnodes=64):
+        self.nodes = sorted(set(nodes))
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in self.nodes for i in range(vnodes))
+        self._keys = [key for key, _ in points]
+        self._owners = [node for _, node in points]
+
+    @staticmethod
+    def _hash(value):
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, name):
+        if not self._keys:
+            raise ValueError("Hash ring has no nodes")
+        return self._owners[bisect.bisect(self._keys, self._hash(name)) % len(self._keys)]
+
+
+class ShardMembership:
+    """``membership(student)`` is True for the students ``shard`` indexes."""
+
+    def __init__(self, ring, shard):
+        self.ring = ring
+        self.shard = shard
+
+    def __call__(self, student):
+        return self.ring.node_for(student) == self.shard
+
+
+def membership_from_env():
+    """This process's hash-shard membership, or None when it indexes every student."""
+    nodes = [node.strip() for node in os.environ.get("FACE_SHARD_NODES", "").split(",") if node.strip()]
+    shard = os.environ.get("FACE_SHARD_NAME")
+    if not nodes or not shard:
+        return None
+    if shard not in nodes:
+        raise ValueError(f"FACE_SHARD_NAME '{shard}' is not one of FACE_SHARD_NODES ({', '.join(nodes)})")
+    return ShardMembership(HashRing(nodes, int(os.environ.get("FACE_SHARD_VNODES", 64))), shard)
+
+
+def merge_top_k(lists, k):
+    """Merge per-shard ``(name, distance)`` lists into one top-k, best per name."""
+    best = {}
+    for found in lists:
+        for name, distance in found:
+            if name not in best or distance < best[name]:
+                best[name] = distance
+    return heapq.nsmallest(k, best.items(), key=lambda hit: hit[1])
+
+
+# ----------- SHARD SIDE ------------
+def shard_router(snapshot, shard_name=None):
+    """Routes a coordinator calls on every shard.
+
+    ``snapshot()`` returns the live ``(index, version)``. Queries are sent
+    as raw little-endian float32 bytes (``?k=&dim=``), which is far cheaper
+    to encode and parse than JSON number lists.
+    """
+    router = APIRouter(prefix="/shard")
+    name = shard_name or os.environ.get("FACE_SHARD_NAME") or "local"
+
+    @router.post("/search")
+    async def shard_search(request: Request, k: int = 1, dim: int = 512):
+        """Top-k ``[name, distance]`` pairs per query embedding from this shard."""
+        index, version = snapshot()
+        embeddings = np.frombuffer(await request.body(), dtype="<f4").reshape(-1, dim)
+        results = await asyncio.to_thread(index.search_many, embeddings, k)
+        return JSONResponse({"shard": name, "version": version, "count": len(index), "results": results})
+
+    @router.get("/roster")
+    async def shard_roster():
+        """Students indexed by this shard."""
+        index, version = snapshot()
+        return {"shard": name, "version": version, "count": len(index), "faces": list(index.names)}
+
+    return router
+
+
+# ----------- COORDINATOR ------------
+class ShardUnavailable(Exception):
+    """No shard answered a scatter-gather call."""
+
+
+class ShardCoordinator:
+    """Scatter-gather client over ``{shard: [url, ...]}`` (replicas in order)."""
+
+    def __init__(self, shards, timeout_s=1.0):
+        self.shards = {shard: list(urls) for shard, urls in shards.items()}
+        self.timeout_s = timeout_s
+        # Last index version reported by each shard; a change invalidates cached results
+        self.versions = {}
+        self._client = None
+
+    @classmethod
+    def from_env(cls):
+        """FACE_SHARDS="north=http://10.0.0.5:8000|http://10.0.0.6:8000,south=http://10.0.1.5:8000";
+        None when unset."""
+        spec = os.environ.get("FACE_SHARDS", "").strip()
+        if not spec:
+            return None
+        shards = {}
+        for entry in spec.split(","):
+            shard, _, urls = entry.partition("=")
+            if not urls:
+                raise ValueError(f"FACE_SHARDS entry '{entry}' is not name=url[|url...]")
+            shards[shard.strip()] = [url.strip().rstrip("/") for url in urls.split("|")]
+        return cls(shards, timeout_s=float(os.environ.get("FACE_SHARD_TIMEOUT_MS", 1000)) / 1000)
+
+    def start(self):
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout_s, limits=httpx.Limits(max_keepalive_connections=64 * len(self.shards))
+        )
+
+    async def stop(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def version(self):
+        return tuple(sorted(self.versions.items()))
+
+    async def _call(self, shard, method, path, **kwargs):
+        error = None
+        for url in self.shards[shard]:
+            started = time.perf_counter()
+            try:
+                response = await self._client.request(method, url + path, **kwargs)
+                response.raise_for_status()
+                reply = response.json()
+            except (httpx.HTTPError, ValueError) as e:
+                SHARD_CALLS.inc(shard=shard, result="error")
+                error = e
+                continue
+            SHARD_CALLS.inc(shard=shard, result="ok")
+            SHARD_SECONDS.observe(time.perf_counter() - started, shard=shard)
+            self.versions[shard] = reply.get("version")
+            return reply
+        raise ShardUnavailable(f"Shard {shard} unavailable: {error!r}")
+
+    async def _gather(self, method, path, **kwargs):
+        """Call every shard concurrently; returns ``({shard: reply}, [failed shards])``."""
+        replies = await asyncio.gather(
+            *(self._call(shard, method, path, **kwargs) for shard in self.shards), return_exceptions=True
+        )
+        answered, failed = {}, []
+        for shard, reply in zip(self.shards, replies):
+            if isinstance(reply, Exception):
+                print(f"⚠️ {reply}")
+                failed.append(shard)
+            else:
+                answered[shard] = reply
+        if not answered:
+            raise ShardUnavailable(f"No shard answered ({', '.join(failed)})")
+        return answered, failed
+
+    async def search_many(self, embeddings, k=1):
+        """Top-k per embedding across all shards; returns ``(results, failed shards)``."""
+        queries = np.ascontiguousarray(embeddings, dtype="<f4")
+        queries = queries.reshape(-1, queries.shape[-1]) if queries.size else queries.reshape(0, 0)
+        if not queries.shape[0]:
+            return [], []
+        answered, failed = await self._gather(
+            "POST", "/api/shard/search", content=queries.tobytes(),
+            params={"k": k, "dim": queries.shape[1]},
+            headers={"Content-Type": "application/octet-stream"}
+        )
+        merged = [
+            merge_top_k([reply["results"][i] for reply in answered.values()], k)
+            for i in range(queries.shape[0])
+        ]
+        return merged, failed
+
+    async def search(self, embedding, k=1):
+        results, failed = await self.search_many([embedding], k)
+        return results[0], failed
+
+    async def roster(self):
+        """Students across all shards: ``(names, {shard: count}, failed shards)``."""
+        answered, failed = await self._gather("GET", "/api/shard/roster")
+        names = sorted({name for reply in answered.values() for name in reply["faces"]})
+        return names, {shard: reply["count"] for shard, reply in answered.items()}, failed
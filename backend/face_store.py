@@ -0,0 +1,213 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png')
+# Version 2: every photo is embedded through the quality gate (face_recognition_utils.embed_file)
+STORE_VERSION = 2
+
+
+def identity_of(filename):
+    """Student a stored photo belongs to.
+
+    ``Student.jpg`` is the enrollment photo; more photos of the same student
+    live in a gallery folder as ``Student/<photo>.jpg``.
+    """
+    if "/" in filename:
+        return filename.split("/", 1)[0]
+    return os.path.splitext(filename)[0]
+
+
+def list_images(folder_path):
+    """``{key: path}`` of the images in ``folder_path`` and its gallery folders.
+
+    Keys are filenames, or ``Student/photo.jpg`` inside a student's folder.
+    """
+    images = {}
+    for entry in sorted(os.scandir(folder_path), key=lambda e: e.name):
+        if entry.name.startswith("."):
+            continue
+        if entry.is_dir():
+            for photo in sorted(os.listdir(entry.path)):
+                if photo.lower().endswith(IMAGE_EXTENSIONS) and not photo.startswith("."):
+                    images[f"{entry.name}/{photo}"] = os.path.join(entry.path, photo)
+        elif entry.name.lower().endswith(IMAGE_EXTENSIONS):
+            images[entry.name] = entry.path
+    return images
+
+
+def file_digest(filepath, chunk_size=1 << 20):
+    """Return the SHA-1 hex digest of a file's contents."""
+    digest = hashlib.sha1()
+    with open(filepath, "rb") as fh:
+        for chunk in iter(lambda: fh.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class FaceStore:
+    """Persistent embedding store for the known_faces folder.
+
+    Embeddings live in a float32 ``.npy`` matrix (memory-mapped on load) and
+    a JSON index maps each row to its filename and content hash. One store
+    exists per (model, detector) pair, so switching models never reuses
+    stale vectors, and per ``shard`` so hash shards sharing a cache
+    directory never overwrite each other's rows.
+    """
+
+    def __init__(self, cache_dir, model_name="Facenet512", detector_backend="opencv", shard=None):
+        self.cache_dir = cache_dir
+        self.model_name = model_name
+        self.detector_backend = detector_backend
+        stem = f"{model_name}_{detector_backend}" + (f"_{shard}" if shard else "")
+        self.stem = stem.replace(os.sep, "_")
+        self.matrix_path = os.path.join(cache_dir, f"{self.stem}.npy")
+        self.index_path = os.path.join(cache_dir, f"{self.stem}.json")
+        self.entries = []  # [{"filename": ..., "sha1": ...}], row-aligned
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        self.load()
+
+    # ----------- PERSISTENCE ------------
+    def load(self):
+        """(Re)load the index and memory-map the embedding matrix if present."""
+        self.entries = []
+        self.matrix = np.zeros((0, 0), dtype=np.float32)
+        if not (os.path.exists(self.index_path) and os.path.exists(self.matrix_path)):
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as fh:
+                meta = json.load(fh)
+            if (meta.get("version") != STORE_VERSION
+                    or meta.get("model_name") != self.model_name
+                    or meta.get("detector_backend") != self.detector_backend):
+                return
+            if not meta["entries"]:
+                return
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+            if matrix.shape[0] != len(meta["entries"]):
+                return
+            self.entries = meta["entries"]
+            self.matrix = matrix
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable face cache {self.index_path}: {e}")
+            self.entries = []
+            self.matrix = np.zeros((0, 0), dtype=np.float32)
+
+    def save(self):
+        """Atomically write the matrix and index to disk."""
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Per-process temp names: workers or shards saving at the same time
+        # must never replace the store with each other's half-written file
+        tmp_matrix = f"{self.matrix_path}.{os.getpid()}.tmp.npy"
+        tmp_index = f"{self.index_path}.{os.getpid()}.tmp"
+        np.save(tmp_matrix, np.ascontiguousarray(self.matrix, dtype=np.float32))
+        with open(tmp_index, "w", encoding="utf-8") as fh:
+            json.dump({
+                "version": STORE_VERSION,
+                "model_name": self.model_name,
+                "detector_backend": self.detector_backend,
+                "entries": self.entries,
+            }, fh)
+        os.replace(tmp_matrix, self.matrix_path)
+        os.replace(tmp_index, self.index_path)
+        # Re-open read-only so the in-memory copy is dropped in favour of the mmap
+        if self.entries:
+            self.matrix = np.load(self.matrix_path, mmap_mode="r")
+
+    # ----------- ACCESS ------------
+    def __len__(self):
+        return len(self.entries)
+
+    @property
+    def names(self):
+        return [entry["filename"] for entry in self.entries]
+
+    def as_dict(self):
+        """Return ``{filename: embedding}`` views over the stored matrix."""
+        return {entry["filename"]: self.matrix[i] for i, entry in enumerate(self.entries)}
+
+    # ----------- UPDATES ------------
+    def upsert(self, items):
+        """Insert or replace rows from ``(filename, sha1, embedding)`` tuples.
+
+        Changes are kept in memory until ``save()``.
+        """
+        if not items:
+            return
+        positions = {entry["filename"]: i for i, entry in enumerate(self.entries)}
+        rows = [np.asarray(self.matrix[i], dtype=np.float32) for i in range(len(self.entries))]
+        for filename, sha1, embedding in items:
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if filename in positions:
+                rows[positions[filename]] = embedding
+                self.entries[positions[filename]] = {"filename": filename, "sha1": sha1}
+            else:
+                positions[filename] = len(rows)
+                rows.append(embedding)
+                self.entries.append({"filename": filename, "sha1": sha1})
+        self.matrix = np.vstack(rows)
+
+    def remove(self, filenames):
+        """Drop rows for ``filenames``; returns the names actually removed."""
+        filenames = set(filenames)
+        keep = [i for i, entry in enumerate(self.entries) if entry["filename"] not in filenames]
+        removed = [entry["filename"] for entry in self.entries if entry["filename"] in filenames]
+        if removed:
+            self.entries = [self.entries[i] for i in keep]
+            self.matrix = (np.asarray(self.matrix[keep], dtype=np.float32) if keep
+                           else np.zeros((0, 0), dtype=np.float32))
+        return removed
+
+    # ----------- REFRESH ------------
+    def refresh(self, folder_path, embed_fn, include=None):
+        """Sync the store with ``folder_path`` (including student gallery folders).
+
+        Only new or modified images are passed to ``embed_fn(filepath)``;
+        rows for deleted files are dropped. With ``include(student)`` only
+        those students' images are kept (a hash shard's part of a shared
+        folder). Returns a summary dict.
+        """
+        current = list_images(folder_path)
+        if include is not None:
+            current = {key: path for key, path in current.items() if include(identity_of(key))}
+
+        cached = {entry["filename"]: (i, entry["sha1"]) for i, entry in enumerate(self.entries)}
+        rows, entries = [], []
+        added, updated, unchanged, failed = [], [], [], []
+
+        for filename, filepath in current.items():
+            sha1 = file_digest(filepath)
+            hit = cached.get(filename)
+            if hit is not None and hit[1] == sha1:
+                rows.append(np.asarray(self.matrix[hit[0]], dtype=np.float32))
+                entries.append({"filename": filename, "sha1": sha1})
+                unchanged.append(filename)
+                continue
+            try:
+                embedding = np.asarray(embed_fn(filepath), dtype=np.float32)
+            except Exception as e:
+                print(f"⚠️ Error loading {filename}: {e}")
+                failed.append(filename)
+                continue
+            rows.append(embedding)
+            entries.append({"filename": filename, "sha1": sha1})
+            (updated if hit is not None else added).append(filename)
+            print(f"✅ Embedded: {filename}")
+
+        removed = [name for name in cached if name not in current]
+        changed = added or updated or removed or len(entries) != len(self.entries)
+
+        if changed:
+            self.entries = entries
+            self.matrix = np.vstack(rows) if rows else np.zeros((0, 0), dtype=np.float32)
+            self.save()
+
+        return {
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+            "unchanged": len(unchanged),
+            "failed": failed,
+        }
@@ -3,6 +3,9 @@ import pytesseract
 import os
 from PIL import Image
 
+from ocr_utils import parse_id_card_info
+from roster_index import RosterIndex
+
 def identify():
     # Configure Tesseract
     pytesseract.pytesseract.tesseract_cmd = "/usr/local/bin/tesseract"
@@ -12,6 +15,7 @@ def identify():
     cap = cv2.VideoCapture(0)
     cv2.namedWindow("test")
     img_counter = 0
+    expected = RosterIndex(["MUSMIRATHU SAIMA N"])
 
     print("[INFO] Tesseract:", pytesseract.pytesseract.tesseract_cmd)
     print("[INFO] TESSDATA_PREFIX:", os.environ["TESSDATA_PREFIX"])
@@ -48,7 +52,10 @@ def identify():
             text = pytesseract.image_to_string(Image.open('modified_image.png'), config="--psm 6 --oem 3", lang="eng")
 
             print(f'Text: {text}')
-            if "MUSMIRATHU SAIMA N" in text:
+            info = parse_id_card_info(text)
+            print(f'Name: {info["name"]}  ID: {info["id_number"]}')
+            # Tolerates OCR slips instead of requiring the exact string
+            if info["name"] and expected.match(info["name"]):
                 print("Success")
             else:
                 print("Failed") 
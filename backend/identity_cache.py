@@ -0,0 +1,108 @@
+import os
+import threading
+
+import cv2
+import numpy as np
+from cachetools import TTLCache
+
+_BIT_WEIGHTS = 1 << np.arange(64, dtype=np.uint64)
+
+
+def perceptual_hash(crop):
+    """64-bit difference hash (dHash) of a BGR face crop.
+
+    Each bit says whether a pixel of the 9x8 grey thumbnail is brighter than
+    its left neighbour, so small shifts, recompression and lighting changes
+    flip only a few bits while a different face flips many.
+    """
+    grey = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+    small = cv2.resize(grey, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = (small[:, 1:] > small[:, :-1]).flatten()
+    return int((bits.astype(np.uint64) * _BIT_WEIGHTS).sum())
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class IdentityCache:
+    """Short-lived cache of recognition results for near-duplicate faces.
+
+    Entries are keyed by the perceptual hash of the face crop and expire
+    after ``ttl_s``; when full the least recently used entry is evicted. A
+    lookup hits when a cached hash is within ``max_distance`` bits, or
+    within the looser ``track_distance`` of the last hash seen for the same
+    live-feed ``track_id``. Results are tagged with the roster ``version``
+    they were computed against, so a roster change invalidates them.
+    """
+
+    def __init__(self, maxsize=256, ttl_s=3.0, max_distance=5, track_distance=10):
+        self.enabled = maxsize > 0 and ttl_s > 0
+        self.max_distance = max_distance
+        self.track_distance = track_distance
+        self._entries = TTLCache(maxsize=max(1, maxsize), ttl=ttl_s)
+        self._tracks = TTLCache(maxsize=max(1, maxsize), ttl=ttl_s)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.track_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            maxsize=int(os.environ.get("IDENTITY_CACHE_SIZE", 256)),
+            ttl_s=float(os.environ.get("IDENTITY_CACHE_TTL_S", 3.0)),
+            max_distance=int(os.environ.get("IDENTITY_CACHE_MAX_DISTANCE", 5)),
+            track_distance=int(os.environ.get("IDENTITY_CACHE_TRACK_DISTANCE", 10)),
+        )
+
+    def lookup(self, phash, track_id=None, version=None):
+        """Return a cached result for a near-duplicate face, or None."""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if track_id is not None:
+                entry = self._tracks.get(track_id)
+                if entry is not None and entry[2] == version and hamming(entry[0], phash) <= self.track_distance:
+                    self.hits += 1
+                    self.track_hits += 1
+                    return entry[1]
+
+            self._entries.expire()
+            best, best_distance = None, self.max_distance + 1
+            for cached_hash, (result, cached_version) in self._entries.items():
+                distance = hamming(cached_hash, phash)
+                if distance < best_distance and cached_version == version:
+                    best, best_distance = cached_hash, distance
+            if best is None:
+                self.misses += 1
+                return None
+            # Reading through __getitem__ refreshes the entry's LRU position
+            result = self._entries[best][0]
+            self.hits += 1
+            if track_id is not None:
+                self._tracks[track_id] = (phash, result, version)
+            return result
+
+    def store(self, phash, result, track_id=None, version=None):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._entries[phash] = (result, version)
+            if track_id is not None:
+                self._tracks[track_id] = (phash, result, version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._tracks.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "track_hits": self.track_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,119 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from metrics import POOL_SATURATED, POOL_SECONDS
+
+
+class PoolSaturated(Exception):
+    """Raised when an inference pool already holds its maximum backlog."""
+
+    def __init__(self, name, capacity):
+        super().__init__(f"{name} pool is saturated ({capacity} requests in flight)")
+        self.name = name
+        self.capacity = capacity
+
+
+def _timed_call(fn, args, kwargs):
+    """Run ``fn`` and report when it started/finished (monotonic clock).
+
+    Module-level so it can be pickled into a process pool; ``perf_counter``
+    is system-wide monotonic, so worker timestamps compare with the parent's.
+    """
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, started, time.perf_counter()
+
+
+class InferencePool:
+    """Bounded executor for blocking inference work called from asyncio.
+
+    At most ``workers + queue_size`` calls may be in flight; beyond that
+    ``run`` raises PoolSaturated immediately instead of queueing without
+    limit, so callers can shed load with a 503.
+    """
+
+    def __init__(self, name, executor, workers, queue_size):
+        self.name = name
+        self.executor = executor
+        self.workers = workers
+        self.capacity = workers + queue_size
+        self.in_flight = 0
+
+    async def run(self, fn, *args, **kwargs):
+        """Run ``fn`` on the pool; returns ``(result, timings)``."""
+        if self.in_flight >= self.capacity:
+            POOL_SATURATED.inc(pool=self.name)
+            raise PoolSaturated(self.name, self.capacity)
+
+        loop = asyncio.get_running_loop()
+        self.in_flight += 1
+        submitted = time.perf_counter()
+        try:
+            result, started, finished = await loop.run_in_executor(
+                self.executor, _timed_call, fn, args, kwargs
+            )
+        finally:
+            self.in_flight -= 1
+
+        POOL_SECONDS.observe(started - submitted, pool=self.name, phase="queue")
+        POOL_SECONDS.observe(finished - started, pool=self.name, phase="compute")
+        return result, {
+            "queue_ms": round((started - submitted) * 1000, 2),
+            "compute_ms": round((finished - started) * 1000, 2),
+        }
+
+    @property
+    def queued(self):
+        return max(0, self.in_flight - self.workers)
+
+    def stats(self):
+        return {
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+        }
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+def create_face_pool(initializer=None, initargs=()):
+    """Pool for face embedding work.
+
+    INFERENCE_FACE_EXECUTOR selects "process" (default; each worker loads
+    its own model through ``initializer``) or "thread".
+    """
+    cpus = os.cpu_count() or 1
+    kind = os.environ.get("INFERENCE_FACE_EXECUTOR", "process").lower()
+    workers = _env_int("INFERENCE_FACE_WORKERS", max(1, cpus // 2))
+    queue_size = _env_int("INFERENCE_FACE_QUEUE", 4 * workers)
+
+    if kind == "thread":
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="face")
+    else:
+        # TensorFlow is not fork-safe, so workers are spawned fresh
+        executor = ProcessPoolExecutor(
+            max_workers=workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer,
+            initargs=initargs,
+        )
+    return InferencePool("face", executor, workers, queue_size)
+
+
+def create_ocr_pool():
+    """Thread pool for Tesseract OCR (the work runs in a subprocess, so the GIL is free)."""
+    cpus = os.cpu_count() or 1
+    workers = _env_int("INFERENCE_OCR_WORKERS", cpus)
+    queue_size = _env_int("INFERENCE_OCR_QUEUE", 4 * workers)
+    executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ocr")
+    return InferencePool("ocr", executor, workers, queue_size)
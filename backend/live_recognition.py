@@ -0,0 +1,172 @@
+import itertools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+
+def _iou(a, b):
+    ax, ay, aw, ah = a
+    bx, by, bw, bh = b
+    ix = max(0, min(ax + aw, bx + bw) - max(ax, bx))
+    iy = max(0, min(ay + ah, by + bh) - max(ay, by))
+    inter = ix * iy
+    union = aw * ah + bw * bh - inter
+    return inter / union if union else 0.0
+
+
+class Track:
+    def __init__(self, track_id, box):
+        self.track_id = track_id
+        self.box = box
+        self.missed = 0
+        self.result = None
+        self.recognized_at = None
+
+
+class FaceTracker:
+    """Cheap face tracker for live video.
+
+    A Haar cascade runs on a downscaled grey frame every ``detect_every``
+    frames; detections are matched to existing tracks by box overlap (IoU),
+    unmatched detections start new tracks and tracks unseen for
+    ``max_missed`` detections are dropped. Between detections the last
+    boxes are reused.
+    """
+
+    def __init__(self, detect_every=3, detect_width=320, iou_threshold=0.3, max_missed=3):
+        self.detect_every = max(1, detect_every)
+        self.detect_width = detect_width
+        self.iou_threshold = iou_threshold
+        self.max_missed = max_missed
+        self.tracks = []
+        self._frames = 0
+        self._ids = itertools.count(1)
+        self._cascade = cv2.CascadeClassifier(
+            os.path.join(cv2.data.haarcascades, "haarcascade_frontalface_default.xml")
+        )
+
+    def _detect(self, frame):
+        scale = min(1.0, self.detect_width / frame.shape[1])
+        grey = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        if scale < 1:
+            grey = cv2.resize(grey, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+        boxes = self._cascade.detectMultiScale(grey, scaleFactor=1.2, minNeighbors=5, minSize=(24, 24))
+        return [tuple(int(v / scale) for v in box) for box in boxes]
+
+    def update(self, frame):
+        """Advance one frame; returns ``(tracks, new_tracks)``."""
+        self._frames += 1
+        if (self._frames - 1) % self.detect_every:
+            return self.tracks, []
+
+        new_tracks, unmatched = [], list(self.tracks)
+        for box in self._detect(frame):
+            best = max(unmatched, key=lambda t: _iou(t.box, box), default=None)
+            if best is not None and _iou(best.box, box) >= self.iou_threshold:
+                best.box, best.missed = box, 0
+                unmatched.remove(best)
+            else:
+                track = Track(next(self._ids), box)
+                self.tracks.append(track)
+                new_tracks.append(track)
+        for track in unmatched:
+            track.missed += 1
+        self.tracks = [t for t in self.tracks if t.missed <= self.max_missed]
+        return self.tracks, new_tracks
+
+
+class LiveRecognizer:
+    """Run recognition off the capture loop for live webcam feeds.
+
+    ``process(frame)`` never blocks on the model: it updates the tracker
+    and, when the single background worker is idle, hands it a crop around
+    a face that has no label yet or was last recognized more than
+    ``refresh_s`` ago, as ``recognize_fn(crop, track_id)``. Results stick to their track,
+    so labels carry over between recognitions; frames without a face are
+    never sent to the model.
+    """
+
+    def __init__(self, recognize_fn, tracker=None, refresh_s=2.0):
+        self.recognize_fn = recognize_fn
+        self.tracker = tracker or FaceTracker()
+        self.refresh_s = refresh_s
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="live-recognition")
+        self._pending = None
+        self._pending_track = None
+
+    @classmethod
+    def from_env(cls, recognize_fn):
+        return cls(
+            recognize_fn,
+            tracker=FaceTracker(detect_every=int(os.environ.get("FACE_LIVE_DETECT_EVERY", 3))),
+            refresh_s=float(os.environ.get("FACE_LIVE_REFRESH_S", 2.0)),
+        )
+
+    def _collect(self):
+        if self._pending is None or not self._pending.done():
+            return
+        track, future = self._pending_track, self._pending
+        self._pending = self._pending_track = None
+        try:
+            track.result = future.result()
+        except Exception as e:
+            track.result = {"success": False, "message": f"⚠️ Error during face match: {e}"}
+        track.recognized_at = time.monotonic()
+
+    def _due(self, tracks):
+        """The track most in need of recognition, if any."""
+        now = time.monotonic()
+        unlabeled = [t for t in tracks if t.recognized_at is None]
+        if unlabeled:
+            return unlabeled[0]
+        stale = [t for t in tracks if now - t.recognized_at >= self.refresh_s]
+        return min(stale, key=lambda t: t.recognized_at, default=None)
+
+    @staticmethod
+    def _crop(frame, box, margin=0.5):
+        """The track's box plus ``margin`` on every side, so the face detector has context."""
+        x, y, w, h = box
+        dx, dy = int(w * margin), int(h * margin)
+        return frame[max(0, y - dy):y + h + dy, max(0, x - dx):x + w + dx].copy()
+
+    def process(self, frame):
+        """Return the current tracks (``box``/``result``) for this frame."""
+        self._collect()
+        tracks, _ = self.tracker.update(frame)
+        if self._pending is None:
+            track = self._due(tracks)
+            if track is not None:
+                self._pending_track = track
+                self._pending = self._executor.submit(
+                    self.recognize_fn, self._crop(frame, track.box), track.track_id
+                )
+        return tracks
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+def result_label(result):
+    """Overlay text for a recognition result (dict from match_face or a string)."""
+    if result is None:
+        return "Recognizing..."
+    if isinstance(result, str):
+        return result
+    if result.get("success"):
+        return f"{result['name']} ({result['confidence']}%)"
+    return result.get("message", "")
+
+
+def annotate(frame, tracks, origin=(30, 40)):
+    """Draw every tracked face with its current label."""
+    if not tracks:
+        cv2.putText(frame, "No face detected", origin, cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+        return frame
+    for track in tracks:
+        x, y, w, h = track.box
+        cv2.rectangle(frame, (x, y), (x + w, y + h), (0, 255, 0), 2)
+        cv2.putText(frame, result_label(track.result), (x, max(30, y - 10)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 1, (0, 255, 0), 2)
+    return frame
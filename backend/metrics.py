@@ -0,0 +1,233 @@
+import contextvars
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        (name, str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"'))
+        for name, value in labels
+    )
+    return "{" + ",".join(f'{name}="{value}"' for name, value in escaped) + "}"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple((name, str(labels.get(name, ""))) for name in self.labelnames)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(f"{name}{_format_labels(labels)} {_format_value(value)}" for name, labels, value in self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for labels, value in items:
+            yield self.name, labels, value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            counts = self._values.get(key)
+            if counts is None:
+                counts = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[0][i] += 1
+                    break
+            counts[1] += value
+            counts[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((labels, (list(b), s, c)) for labels, (b, s, c) in self._values.items())
+        for labels, (buckets, total, count) in items:
+            cumulative = 0
+            for bound, bucket in zip(self.buckets, buckets):
+                cumulative += bucket
+                yield f"{self.name}_bucket", labels + (("le", _format_value(bound)),), cumulative
+            yield f"{self.name}_sum", labels, total
+            yield f"{self.name}_count", labels, count
+
+
+class Gauge(_Metric):
+    """A value read when the metrics are scraped.
+
+    ``fn`` returns a number, or a ``{label value(s): number}`` dict for a
+    labelled gauge (single label values may be given bare).
+    """
+
+    def __init__(self, name, help_text, fn, labelnames=(), kind="gauge"):
+        super().__init__(name, help_text, labelnames)
+        self.fn = fn
+        # "counter" for running totals kept elsewhere (e.g. cache hit counts)
+        self.kind = kind
+
+    def samples(self):
+        try:
+            values = self.fn()
+        except Exception:
+            return
+        if not isinstance(values, dict):
+            yield self.name, (), values
+            return
+        for label_values, value in sorted(values.items(), key=lambda item: str(item[0])):
+            if not isinstance(label_values, tuple):
+                label_values = (label_values,)
+            yield self.name, tuple(zip(self.labelnames, map(str, label_values))), value
+
+
+class Registry:
+    """Named metrics rendered together in the Prometheus text format."""
+
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def _register(self, metric):
+        with self._lock:
+            # Re-registering a name (module reload, a second app) replaces it
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def gauge(self, name, help_text, fn, labelnames=(), kind="gauge"):
+        return self._register(Gauge(name, help_text, fn, labelnames, kind))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return "\n".join(metric.render() for metric in metrics) + "\n"
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.histogram(
+    "attendance_stage_duration_seconds", "Time spent in each check-in pipeline stage", ["stage"]
+)
+POOL_SECONDS = REGISTRY.histogram(
+    "attendance_pool_duration_seconds", "Inference pool queue wait and compute time per call", ["pool", "phase"]
+)
+FACE_RESULTS = REGISTRY.counter(
+    "attendance_face_results_total", "Face recognition outcomes (match, no_match, rejected, error)", ["result"]
+)
+FACE_REJECTIONS = REGISTRY.counter(
+    "attendance_face_rejections_total", "Frames turned away by the quality gate", ["reason"]
+)
+OCR_RESULTS = REGISTRY.counter(
+    "attendance_ocr_results_total", "ID card OCR outcomes (regions, full_page, no_text, decode_failed, error)", ["result"]
+)
+ERRORS = REGISTRY.counter("attendance_errors_total", "Unexpected errors per stage", ["stage"])
+POOL_SATURATED = REGISTRY.counter(
+    "attendance_pool_saturated_total", "Calls refused because an inference pool was full", ["pool"]
+)
+HTTP_REQUESTS = REGISTRY.counter(
+    "attendance_http_requests_total", "HTTP requests by route and status", ["method", "route", "status"]
+)
+HTTP_SECONDS = REGISTRY.histogram(
+    "attendance_http_request_duration_seconds", "HTTP request latency by route", ["method", "route"]
+)
+
+# Stage timings of the current request, for the optional Server-Timing header
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def observe(stage, seconds):
+    """Record ``seconds`` spent in ``stage`` (and on the current request, if tracked)."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+@contextmanager
+def timed(stage, expected=()):
+    """Time the block as ``stage``.
+
+    An exception escaping the block counts as an error of that stage,
+    unless it is one of the ``expected`` types (e.g. a quality rejection).
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except Exception as e:
+        if not isinstance(e, expected):
+            ERRORS.inc(stage=stage)
+        raise
+    finally:
+        observe(stage, time.perf_counter() - started)
+
+
+def annotate(stage, seconds):
+    """Add ``stage`` to the current request's timings only (no histogram sample)."""
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[stage] = timings.get(stage, 0.0) + seconds
+
+
+def track_request():
+    """Start collecting stage timings for the current request; returns the dict they land in."""
+    timings = {}
+    _request_timings.set(timings)
+    return timings
+
+
+def server_timing(timings, total=None):
+    """``Server-Timing`` header value (milliseconds) for collected stage timings."""
+    entries = [f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in timings.items()]
+    if total is not None:
+        entries.append(f"total;dur={total * 1000:.2f}")
+    return ", ".join(entries)
+
+
+def render():
+    return REGISTRY.render()
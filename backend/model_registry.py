@@ -0,0 +1,68 @@
+import threading
+import time
+
+import numpy as np
+
+_lock = threading.Lock()
+_models = {}
+_warm = {}
+
+
+def deepface():
+    """The DeepFace API, imported on first use.
+
+    Importing it loads TensorFlow (seconds and hundreds of MB), so
+    processes and code paths that never run a model do not pay for it.
+    """
+    from deepface import DeepFace
+    return DeepFace
+
+
+def get_face_model(model_name="Facenet512"):
+    """Return the process-wide recognition model, building it on first use.
+
+    DeepFace caches built models, but two threads racing on a cold cache
+    would each load the weights; the lock makes construction happen once.
+    """
+    key = ("facial_recognition", model_name)
+    with _lock:
+        if key not in _models:
+            _models[key] = deepface().build_model(model_name)
+        return _models[key]
+
+
+def get_face_detector(detector_backend="opencv"):
+    """Return the process-wide face detector, building it on first use."""
+    key = ("face_detector", detector_backend)
+    with _lock:
+        if key not in _models:
+            _models[key] = deepface().build_model(detector_backend, task="face_detector")
+        return _models[key]
+
+
+def warm_up(model_name="Facenet512", detector_backend="opencv"):
+    """Build the model and detector and run one dummy inference.
+
+    The first forward pass pays TensorFlow graph tracing; doing it here keeps
+    that cost off the first real request. Returns the warm-up time in ms.
+    """
+    key = (model_name, detector_backend)
+    if _warm.get(key) is not None:
+        return _warm[key]
+
+    started = time.perf_counter()
+    get_face_model(model_name)
+    get_face_detector(detector_backend)
+    dummy = np.random.default_rng(0).integers(0, 255, size=(224, 224, 3), dtype=np.uint8)
+    deepface().represent(
+        img_path=dummy,
+        model_name=model_name,
+        detector_backend=detector_backend,
+        enforce_detection=False
+    )
+    _warm[key] = round((time.perf_counter() - started) * 1000, 2)
+    return _warm[key]
+
+
+def is_warm(model_name="Facenet512", detector_backend="opencv"):
+    return _warm.get((model_name, detector_backend)) is not None
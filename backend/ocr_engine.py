@@ -0,0 +1,223 @@
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+try:
+    # Optional: binds libtesseract in-process, so no subprocess or temp files per call
+    import tesserocr
+    from PIL import Image
+except ImportError:
+    tesserocr = None
+
+# ISO/IEC 7810 ID-1 (bank card sized) ID cards are 85.6 mm wide
+CARD_WIDTH_IN = 3.37
+# The original whole-card configuration, kept as the fallback
+FULL_PAGE_CONFIG = "--oem 3 --psm 6"
+
+REGIONS = "regions"
+FULL_PAGE = "full_page"
+
+
+def tesseract():
+    """pytesseract, imported on first use (it pulls in pandas).
+
+    TESSERACT_CMD, when set, is the tesseract binary it runs.
+    """
+    import pytesseract
+    if os.environ.get("TESSERACT_CMD"):
+        pytesseract.pytesseract.tesseract_cmd = os.environ["TESSERACT_CMD"]
+    return pytesseract
+
+
+def find_card(grey):
+    """Bounding box of the ID card in a photo, or None if it fills the frame.
+
+    Looks for the largest four-sided contour covering at least a fifth of
+    the image with a card-like aspect ratio.
+    """
+    scale = min(1.0, 640 / max(grey.shape[:2]))
+    small = cv2.resize(grey, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    edges = cv2.dilate(cv2.Canny(cv2.GaussianBlur(small, (5, 5), 0), 30, 90), None)
+    contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    best = None
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < 0.2 * small.size or area > 0.95 * small.size:
+            continue
+        approx = cv2.approxPolyDP(contour, 0.02 * cv2.arcLength(contour, True), True)
+        x, y, w, h = cv2.boundingRect(approx)
+        if len(approx) == 4 and 1.3 <= max(w, h) / min(w, h) <= 1.9 and (best is None or area > best[0]):
+            best = (area, (x, y, w, h))
+    if best is None:
+        return None
+    return tuple(int(round(v / scale)) for v in best[1])
+
+
+def normalize_dpi(grey, dpi, max_upscale=2.0):
+    """Resize a card image so its width corresponds to ``dpi``.
+
+    Phone photos of a card are often 800+ DPI, far more than Tesseract
+    needs; small webcam crops are upscaled (at most ``max_upscale``).
+    """
+    scale = min(max_upscale, dpi * CARD_WIDTH_IN / grey.shape[1])
+    if abs(scale - 1) < 0.05:
+        return grey, 1.0
+    interpolation = cv2.INTER_AREA if scale < 1 else cv2.INTER_CUBIC
+    return cv2.resize(grey, None, fx=scale, fy=scale, interpolation=interpolation), scale
+
+
+def find_text_regions(grey, dpi):
+    """Boxes ``(x, y, w, h)`` of the text lines on a card normalized to ``dpi``.
+
+    Characters light up in the morphological gradient; a wide horizontal
+    closing joins the characters of a line into one blob. Blobs that are
+    too tall, too short or too sparse to be a line of text (the photo, the
+    card edge, specks) are dropped. Boxes come back in reading order.
+    """
+    unit = dpi / 300
+    gradient = cv2.morphologyEx(grey, cv2.MORPH_GRADIENT, cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3)))
+    _, mask = cv2.threshold(gradient, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    # Card edges and printed rules would chain every line into one blob
+    height, width = mask.shape
+    rules = cv2.morphologyEx(mask, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (width // 4, 1)))
+    rules |= cv2.morphologyEx(mask, cv2.MORPH_OPEN, cv2.getStructuringElement(cv2.MORPH_RECT, (1, height // 4)))
+    mask = cv2.subtract(mask, cv2.dilate(rules, None))
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(3, int(25 * unit)), max(1, int(3 * unit))))
+    lines = cv2.morphologyEx(mask, cv2.MORPH_CLOSE, kernel)
+    contours, _ = cv2.findContours(lines, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+
+    min_height, max_height = 12 * unit, 0.15 * height
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        if not min_height <= h <= max_height or w < 1.5 * h:
+            continue
+        if cv2.countNonZero(mask[y:y + h, x:x + w]) < 0.25 * w * h:
+            continue
+        boxes.append((x, y, w, h))
+    # Reading order: top to bottom, then left to right within a line
+    return sorted(boxes, key=lambda b: (round((b[1] + b[3] / 2) / (20 * unit)), b[0]))
+
+
+def binarize(region, pad=10):
+    """Black text on white for one line, padded so glyphs do not touch the edge."""
+    _, bw = cv2.threshold(region, 0, 255, cv2.THRESH_BINARY | cv2.THRESH_OTSU)
+    if cv2.countNonZero(bw) < bw.size / 2:
+        bw = cv2.bitwise_not(bw)  # light text on a dark band
+    return cv2.copyMakeBorder(bw, pad, pad, pad, pad, cv2.BORDER_CONSTANT, value=255)
+
+
+def stack_lines(lines, gap=12):
+    """One white strip holding ``lines`` one under the other, left aligned."""
+    width = max(line.shape[1] for line in lines)
+    rows = []
+    for line in lines:
+        rows.append(cv2.copyMakeBorder(line, 0, gap, 0, width - line.shape[1], cv2.BORDER_CONSTANT, value=255))
+    return np.vstack(rows)
+
+
+class OcrEngine:
+    """Tesseract OCR tuned for ID cards.
+
+    ``read`` crops the card out of the photo, resizes it to ``dpi``, finds
+    its text lines and recognizes them on a shared pool of ``workers``
+    threads: the lines are split into one strip per worker so each
+    Tesseract call sees only text. With ``tesserocr`` installed every
+    thread keeps its own in-process Tesseract API; otherwise ``pytesseract``
+    starts one subprocess per strip. When no lines are found, or they yield
+    no text, the whole image goes through the original ``--oem 3 --psm 6``
+    path.
+    """
+
+    def __init__(self, dpi=300, workers=2, lang="eng", mode=REGIONS):
+        self.dpi = dpi
+        self.workers = max(1, workers)
+        self.lang = lang
+        self.mode = mode
+        self.backend = "tesserocr" if tesserocr is not None else "pytesseract"
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="ocr-region")
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        cpus = os.cpu_count() or 1
+        return cls(
+            dpi=int(os.environ.get("OCR_DPI", 300)),
+            workers=int(os.environ.get("OCR_REGION_WORKERS", min(4, cpus))),
+            lang=os.environ.get("OCR_LANG", "eng"),
+            # Regions stay opt-in until bench_ocr.py has measured them against the full page
+            mode=os.environ.get("OCR_MODE", FULL_PAGE),
+        )
+
+    def _api(self):
+        api = getattr(self._local, "api", None)
+        if api is None:
+            kwargs = {"lang": self.lang, "psm": tesserocr.PSM.SINGLE_BLOCK}
+            if os.environ.get("TESSDATA_PREFIX"):
+                kwargs["path"] = os.environ["TESSDATA_PREFIX"]
+            api = self._local.api = tesserocr.PyTessBaseAPI(**kwargs)
+        return api
+
+    def recognize(self, image):
+        """Text of one uniform block of text (``--psm 6``)."""
+        if tesserocr is not None:
+            api = self._api()
+            api.SetImage(Image.fromarray(image))
+            return api.GetUTF8Text()
+        return tesseract().image_to_string(image, config=FULL_PAGE_CONFIG, lang=self.lang)
+
+    def read_full_page(self, grey):
+        """The original path: adaptive threshold over the whole image."""
+        processed = cv2.adaptiveThreshold(grey, 255, cv2.ADAPTIVE_THRESH_GAUSSIAN_C, cv2.THRESH_BINARY, 11, 2)
+        return self.recognize(processed).strip()
+
+    def locate_lines(self, grey):
+        """Crop the card, resize it to ``dpi`` and return ``(card, line_boxes)``."""
+        card = find_card(grey)
+        if card is not None:
+            x, y, w, h = card
+            grey = grey[y:y + h, x:x + w]
+        grey, _ = normalize_dpi(grey, self.dpi)
+        return grey, find_text_regions(grey, self.dpi)
+
+    def read_regions(self, grey):
+        """Return ``(text, lines_found)``; text is "" when no lines are found."""
+        grey, boxes = self.locate_lines(grey)
+        if not boxes:
+            return "", 0
+
+        lines = [binarize(grey[y:y + h, x:x + w]) for x, y, w, h in boxes]
+        per_strip = -(-len(lines) // self.workers)
+        strips = [stack_lines(lines[i:i + per_strip]) for i in range(0, len(lines), per_strip)]
+        texts = self._executor.map(self.recognize, strips)
+        return "\n".join(t.strip() for t in texts if t.strip()), len(boxes)
+
+    def read(self, grey):
+        """Return ``(text, details)`` for a greyscale card image."""
+        details = {"method": FULL_PAGE, "backend": self.backend, "regions": 0}
+        if self.mode == REGIONS:
+            text, details["regions"] = self.read_regions(grey)
+            if text:
+                details["method"] = REGIONS
+                return text, details
+        return self.read_full_page(grey), details
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+_default_engine = None
+_default_lock = threading.Lock()
+
+
+def default_engine():
+    """Process-wide engine configured from the OCR_* environment variables."""
+    global _default_engine
+    with _default_lock:
+        if _default_engine is None:
+            _default_engine = OcrEngine.from_env()
+    return _default_engine
@@ -1,55 +1,54 @@
 import cv2
 import numpy as np
-import pytesseract
 from pathlib import Path
 import os
 
-pytesseract.pytesseract.tesseract_cmd = "/usr/local/bin/tesseract"
+from card_templates import load_templates, parse_card
+from metrics import OCR_RESULTS, timed
+from ocr_engine import default_engine
+
+os.environ.setdefault("TESSERACT_CMD", "/usr/local/bin/tesseract")
 os.environ["TESSDATA_PREFIX"] = "/Users/admin/Downloads/MLBASEDATTENDANCESYSTEMOCRIDFEATURE/tessdata"
 
 def extract_text_from_id_card(image_bytes):
     """Extract text from ID card image using OCR"""
     try:
         # Convert bytes to numpy array
-        nparr = np.frombuffer(image_bytes, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
+        with timed("ocr_decode"):
+            nparr = np.frombuffer(image_bytes, np.uint8)
+            image = cv2.imdecode(nparr, cv2.IMREAD_GRAYSCALE)
         
         if image is None:
+            OCR_RESULTS.inc(result="decode_failed")
             return {
                 "success": False,
                 "message": "Failed to decode image",
                 "text": " "
             }
         
-        # Preprocess image for better OCR
-        processed_img = cv2.adaptiveThreshold(
-            image, 255,
-            cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-            cv2.THRESH_BINARY, 11, 2
-        )
-        
-        # Apply OCR
-        custom_config = r'--oem 3 --psm 6'
-        text = pytesseract.image_to_string(
-            processed_img, 
-            config=custom_config, 
-            lang='eng'
-        )
+        # Crop the card's text lines and OCR them in parallel; falls back to
+        # the whole-image --oem 3 --psm 6 pass (see ocr_engine.py)
+        with timed("ocr"):
+            text, details = default_engine().read(image)
         
         if not text.strip():
+            OCR_RESULTS.inc(result="no_text")
             return {
                 "success": False,
                 "message": "No text detected in image",
                 "text": " "
             }
         
+        OCR_RESULTS.inc(result=details["method"])
         return {
             "success": True,
             "message": "✅ Text extracted successfully",
-            "text": text.strip()
+            "text": text.strip(),
+            "ocr": details
         }
         
     except Exception as e:
+        OCR_RESULTS.inc(result="error")
         return {
             "success": False,
             "message": f"⚠️ Error during OCR: {str(e)}",
@@ -58,34 +57,17 @@ def extract_text_from_id_card(image_bytes):
         }
 
 
-def parse_id_card_info(text):
-    """Parse extracted text to find common ID card fields"""
-    info = {
-        "name": None,
-        "id_number": None,
-        "raw_text": text
-    }
-    
-    lines = text.split()
-    
-    # Simple parsing logic - can be enhanced based on ID card format
-    for i, line in enumerate(lines):
-        line = line.strip()
-        if not line:
-            continue
-            
-        # Look for name patterns
-        if any(keyword in line.upper() for keyword in ['NAME', 'NOME', 'NAAM']):
-            if i + 1 < len(lines):
-                info['name'] = lines[i + 1].strip()
-            elif ':' in line:
-                info['name'] = line.split(':', 1)[1].strip()
-        
-        # Look for ID number patterns
-        if any(keyword in line.upper() for keyword in ['ID', 'NUMBER', 'NO.']):
-            if i + 1 < len(lines):
-                info['id_number'] = lines[i + 1].strip()
-            elif ':' in line:
-                info['id_number'] = line.split(':', 1)[1].strip()
-    
+_templates = None
+
+
+def parse_id_card_info(text, templates=None):
+    """Parse extracted text into ID card fields using the card templates (see card_templates.py)"""
+    global _templates
+    if templates is None:
+        if _templates is None:
+            _templates = load_templates()
+        templates = _templates
+
+    info = parse_card(text, templates)
+    info["raw_text"] = text
     return info
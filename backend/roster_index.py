@@ -0,0 +1,100 @@
+import re
+from collections import Counter
+
+NGRAM = 3
+
+
+def normalize_name(name):
+    """Upper-case letters and single spaces: ``Musmirathu_Saima`` -> ``MUSMIRATHU SAIMA``."""
+    return " ".join(re.sub(r"[^A-Z]+", " ", name.upper()).split())
+
+
+def ngrams(key, n=NGRAM):
+    """Distinct character n-grams of ``key``, padded so the ends count too."""
+    padded = "^" * (n - 1) + key + "$" * (n - 1)
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+def levenshtein(a, b, max_distance=None):
+    """Edit distance between two strings (insertions, deletions, substitutions).
+
+    With ``max_distance`` the computation stops as soon as the distance is
+    known to exceed it and returns ``max_distance + 1``.
+    """
+    if len(a) < len(b):
+        a, b = b, a
+    if max_distance is not None and len(a) - len(b) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if max_distance is not None and min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+
+class RosterIndex:
+    """Fuzzy lookup of OCR'd names against the enrolled roster.
+
+    Names are normalized (case, punctuation, ``_`` separators) and indexed
+    by their character trigrams. One edit destroys at most three of a
+    name's trigrams, so a roster name within ``k`` edits of the query must
+    share all but ``3k`` of the query's trigrams: only the few names that
+    pass that count are checked with the exact edit distance. ``match``
+    allows roughly one edit per five characters to absorb OCR slips.
+    """
+
+    def __init__(self, names):
+        self.names = {}
+        for name in names:
+            key = normalize_name(name)
+            if key:
+                self.names.setdefault(key, []).append(name)
+        self.keys = list(self.names)
+        self.postings = {}
+        for i, key in enumerate(self.keys):
+            for gram in ngrams(key):
+                self.postings.setdefault(gram, []).append(i)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def candidates(self, key, max_distance):
+        """Roster keys sharing enough trigrams with ``key`` to be within ``max_distance``."""
+        grams = ngrams(key)
+        shared = Counter()
+        for gram in grams:
+            shared.update(self.postings.get(gram, ()))
+        needed = len(grams) - NGRAM * max_distance
+        if needed <= 0:
+            return self.keys
+        return [self.keys[i] for i, count in shared.items() if count >= needed]
+
+    def search(self, name, max_distance):
+        """``(distance, roster_key)`` pairs within ``max_distance``, closest first.
+
+        The name is also tried without single-letter initials, which cards
+        print and rosters often leave out.
+        """
+        key = normalize_name(name or "")
+        variants = {key, " ".join(part for part in key.split() if len(part) > 1)} - {""}
+        found = {}
+        for variant in variants:
+            for candidate in self.candidates(variant, max_distance):
+                distance = levenshtein(variant, candidate, max_distance)
+                if distance <= max_distance and distance < found.get(candidate, max_distance + 1):
+                    found[candidate] = distance
+        return sorted((distance, candidate) for candidate, distance in found.items())
+
+    def match(self, name, max_distance=None):
+        """Best roster entry for ``name`` as ``{"name", "distance"}``, or None."""
+        if max_distance is None:
+            max_distance = max(1, len(normalize_name(name or "")) // 5)
+        found = self.search(name, max_distance)
+        if not found:
+            return None
+        distance, best = found[0]
+        return {"name": self.names[best][0], "distance": distance}
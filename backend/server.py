@@ -1,30 +1,86 @@
-from fastapi import FastAPI, APIRouter, File, UploadFile, HTTPException
+from fastapi import FastAPI, APIRouter, File, Form, Header, UploadFile, HTTPException
 from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse, Response
 from motor.motor_asyncio import AsyncIOMotorClient
 from dotenv import load_dotenv
 from pathlib import Path
 from pydantic import BaseModel, Field, ConfigDict
 from typing import List, Optional
-from datetime import datetime, timezone
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timezone
+import asyncio
 import uuid
 import os
+import shutil
+import tempfile
+import time
 import logging
 import uvicorn
 
-from face_recognition_utils import load_known_faces, match_face
+from cachetools import TTLCache
+
+from attendance_counters import AttendanceCounters
+from attendance_stats import attendance_stats, prepare_attendance_collection, roster_size
+from attendance_writer import AttendanceWriter, WriteBufferFull, insert_records
+from embedding_batcher import EmbeddingBatcher
+from enrollment import EnrollmentJob, prepare_image, run_enrollment, safe_filename
+from face_quality import FaceRejected
+from face_recognition_utils import (
+    assign_matches, detect_faces, embed_classroom, embed_crops, embed_face, embed_file, init_embedding_worker,
+    match_embedding, match_embeddings, match_result, open_face_store, rejection_result
+)
+from identity_cache import IdentityCache, perceptual_hash
+from face_registry import FaceRegistry, NotOnShard, folder_signature
+from face_shards import ShardCoordinator, ShardUnavailable, membership_from_env, shard_router
+from face_store import identity_of
+from model_registry import warm_up
+from inference_pool import PoolSaturated, create_face_pool, create_ocr_pool
+from metrics import (
+    CONTENT_TYPE, ERRORS, FACE_REJECTIONS, FACE_RESULTS, HTTP_REQUESTS, HTTP_SECONDS, REGISTRY,
+    annotate, observe, render, server_timing, timed, track_request
+)
 from ocr_utils import extract_text_from_id_card, parse_id_card_info
+from roster_index import RosterIndex, normalize_name
 
 # Load environment variables
 ROOT_DIR = Path(__file__).parent
 load_dotenv(ROOT_DIR / '.env')
 
+# ----------- PROFILE ------------
+# SERVER_PROFILE chooses what this worker serves, so the endpoints can be
+# scaled (and restarted) separately:
+#   full       everything (default)
+#   inference  recognition, OCR, enrollment, known faces and shard routes
+#   stats      attendance records and stats only: it never loads the
+#              roster or the face model, so it starts fast and stays small
+SERVER_PROFILES = {"full": {"inference", "records"}, "inference": {"inference"}, "stats": {"records"}}
+SERVER_PROFILE = os.environ.get("SERVER_PROFILE", "full").strip().lower()
+if SERVER_PROFILE not in SERVER_PROFILES:
+    raise ValueError(f"SERVER_PROFILE must be one of {', '.join(SERVER_PROFILES)}, not '{SERVER_PROFILE}'")
+INFERENCE = "inference" in SERVER_PROFILES[SERVER_PROFILE]
+RECORDS = "records" in SERVER_PROFILES[SERVER_PROFILE]
+
 # MongoDB setup
 mongo_url = os.environ["MONGO_URL"]
 client = AsyncIOMotorClient(mongo_url)
 db = client[os.environ["DB_NAME"]]
 
+@asynccontextmanager
+async def lifespan(app):
+    """Startup and shutdown, limited to what SERVER_PROFILE serves."""
+    if shard_coordinator is not None:
+        # Both profiles read the roster from the shards
+        shard_coordinator.start()
+        print(f"🔀 Matching on {len(shard_coordinator.shards)} shard(s): {', '.join(shard_coordinator.shards)}")
+    if INFERENCE:
+        await start_face_services()
+        await start_warm_up()
+    await start_attendance_setup()
+    yield
+    await shutdown_inference_pools()
+
 # App initialization
-app = FastAPI(title="Face Recognition Attendance API")
+app = FastAPI(title="Face Recognition Attendance API", lifespan=lifespan)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -34,12 +90,235 @@ app.add_middleware(
 )
 
 # Initialize known faces
-print("🔄 Loading known faces database...")
-known_faces_db = load_known_faces(folder="/Users/admin/Downloads/app/backend/known_faces")
-print(f"✅ Loaded {len(known_faces_db)} known faces")
+# The registry is created on startup rather than at import: spawned inference
+# workers re-import this module and must not touch the roster.
+# Students are searched through a GalleryIndex; its per-student templates use
+# the backend chosen by FACE_INDEX_BACKEND ("brute", "ivf" or "quantized")
+KNOWN_FACES_DIR = os.environ.get("KNOWN_FACES_DIR", "/Users/admin/Downloads/app/backend/known_faces")
+face_registry = None
+
+# /api/ready answers 503 until every entry is True (nothing to wait for in
+# the stats profile)
+readiness = {"known_faces": False, "face_model": False} if INFERENCE else {}
+
+# Inference pools: blocking DeepFace/Tesseract work never runs on the event loop
+face_pool = create_face_pool(initializer=init_embedding_worker)
+ocr_pool = create_ocr_pool()
+# Concurrent face requests share batched pool calls: detection + quality
+# gate first, then one forward pass over the accepted crops
+# (FACE_BATCH_MAX_SIZE / FACE_BATCH_MAX_WAIT_MS)
+detect_batcher = EmbeddingBatcher.from_env(face_pool, detect_faces)
+face_batcher = EmbeddingBatcher.from_env(face_pool, embed_crops)
+# Near-duplicate uploads of the same face reuse the last result
+identity_cache = IdentityCache.from_env()
+# FACE_SHARDS set: this process is a coordinator and faces are matched on the
+# shards listed there (scatter-gather) instead of the local roster
+shard_coordinator = ShardCoordinator.from_env()
+# Names read off ID cards are matched against the enrolled students;
+# (registry version, RosterIndex), rebuilt when the roster changes
+roster_lookup = (None, None)
+# On a coordinator the shards' name lists are fetched again only when a shard
+# reports a new index version (every search reply carries it) or after
+# FACE_SHARD_ROSTER_TTL seconds; (monotonic time of the last fetch, lock)
+SHARD_ROSTER_TTL = float(os.environ.get("FACE_SHARD_ROSTER_TTL", 60))
+shard_roster_fetch = [0.0, asyncio.Lock()]
+
+async def current_roster_index():
+    global roster_lookup
+    if shard_coordinator is not None:
+        async with shard_roster_fetch[1]:
+            stale = time.monotonic() - shard_roster_fetch[0] > SHARD_ROSTER_TTL
+            if stale or roster_lookup[0] != shard_coordinator.version:
+                names, _, _ = await shard_coordinator.roster()
+                shard_roster_fetch[0] = time.monotonic()
+                names = [os.path.splitext(name)[0] for name in names]
+                roster_lookup = (shard_coordinator.version, await asyncio.to_thread(RosterIndex, names))
+        return roster_lookup[1]
+    snapshot = face_registry.snapshot()
+    if roster_lookup[0] != snapshot.version:
+        names = [os.path.splitext(name)[0] for name in snapshot.index.names]
+        roster_lookup = (snapshot.version, await asyncio.to_thread(RosterIndex, names))
+    return roster_lookup[1]
+
+def run_on_face_pool_sync(loop, fn, *args):
+    """Run ``fn`` on the face pool from a worker thread, waiting out saturation."""
+    while True:
+        try:
+            future = asyncio.run_coroutine_threadsafe(face_pool.run(fn, *args), loop)
+            return future.result()[0]
+        except PoolSaturated:
+            time.sleep(0.1)
+
+def embed_file_on_face_pool(loop, filepath):
+    return run_on_face_pool_sync(loop, embed_file, filepath)
+
+async def refresh_known_faces():
+    """Sync the registry with KNOWN_FACES_DIR, embedding only changed images."""
+    loop = asyncio.get_running_loop()
+    summary = await asyncio.to_thread(
+        face_registry.refresh, lambda path: embed_file_on_face_pool(loop, path)
+    )
+    snapshot = face_registry.snapshot()
+    if summary is not None:
+        print(f"✅ Known faces v{snapshot.version}: {len(snapshot.index)} faces "
+              f"({len(summary['added'])} added, {len(summary['updated'])} updated, "
+              f"{len(summary['removed'])} removed)")
+    return summary
+
+async def load_known_faces_db():
+    try:
+        await refresh_known_faces()
+    except Exception as e:
+        print(f"⚠️ Known faces refresh failed: {e}")
+    readiness["known_faces"] = True
+
+async def watch_known_faces(interval):
+    """Poll KNOWN_FACES_DIR and apply changes incrementally."""
+    signature = await asyncio.to_thread(folder_signature, KNOWN_FACES_DIR)
+    while True:
+        await asyncio.sleep(interval)
+        current = await asyncio.to_thread(folder_signature, KNOWN_FACES_DIR)
+        if current != signature:
+            signature = current
+            try:
+                await refresh_known_faces()
+            except Exception as e:
+                print(f"⚠️ Known faces refresh failed: {e}")
+
+async def start_face_services():
+    global face_registry
+    detect_batcher.start()
+    face_batcher.start()
+    if shard_coordinator is not None:
+        # The roster lives on the shards; a coordinator keeps no local index
+        readiness["known_faces"] = True
+        return
+    # Serve the cached roster immediately; refresh it in the background
+    print("🔄 Loading known faces database...")
+    face_registry = await asyncio.to_thread(FaceRegistry, KNOWN_FACES_DIR)
+    print(f"✅ Loaded {len(face_registry.snapshot().index)} cached known faces")
+    app.state.known_faces_task = asyncio.create_task(load_known_faces_db())
+    if os.environ.get("KNOWN_FACES_WATCH", "").lower() in ("1", "true", "yes"):
+        interval = float(os.environ.get("KNOWN_FACES_WATCH_INTERVAL", 5))
+        app.state.watcher_task = asyncio.create_task(watch_known_faces(interval))
+
+async def warm_up_face_workers():
+    """Build and warm the model in every face worker, then report ready."""
+    try:
+        results = await asyncio.gather(*(
+            face_pool.run(warm_up) for _ in range(face_pool.workers)
+        ))
+        readiness["face_model"] = True
+        print(f"🔥 Face model warm in {face_pool.workers} worker(s) "
+              f"({max(warm_ms for warm_ms, _ in results)} ms)")
+    except Exception as e:
+        print(f"⚠️ Face model warm-up failed: {e}")
+
+async def start_warm_up():
+    # Runs in the background so /api/ready can answer 503 meanwhile
+    app.state.warm_up_task = asyncio.create_task(warm_up_face_workers())
+
+async def prepare_attendance_db():
+    try:
+        migrated = await prepare_attendance_collection(db)
+        if migrated:
+            print(f"✅ Converted {migrated} attendance timestamps to native dates")
+        await attendance_counters.ensure_indexes()
+        # Days recorded before the counters existed would read as empty
+        backfilled = await attendance_counters.backfill()
+        if backfilled:
+            print(f"✅ Backfilled attendance counters for {len(backfilled)} day(s)")
+    except Exception as e:
+        print(f"⚠️ Could not prepare attendance collection: {e}")
+
+# Daily totals are kept in attendance_daily, updated after every write batch
+attendance_counters = AttendanceCounters(db)
+# Check-ins are coalesced into insert_many batches
+# (ATTENDANCE_BATCH_MAX_SIZE / ATTENDANCE_FLUSH_MS)
+attendance_writer = AttendanceWriter.from_env(db.attendance_records, after_insert=attendance_counters.apply)
+# Absorbs dashboard polling bursts (ATTENDANCE_STATS_CACHE_TTL seconds)
+stats_cache = TTLCache(maxsize=256, ttl=float(os.environ.get("ATTENDANCE_STATS_CACHE_TTL", 2)))
+
+async def start_attendance_setup():
+    attendance_writer.start()
+    # Background task: a slow or unreachable MongoDB must not block startup
+    app.state.attendance_setup_task = asyncio.create_task(prepare_attendance_db())
+
+# ----------- METRICS ------------
+# Queue depths, cache and roster figures are read when /metrics is scraped
+REGISTRY.gauge(
+    "attendance_pool_in_flight", "Calls running or queued per inference pool",
+    lambda: {pool.name: pool.in_flight for pool in (face_pool, ocr_pool)}, ["pool"]
+)
+REGISTRY.gauge(
+    "attendance_pool_queued", "Calls waiting for a worker per inference pool",
+    lambda: {pool.name: pool.queued for pool in (face_pool, ocr_pool)}, ["pool"]
+)
+REGISTRY.gauge(
+    "attendance_batcher_pending", "Frames waiting to join a face batch",
+    lambda: {"detect": detect_batcher.pending, "embed": face_batcher.pending}, ["batcher"]
+)
+REGISTRY.gauge("attendance_writer_pending", "Check-ins waiting for a write batch", lambda: attendance_writer.pending)
+REGISTRY.gauge(
+    "attendance_writer_flushed_records_total", "Check-ins flushed to MongoDB",
+    lambda: attendance_writer.flushed_records, kind="counter"
+)
+REGISTRY.gauge(
+    "attendance_identity_cache_lookups_total", "Identity cache lookups by outcome",
+    lambda: {
+        "hit": identity_cache.hits - identity_cache.track_hits,
+        "track_hit": identity_cache.track_hits,
+        "miss": identity_cache.misses,
+    },
+    ["result"], kind="counter"
+)
+REGISTRY.gauge("attendance_identity_cache_entries", "Faces held in the identity cache", lambda: identity_cache.stats()["size"])
+if INFERENCE and shard_coordinator is None:
+    # The stats profile and a coordinator have no face index to report
+    REGISTRY.gauge("attendance_known_faces", "Enrolled faces in the live index", lambda: len(face_registry.snapshot().index))
+    REGISTRY.gauge("attendance_known_faces_version", "Version of the live face index", lambda: face_registry.snapshot().version)
+
+# SERVER_TIMING_HEADERS=1 adds a Server-Timing header with every request's stage times
+SERVER_TIMING_HEADERS = os.environ.get("SERVER_TIMING_HEADERS", "").lower() in ("1", "true", "yes")
+
+@app.middleware("http")
+async def record_request_metrics(request, call_next):
+    started = time.perf_counter()
+    timings = track_request()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+    finally:
+        elapsed = time.perf_counter() - started
+        # Label by route template (/api/known-faces/{name}), not the raw path
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        HTTP_REQUESTS.inc(method=request.method, route=path, status=status)
+        HTTP_SECONDS.observe(elapsed, method=request.method, route=path)
+    if SERVER_TIMING_HEADERS:
+        response.headers["Server-Timing"] = server_timing(timings, elapsed)
+    return response
+
+def observe_pool_stage(stage, timings):
+    """Record a stage that ran in a face worker process from the timings it returned."""
+    observe(stage, timings["compute_ms"] / 1000)
+    annotate(f"{stage}_wait", (timings["queue_ms"] + timings.get("batch_wait_ms", 0)) / 1000)
+
+async def shutdown_inference_pools():
+    await attendance_writer.stop()
+    await detect_batcher.stop()
+    await face_batcher.stop()
+    if shard_coordinator is not None:
+        await shard_coordinator.stop()
+    face_pool.shutdown()
+    ocr_pool.shutdown()
 
 # Router setup
 api_router = APIRouter(prefix="/api")
+# Endpoints grouped by SERVER_PROFILE, mounted under /api at the bottom
+records_router = APIRouter()
+inference_router = APIRouter()
 
 # ----------- MODELS ------------
 class StatusCheck(BaseModel):
@@ -55,9 +334,22 @@ class AttendanceRecord(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
     student_name: str
+    class_name: Optional[str] = None
     face_match_confidence: Optional[float] = None
     verified: bool
+    # Punctuality, when it is not implied by ``verified`` (see attendance_stats.ON_TIME)
+    on_time: Optional[bool] = None
     timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    idempotency_key: Optional[str] = None
+
+class AttendanceImportItem(BaseModel):
+    student_name: str
+    class_name: Optional[str] = None
+    face_confidence: Optional[float] = None
+    verified: bool = True
+    on_time: Optional[bool] = None
+    timestamp: Optional[datetime] = None
+    idempotency_key: Optional[str] = None
 
 
 # ----------- ROUTES ------------
@@ -66,94 +358,676 @@ class AttendanceRecord(BaseModel):
 async def root():
     return {"message": "🤖 Face Recognition Attendance API is running"}
 
-@api_router.post("/face-recognition")
+@api_router.get("/ready")
+async def readiness_check():
+    """Readiness probe: 200 once the roster is loaded and the model is warm."""
+    body = {"ready": all(readiness.values()), **readiness}
+    if not body["ready"]:
+        return JSONResponse(status_code=503, content=body)
+    return body
+
+async def recognize_frame(image_bytes, keep_embedding=False):
+    """Detect, gate and identify the face in an uploaded frame.
+
+    Raises PoolSaturated when a pool is full (ShardUnavailable when no
+    shard answers); frames failing the quality gate come back as a
+    rejection result. With ``keep_embedding`` a freshly computed embedding
+    is returned under ``embedding`` (not for cache hits).
+    """
+    try:
+        (crop, _), detect_timings = await detect_batcher.embed(image_bytes)
+    except FaceRejected as e:
+        FACE_RESULTS.inc(result="rejected")
+        FACE_REJECTIONS.inc(reason=e.reason)
+        return rejection_result(e)
+    observe_pool_stage("detection", detect_timings)
+
+    if shard_coordinator is None:
+        snapshot = face_registry.snapshot()
+        version = snapshot.version
+    else:
+        version = shard_coordinator.version
+    phash = perceptual_hash(crop)
+    cached = identity_cache.lookup(phash, version=version)
+    if cached is not None:
+        FACE_RESULTS.inc(result="match" if cached["success"] else "no_match")
+        return {
+            **cached,
+            "cached": True,
+            "timings": {"detection": detect_timings},
+            "index_version": version
+        }
+
+    try:
+        embedding, embed_timings = await face_batcher.embed(crop)
+    except PoolSaturated:
+        raise
+    except Exception as e:
+        ERRORS.inc(stage="embedding")
+        FACE_RESULTS.inc(result="error")
+        return {"success": False, "message": f"⚠️ Error during face match: {e}"}
+    observe_pool_stage("embedding", embed_timings)
+
+    started = time.perf_counter()
+    failed_shards = []
+    with timed("search", expected=ShardUnavailable):
+        if shard_coordinator is None:
+            result = match_embedding(embedding, snapshot.index)
+        else:
+            found, failed_shards = await shard_coordinator.search(embedding, k=3)
+            result = match_result(found)
+            version = shard_coordinator.version
+    FACE_RESULTS.inc(result="match" if result["success"] else "no_match")
+    if failed_shards:
+        # Students on the missing shards were not searched: not cacheable
+        result["partial"] = True
+        result["failed_shards"] = failed_shards
+    else:
+        identity_cache.store(phash, dict(result), version=version)
+    result["timings"] = {
+        "detection": detect_timings,
+        "embedding": embed_timings,
+        "match_ms": round((time.perf_counter() - started) * 1000, 2),
+    }
+    result["index_version"] = version
+    if keep_embedding:
+        result["embedding"] = embedding
+    return result
+
+@inference_router.post("/face-recognition")
 async def recognize_face(file: UploadFile = File(...)):
     try:
-        image_bytes = await file.read()
-        result = match_face(image_bytes, known_faces_db)
-        return result
+        return await recognize_frame(await file.read())
+    except (PoolSaturated, ShardUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/known-faces-count")
+@inference_router.get("/identity-cache")
+async def get_identity_cache_stats():
+    """Hit/miss counters of the recognition cache."""
+    return identity_cache.stats()
+
+# ----------- BULK ENROLLMENT ------------
+def require_local_registry(name=None):
+    """Refuse an enrollment write this server cannot apply.
+
+    A coordinator keeps no roster of its own, and a hash shard only takes
+    the students the ring assigns to it; either way the write belongs on
+    another server.
+    """
+    if shard_coordinator is not None:
+        raise HTTPException(status_code=409, detail="This server coordinates face shards; "
+                                                    "enroll students on the shard that owns them")
+    if name is not None and not face_registry.owns(safe_filename(name)):
+        raise HTTPException(status_code=409, detail=f"{name} belongs to another shard")
+
+enrollment_jobs = {}
+enrollment_tasks = set()
+
+async def run_enrollment_job(job, archive_path):
+    """Enroll an uploaded archive, then publish the new faces.
+
+    Detection and embedding run on the face pool; the registry is only
+    locked for the final upsert, so single enrollments and refreshes go on
+    meanwhile.
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        await asyncio.to_thread(
+            run_enrollment, archive_path, KNOWN_FACES_DIR, face_registry.store,
+            embed_fn=lambda crops: run_on_face_pool_sync(loop, embed_crops, crops), job=job,
+            workers=2 * face_pool.workers,
+            progress=lambda j: print(f"📦 Enrollment {j.job_id}: {j.processed} processed, "
+                                     f"{len(j.enrolled)} enrolled, {len(j.failed)} failed"),
+            prepare_fn=lambda data: run_on_face_pool_sync(loop, prepare_image, data),
+            commit=face_registry.upsert_photos, include=face_registry.owns
+        )
+    finally:
+        os.remove(archive_path)
+    snapshot = face_registry.snapshot()
+    print(f"✅ Enrollment {job.job_id} {job.status}: {len(job.enrolled)} enrolled, "
+          f"{len(job.failed)} failed; {len(snapshot.index)} known faces (v{snapshot.version})")
+
+@inference_router.post("/enrollment/bulk")
+async def bulk_enroll(file: UploadFile = File(...)):
+    """Start enrolling every face image in an uploaded .zip archive.
+
+    The upload is copied to a temporary file in chunks and read member by
+    member, never held in memory as a whole.
+    """
+    require_local_registry()
+    with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as archive:
+        await asyncio.to_thread(shutil.copyfileobj, file.file, archive)
+    job = EnrollmentJob(source=file.filename)
+    enrollment_jobs[job.job_id] = job
+    task = asyncio.create_task(run_enrollment_job(job, archive.name))
+    enrollment_tasks.add(task)
+    task.add_done_callback(enrollment_tasks.discard)
+    return job.to_dict()
+
+@inference_router.get("/enrollment/{job_id}")
+async def get_enrollment_job(job_id: str):
+    """Progress and per-image failures of a bulk enrollment job."""
+    job = enrollment_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown enrollment job")
+    return job.to_dict()
+
+@inference_router.get("/known-faces-count")
 async def get_known_faces_count():
-    return {"count": len(known_faces_db), "faces": list(known_faces_db.keys())}
+    if shard_coordinator is not None:
+        try:
+            names, counts, failed = await shard_coordinator.roster()
+        except ShardUnavailable as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        return {
+            "count": len(names), "faces": names, "version": shard_coordinator.version,
+            "shards": counts, "failed_shards": failed
+        }
+    snapshot = face_registry.snapshot()
+    return {
+        "count": len(snapshot.index),
+        "faces": sorted(snapshot.index.names),
+        "version": snapshot.version
+    }
+
+# ----------- KNOWN FACES ------------
+async def embed_enrollment_upload(file):
+    """Read an uploaded photo and embed its face on the face pool (quality gate first)."""
+    data = await file.read()
+    try:
+        embedding, _ = await face_pool.run(embed_face, data)
+    except PoolSaturated as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return data, embedding
 
-@api_router.post("/attendance/record")
+def enrollment_filename(name, upload_filename):
+    extension = os.path.splitext(upload_filename or "")[1].lower() or ".jpg"
+    return safe_filename(name) + extension
+
+@inference_router.post("/known-faces")
+async def enroll_known_face(name: str = Form(...), file: UploadFile = File(...)):
+    """Enroll one new student without restarting the server."""
+    require_local_registry(name)
+    if face_registry.contains(safe_filename(name)):
+        raise HTTPException(status_code=409, detail=f"{name} is already enrolled")
+    return await store_known_face(name, file)
+
+@inference_router.put("/known-faces/{name}")
+async def update_known_face(name: str, file: UploadFile = File(...)):
+    """Replace an enrolled student's reference photo."""
+    require_local_registry(name)
+    if not face_registry.contains(safe_filename(name)):
+        raise HTTPException(status_code=404, detail=f"{name} is not enrolled")
+    return await store_known_face(name, file)
+
+async def store_known_face(name, file):
+    data, embedding = await embed_enrollment_upload(file)
+    try:
+        snapshot = await asyncio.to_thread(
+            face_registry.enroll, enrollment_filename(name, file.filename), data, embedding
+        )
+    except NotOnShard as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {"success": True, "name": name, "count": len(snapshot.index), "version": snapshot.version}
+
+@inference_router.post("/known-faces/{name}/photos")
+async def add_known_face_photo(name: str, file: UploadFile = File(...)):
+    """Add another reference photo to an enrolled student's gallery."""
+    require_local_registry(name)
+    student = face_registry.identity_for(safe_filename(name))
+    if student is None:
+        raise HTTPException(status_code=404, detail=f"{name} is not enrolled")
+    data, embedding = await embed_enrollment_upload(file)
+    filename = enrollment_filename(f"photo-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}", file.filename)
+    try:
+        snapshot = await asyncio.to_thread(face_registry.add_photo, student, filename, data, embedding)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {
+        "success": True, "name": student, "photos": len(face_registry.photos(student)),
+        "count": len(snapshot.index), "version": snapshot.version
+    }
+
+# GALLERY_ADD_VERIFIED=1 adds the face frame of every verified check-in to the
+# student's gallery, keeping the latest GALLERY_MAX_CHECKIN_PHOTOS of them
+GALLERY_ADD_VERIFIED = os.environ.get("GALLERY_ADD_VERIFIED", "").lower() in ("1", "true", "yes")
+GALLERY_MAX_CHECKIN_PHOTOS = int(os.environ.get("GALLERY_MAX_CHECKIN_PHOTOS", 5))
+gallery_tasks = set()
+
+async def add_check_in_photo(name, data, upload_filename, embedding):
+    student = face_registry.identity_for(name)
+    if student is None:
+        return
+    filename = enrollment_filename(f"checkin-{datetime.now(timezone.utc):%Y%m%dT%H%M%S%f}", upload_filename)
+    try:
+        await asyncio.to_thread(
+            face_registry.add_photo, student, filename, data, embedding,
+            keep_latest=GALLERY_MAX_CHECKIN_PHOTOS, prefix="checkin-"
+        )
+    except Exception as e:
+        print(f"⚠️ Could not add check-in photo of {student}: {e}")
+
+@inference_router.delete("/known-faces/{name}")
+async def delete_known_face(name: str):
+    """Remove a student from the known faces."""
+    require_local_registry(name)
+    snapshot = await asyncio.to_thread(face_registry.remove, safe_filename(name))
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail=f"{name} is not enrolled")
+    return {"success": True, "name": name, "count": len(snapshot.index), "version": snapshot.version}
+
+async def save_check_in(attendance):
+    """Queue one check-in on the batched writer; a repeated idempotency key returns the stored record."""
+    # Timestamps are stored as native dates so stats can range-scan the index
+    try:
+        with timed("record", expected=WriteBufferFull):
+            outcome = await attendance_writer.write(attendance.model_dump())
+    except WriteBufferFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    if outcome == "duplicate":
+        existing = await db.attendance_records.find_one(
+            {"idempotency_key": attendance.idempotency_key}, {"_id": 0}
+        )
+        return {"success": True, "duplicate": True, "record": existing}
+    return {"success": True, "record": attendance}
+
+@records_router.post("/attendance/record")
 async def record_attendance(
     student_name: str,
     face_confidence: Optional[float] = None,
-    verified: bool = True
+    verified: bool = True,
+    class_name: Optional[str] = None,
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
+    """Record one check-in; a retry with the same Idempotency-Key is not recorded twice."""
     try:
         attendance = AttendanceRecord(
             student_name=student_name,
+            class_name=class_name,
             face_match_confidence=face_confidence,
-            verified=verified
+            verified=verified,
+            idempotency_key=idempotency_key
         )
-        doc = attendance.model_dump()
-        doc["timestamp"] = doc["timestamp"].isoformat()
-        await db.attendance_records.insert_one(doc)
-        return {"success": True, "record": attendance}
+        return await save_check_in(attendance)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
-@api_router.get("/attendance/stats")
-async def get_attendance_stats():
-    try:
-        today = datetime.now(timezone.utc).date()
-        all_records = await db.attendance_records.find({}, {"_id": 0}).to_list(1000)
-        today_records = [
-            r for r in all_records if datetime.fromisoformat(r["timestamp"]).date() == today
-        ]
-
-        total_students = 120  # adjust as needed
-        on_time_today = len([r for r in today_records if r.get("verified", False)])
-        late_today = len(today_records) - on_time_today
-        on_time_percentage = (
-            round((on_time_today / total_students * 100), 1)
-            if total_students > 0 else 0
+async def insert_check_ins(records):
+    """Insert many check-ins directly, chunked unordered insert_many calls.
+
+    Returns ``(inserted, duplicate indexes, [{"index", "error"}])``.
+    """
+    inserted, duplicates, failed = 0, [], []
+    chunk = attendance_writer.max_batch_size
+    for offset in range(0, len(records), chunk):
+        docs = [record.model_dump() for record in records[offset:offset + chunk]]
+        outcomes = await insert_records(db.attendance_records, docs)
+        for i, outcome in enumerate(outcomes):
+            if outcome == "inserted":
+                inserted += 1
+            elif outcome == "duplicate":
+                duplicates.append(offset + i)
+            else:
+                failed.append({"index": offset + i, "error": str(outcome)})
+        await attendance_counters.apply([
+            doc for doc, outcome in zip(docs, outcomes) if outcome == "inserted"
+        ])
+    return inserted, duplicates, failed
+
+@records_router.post("/attendance/bulk")
+async def import_attendance(items: List[AttendanceImportItem]):
+    """Import a backlog of check-ins from an offline kiosk.
+
+    Items keep their original timestamps; items whose idempotency_key was
+    already recorded are reported as duplicates instead of failing the import.
+    """
+    records = [
+        AttendanceRecord(
+            student_name=item.student_name,
+            class_name=item.class_name,
+            face_match_confidence=item.face_confidence,
+            verified=item.verified,
+            on_time=item.on_time,
+            idempotency_key=item.idempotency_key,
+            **({"timestamp": item.timestamp} if item.timestamp else {})
         )
+        for item in items
+    ]
+    try:
+        inserted, duplicates, failed = await insert_check_ins(records)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"success": not failed, "inserted": inserted, "duplicates": duplicates, "failed": failed}
 
-        return {
-            "total_students": total_students,
-            "on_time_percentage": on_time_percentage,
-            "on_time_today": on_time_today,
-            "late_today": late_today,
-            "present_today": len(today_records),
-        }
+@records_router.get("/attendance/stats")
+async def get_attendance_stats(
+    start: Optional[date] = None,
+    end: Optional[date] = None,
+    class_name: Optional[str] = None,
+    student_name: Optional[str] = None,
+    breakdown: Optional[str] = None
+):
+    """Attendance counts for today, or for the days ``start``..``end`` (UTC).
+
+    ``breakdown`` ("class" or "student") adds one row per group. Single-day
+    queries are answered from the daily counters; anything else runs the
+    aggregation over the raw records.
+    """
+    key = (start, end, class_name, student_name, breakdown)
+    cached = stats_cache.get(key)
+    if cached is None:
+        # Concurrent identical polls share one computation
+        cached = asyncio.ensure_future(compute_attendance_stats(*key))
+        stats_cache[key] = cached
+    try:
+        return await asyncio.shield(cached)
+    except ValueError as e:
+        stats_cache.pop(key, None)
+        raise HTTPException(status_code=400, detail=str(e))
+    except ShardUnavailable as e:
+        stats_cache.pop(key, None)
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
+        stats_cache.pop(key, None)
         raise HTTPException(status_code=500, detail=str(e))
-    
-@api_router.post("/ocr/id-card")
+
+# Stats-only workers never build the registry; they count the students in
+# the saved face store, re-read whenever another worker saves it
+# (store, index file mtime, students)
+saved_store = None
+
+def count_enrolled():
+    """Students in the live index, or in the saved face store without a registry."""
+    global saved_store
+    if face_registry is not None:
+        return len(face_registry.snapshot().index)
+    if saved_store is None:
+        membership = membership_from_env()
+        store = open_face_store(shard=membership and membership.shard)
+        saved_store = (store, None, 0)
+    store, mtime, students = saved_store
+    try:
+        current = os.path.getmtime(store.index_path)
+    except OSError:
+        return students
+    if current != mtime:
+        if mtime is not None:
+            store.load()
+        saved_store = (store, current, len({identity_of(name) for name in store.names}))
+    return saved_store[2]
+
+async def enrolled_students():
+    """Students across the shards on a coordinator, else ``count_enrolled()``."""
+    if shard_coordinator is not None:
+        return len(await current_roster_index())
+    return await asyncio.to_thread(count_enrolled)
+
+async def compute_attendance_stats(start, end, class_name, student_name, breakdown):
+    enrolled = await enrolled_students()
+    first = start or datetime.now(timezone.utc).date()
+    if (end or first) == first and student_name is None and breakdown in (None, "class"):
+        return await attendance_counters.day_stats(
+            first, lambda name: roster_size(db, name, fallback=enrolled),
+            class_name=class_name, breakdown=breakdown
+        )
+    return await attendance_stats(
+        db, start, end,
+        class_name=class_name,
+        student_name=student_name,
+        breakdown=breakdown,
+        enrolled=enrolled
+    )
+
+async def read_id_card(image_bytes):
+    """OCR an ID card, parse its fields and look the name up on the roster.
+
+    Raises PoolSaturated when the OCR pool is full.
+    """
+    # Step 1: Extract raw text using OCR (on the OCR pool, off the event loop)
+    ocr_result, ocr_timings = await ocr_pool.run(extract_text_from_id_card, image_bytes)
+    # The OCR histograms are recorded by ocr_utils on the pool thread
+    annotate("ocr", ocr_timings["compute_ms"] / 1000)
+    annotate("ocr_wait", ocr_timings["queue_ms"] / 1000)
+    if not ocr_result["success"]:
+        return {**ocr_result, "timings": {"ocr": ocr_timings}}
+
+    # Step 2: Parse text into structured info and look the name up on the roster
+    with timed("card_parse"):
+        parsed_info = parse_id_card_info(ocr_result["text"])
+    with timed("roster_lookup"):
+        roster = await current_roster_index()
+        parsed_info["roster_match"] = roster.match(parsed_info["name"]) if parsed_info["name"] else None
+
+    return {
+        "success": True,
+        "message": "✅ ID card processed successfully",
+        "ocr_text": ocr_result["text"],
+        "parsed_info": parsed_info,
+        "ocr": ocr_result["ocr"],
+        "timings": {"ocr": ocr_timings}
+    }
+
+@inference_router.post("/ocr/id-card")
 async def extract_id_card_info(file: UploadFile = File(...)):
     """
     Extract text and key fields (like name, ID number) from uploaded ID card image.
     """
     try:
-        image_bytes = await file.read()
-        
-        # Step 1: Extract raw text using OCR
-        ocr_result = extract_text_from_id_card(image_bytes)
-        if not ocr_result["success"]:
-            return ocr_result
-        
-        # Step 2: Parse text into structured info
-        parsed_info = parse_id_card_info(ocr_result["text"])
-        
+        return await read_id_card(await file.read())
+    except (PoolSaturated, ShardUnavailable) as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
+
+def cross_check(face_result, card_result):
+    """Whether the ID card belongs to the recognized student, and why not."""
+    if not card_result.get("success"):
+        return False, "could not be read"
+    parsed = card_result["parsed_info"]
+    if parsed["roster_match"] is None:
+        return False, f"name {parsed['name']!r} is not enrolled" if parsed["name"] else "shows no name"
+    if normalize_name(parsed["roster_match"]["name"]) != normalize_name(face_result["name"]):
+        return False, f"belongs to {parsed['roster_match']['name']}"
+    return True, None
+
+@inference_router.post("/attendance/verify")
+async def verify_attendance(
+    face: UploadFile = File(...),
+    id_card: UploadFile = File(...),
+    class_name: Optional[str] = Form(None),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Dual verification in one request: face match, ID card OCR and check-in.
+
+    The face and the card are processed concurrently on their pools. A
+    recognized student is always recorded; the record is ``verified`` only
+    when the name on the card is the same student.
+    """
+    started = time.perf_counter()
+    try:
+        face_bytes, card_bytes = await asyncio.gather(face.read(), id_card.read())
+        try:
+            face_result, card_result = await asyncio.gather(
+                recognize_frame(face_bytes, keep_embedding=GALLERY_ADD_VERIFIED), read_id_card(card_bytes)
+            )
+        except (PoolSaturated, ShardUnavailable) as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        embedding = face_result.pop("embedding", None)
+        timings = {
+            "face": face_result.pop("timings", None),
+            "id_card": card_result.pop("timings", None),
+            "verify_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if not face_result.get("success"):
+            return {
+                "success": False,
+                "message": face_result.get("message"),
+                "face": face_result,
+                "id_card": card_result,
+                "timings": timings
+            }
+
+        verified, reason = cross_check(face_result, card_result)
+        attendance = AttendanceRecord(
+            student_name=face_result["name"],
+            class_name=class_name,
+            face_match_confidence=face_result["confidence"],
+            verified=verified,
+            idempotency_key=idempotency_key
+        )
+        record_started = time.perf_counter()
+        saved = await save_check_in(attendance)
+        timings["record_ms"] = round((time.perf_counter() - record_started) * 1000, 2)
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        if verified and embedding is not None and not saved.get("duplicate") and shard_coordinator is None:
+            # Confirmed by the ID card: the frame becomes another reference photo
+            task = asyncio.create_task(add_check_in_photo(face_result["name"], face_bytes, face.filename, embedding))
+            gallery_tasks.add(task)
+            task.add_done_callback(gallery_tasks.discard)
+
+        if verified:
+            message = f"✅ Attendance verified: {face_result['name']}"
+        else:
+            message = f"⚠️ Attendance recorded for {face_result['name']} but the ID card {reason}"
         return {
-            "success": True,
-            "message": "✅ ID card processed successfully",
-            "ocr_text": ocr_result["text"],
-            "parsed_info": parsed_info
+            **saved,
+            "verified": verified,
+            "message": message,
+            "face": face_result,
+            "id_card": card_result,
+            "timings": timings
         }
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@inference_router.post("/attendance/classroom")
+async def classroom_attendance(
+    file: UploadFile = File(...),
+    class_name: Optional[str] = Form(None),
+    record: bool = Form(True),
+    idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
+):
+    """Take attendance for a whole class from one snapshot.
+
+    Every face in the frame is gated, the accepted crops are embedded in one
+    forward pass on the face pool and matched in one batched search, with
+    each student assigned to at most one face. Recognized students are
+    recorded with one bulk insert, ``on_time`` but not ``verified`` (no ID
+    card is shown); a retry with the same Idempotency-Key records nobody
+    twice.
+    """
+    started = time.perf_counter()
+    try:
+        try:
+            (faces, embeddings), pool_timings = await face_pool.run(embed_classroom, await file.read())
+        except FaceRejected as e:
+            FACE_RESULTS.inc(result="rejected")
+            FACE_REJECTIONS.inc(reason=e.reason)
+            return rejection_result(e)
+        except PoolSaturated as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        observe_pool_stage("classroom", pool_timings)
 
+        failed_shards = []
+        if shard_coordinator is None:
+            snapshot = face_registry.snapshot()
+            version = snapshot.version
+        match_started = time.perf_counter()
+        with timed("search", expected=ShardUnavailable):
+            if shard_coordinator is None:
+                matches = iter(await asyncio.to_thread(match_embeddings, embeddings, snapshot.index))
+            else:
+                searched, failed_shards = await shard_coordinator.search_many(embeddings, k=3)
+                matches = iter(assign_matches(searched))
+                version = shard_coordinator.version
+        timings = {"pool": pool_timings, "match_ms": round((time.perf_counter() - match_started) * 1000, 2)}
+
+        results = []
+        for face in faces:
+            if face.get("rejected"):
+                FACE_RESULTS.inc(result="rejected")
+                FACE_REJECTIONS.inc(reason=face["reason"])
+                result = rejection_result(FaceRejected(face["reason"], face["quality"]))
+            else:
+                result = {**next(matches), "quality": face["quality"]}
+                FACE_RESULTS.inc(result="match" if result["success"] else "no_match")
+            result["box"] = face["quality"].get("box")
+            results.append(result)
+        students = [result for result in results if result["success"]]
+
+        recorded = None
+        if record and students:
+            records = [
+                AttendanceRecord(
+                    student_name=student["name"],
+                    class_name=class_name,
+                    face_match_confidence=student["confidence"],
+                    verified=False,
+                    # Present in the snapshot the teacher took: not late
+                    on_time=True,
+                    idempotency_key=f"{idempotency_key}:{student['name']}" if idempotency_key else None
+                )
+                for student in students
+            ]
+            record_started = time.perf_counter()
+            with timed("record"):
+                inserted, duplicates, failed = await insert_check_ins(records)
+            timings["record_ms"] = round((time.perf_counter() - record_started) * 1000, 2)
+            recorded = {
+                "inserted": inserted,
+                "duplicates": [students[i]["name"] for i in duplicates],
+                "failed": [{"name": students[f["index"]]["name"], "error": f["error"]} for f in failed],
+            }
+        timings["total_ms"] = round((time.perf_counter() - started) * 1000, 2)
+
+        return {
+            "success": bool(students),
+            "message": f"✅ {len(students)} of {len(results)} faces recognized"
+                       if students else "❌ No student recognized",
+            "students": [student["name"] for student in students],
+            "faces": results,
+            "recorded": recorded,
+            "index_version": version,
+            "failed_shards": failed_shards,
+            "timings": timings
+        }
+    except HTTPException:
+        raise
+    except ShardUnavailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
+        raise HTTPException(status_code=500, detail=str(e))
 
-# Include API router
+# ----------- SHARDS ------------
+# /api/shard/search and /api/shard/roster: every server can act as a shard of
+# a coordinator's FACE_SHARDS (with FACE_SHARD_NAME / FACE_SHARD_NODES it
+# indexes only its part of the roster). A coordinator is not a shard itself.
+if shard_coordinator is None:
+    inference_router.include_router(shard_router(lambda: face_registry.snapshot()))
+
+# Include API router, with the endpoints of this SERVER_PROFILE
+if RECORDS:
+    api_router.include_router(records_router)
+if INFERENCE:
+    api_router.include_router(inference_router)
 app.include_router(api_router)
 
+@app.get("/metrics")
+async def prometheus_metrics():
+    """Stage latency histograms, outcome counters and queue depths (Prometheus text format)."""
+    return Response(render(), media_type=CONTENT_TYPE)
+
 # Run app for Docker
 if __name__ == "__main__":
     print("🚀 Starting FastAPI server on 0.0.0.0:5000")
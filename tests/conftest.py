@@ -0,0 +1,53 @@
+import os
+import shutil
+import sys
+
+import pytest
+
+# The backend is a flat set of modules run from its own folder; the
+# benchmarks folder holds the mongomock stand-in for the Motor database
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BACKEND_DIR = os.path.join(ROOT, "backend")
+sys.path.insert(0, os.path.join(BACKEND_DIR, "benchmarks"))
+sys.path.insert(0, BACKEND_DIR)
+
+
+@pytest.fixture(scope="session")
+def server(tmp_path_factory):
+    """``server.py`` imported once, on a copy of known_faces and the MongoDB stand-in.
+
+    Importing starts nothing: the roster and the face model are only loaded
+    by tests that run the app's startup (``with TestClient(server.app)``).
+    """
+    pytest.importorskip("mongomock")
+    known_faces = tmp_path_factory.mktemp("known_faces")
+    source = os.path.join(BACKEND_DIR, "known_faces")
+    for filename in os.listdir(source):
+        shutil.copy(os.path.join(source, filename), known_faces)
+    os.environ.update({
+        "KNOWN_FACES_DIR": str(known_faces),
+        "FACE_CACHE_DIR": str(tmp_path_factory.mktemp("face_cache")),
+        "MONGO_URL": "mongodb://localhost:1",
+        "DB_NAME": "attendance_test",
+        "SERVER_PROFILE": "full",
+        "INFERENCE_FACE_WORKERS": "1",
+    })
+    import server
+    return server
+
+
+@pytest.fixture
+def app_server(server):
+    """``server`` with a fresh MongoDB stand-in, for tests that call the API without startup."""
+    from bench_suite import standin_database
+
+    standin_database(server)
+    return server
+
+
+@pytest.fixture
+def api(app_server):
+    """``api()`` opens an async client calling the app in-process (no startup is run)."""
+    import httpx
+
+    return lambda: httpx.AsyncClient(transport=httpx.ASGITransport(app=app_server.app), base_url="http://test")
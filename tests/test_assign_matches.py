@@ -0,0 +1,31 @@
+from face_recognition_utils import assign_matches
+
+
+def test_each_identity_goes_to_its_closest_face():
+    searched = [
+        [("alice.jpg", 0.20), ("bob.jpg", 0.40)],
+        [("alice.jpg", 0.10)],
+        [("carol.jpg", 0.50)],
+    ]
+    results = assign_matches(searched, threshold=0.35)
+    assert [r["success"] for r in results] == [False, True, False]
+    assert results[1]["name"] == "alice"
+    assert results[1]["confidence"] == 90.0
+    # The first face also matched alice, but she is closer to the second
+    assert results[0]["duplicate"] is True
+    assert results[2]["duplicate"] is False
+    assert results[0]["candidates"][1] == {"name": "bob", "distance": 0.4, "confidence": 60.0}
+
+
+def test_face_falls_back_to_its_next_candidate():
+    # A face that lost its best identity still gets its next one under the threshold
+    results = assign_matches([[("alice.jpg", 0.1)], [("alice.jpg", 0.2), ("bob.jpg", 0.3)]])
+    assert results[0]["name"] == "alice"
+    assert results[1]["name"] == "bob"
+
+
+def test_no_faces_and_no_hits():
+    assert assign_matches([]) == []
+    assert assign_matches([[]])[0] == {
+        "success": False, "message": "❌ Face not recognized", "duplicate": False, "candidates": [],
+    }
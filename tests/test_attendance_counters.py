@@ -0,0 +1,118 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+from attendance_counters import AttendanceCounters
+
+pytest.importorskip("mongomock")
+
+from mongo_standin import StandInDatabase  # noqa: E402
+
+
+def record(student, class_name, day, verified=True, hour=9):
+    return {
+        "student_name": student,
+        "class_name": class_name,
+        "timestamp": datetime(2026, 3, day, hour, tzinfo=timezone.utc),
+        "verified": verified,
+    }
+
+
+RECORDS = [
+    record("alice", "A", 2),
+    record("alice", "A", 2, verified=False, hour=14),
+    record("bob", "A", 2, verified=False),
+    record("carol", "B", 2),
+    record("alice", "A", 3),
+]
+
+
+async def roster(class_name):
+    return 4 if class_name is None else 2
+
+
+@pytest.fixture
+def db():
+    return StandInDatabase()
+
+
+def counters_of(db):
+    return {
+        doc["_id"]: {k: doc[k] for k in ("present", "on_time", "late", "unique_students")}
+        for doc in db.database.attendance_daily.find()
+    }
+
+
+def apply(db, batches):
+    counters = AttendanceCounters(db)
+
+    async def run():
+        for batch in batches:
+            await db.attendance_records.insert_many([dict(doc) for doc in batch])
+            await counters.apply(batch)
+    asyncio.run(run())
+    return counters
+
+
+def test_apply_counts_records_and_unique_students(db):
+    apply(db, [RECORDS[:2], RECORDS[2:]])
+    counts = counters_of(db)
+    assert counts["2026-03-02|all|"] == {"present": 4, "on_time": 2, "late": 2, "unique_students": 3}
+    assert counts["2026-03-02|class|A"] == {"present": 3, "on_time": 1, "late": 2, "unique_students": 2}
+    assert counts["2026-03-02|class|B"] == {"present": 1, "on_time": 1, "late": 0, "unique_students": 1}
+    assert counts["2026-03-03|all|"]["unique_students"] == 1
+
+
+def test_day_stats_reads_the_counters(db):
+    counters = apply(db, [RECORDS])
+    stats = asyncio.run(counters.day_stats(date(2026, 3, 2), roster, breakdown="class"))
+    assert stats["range"] == {"start": "2026-03-02", "end": "2026-03-02"}
+    assert [row["class"] for row in stats["breakdown"]] == ["A", "B"]
+    missing = asyncio.run(counters.day_stats(date(2026, 3, 9), roster))
+    assert missing["range"]["start"] == "2026-03-09"
+
+
+def test_rebuild_matches_live_counters_and_drops_stale_ones(db):
+    counters = apply(db, [RECORDS[:3], RECORDS[3:]])
+    live = counters_of(db)
+    # A stale day with no records behind it, and a drifted counter
+    db.database.attendance_daily.insert_one({"_id": "2026-03-04|all|", "day": "2026-03-04", "present": 7,
+                                             "on_time": 0, "late": 7, "unique_students": 1})
+    db.database.attendance_daily.update_one({"_id": "2026-03-02|all|"}, {"$inc": {"present": 5}})
+
+    assert asyncio.run(counters.rebuild()) == 2
+    assert counters_of(db) == live
+    assert db.database.attendance_daily_students.count_documents({"day": "2026-03-02"}) == 6
+
+
+def test_rebuild_of_a_range_leaves_other_days(db):
+    counters = apply(db, [RECORDS])
+    db.database.attendance_daily.update_one({"_id": "2026-03-03|all|"}, {"$set": {"present": 99}})
+    assert asyncio.run(counters.rebuild(date(2026, 3, 2), date(2026, 3, 2))) == 1
+    assert counters_of(db)["2026-03-03|all|"]["present"] == 99
+
+
+def test_backfill_rebuilds_days_without_counters(db):
+    counters = apply(db, [RECORDS[:4]])
+    # Recorded before the counters existed
+    db.database.attendance_records.insert_many([record("dave", "B", 5), record("erin", "B", 6)])
+    db.database.attendance_daily.update_one({"_id": "2026-03-02|all|"}, {"$inc": {"present": 5}})
+
+    assert asyncio.run(counters.missing_days()) == ["2026-03-05", "2026-03-06"]
+    assert asyncio.run(counters.backfill()) == ["2026-03-05", "2026-03-06"]
+    counts = counters_of(db)
+    assert counts["2026-03-05|class|B"] == {"present": 1, "on_time": 1, "late": 0, "unique_students": 1}
+    # Days that already have counters are left alone
+    assert counts["2026-03-02|all|"]["present"] == 9
+    assert asyncio.run(counters.backfill()) == []
+
+
+def test_startup_backfills_existing_records(app_server):
+    app_server.db.database.attendance_records.insert_many([
+        {**doc, "idempotency_key": f"kiosk:{i}"} for i, doc in enumerate(RECORDS)
+    ])
+    asyncio.run(app_server.prepare_attendance_db())
+    assert counters_of(app_server.db)["2026-03-02|all|"] == {
+        "present": 4, "on_time": 2, "late": 2, "unique_students": 3,
+    }
@@ -0,0 +1,100 @@
+import asyncio
+from datetime import date, datetime, timezone
+
+import pytest
+
+from attendance_stats import attendance_stats, day_range, is_on_time, stats_pipeline, summarize_counts
+
+pytest.importorskip("mongomock")
+
+from mongo_standin import StandInDatabase  # noqa: E402
+
+
+def record(student, class_name, day, verified=True):
+    return {
+        "student_name": student,
+        "class_name": class_name,
+        "timestamp": datetime(2026, 3, day, 9, tzinfo=timezone.utc),
+        "verified": verified,
+    }
+
+
+@pytest.fixture
+def db():
+    db = StandInDatabase()
+    db.database.attendance_records.insert_many([
+        record("alice", "A", 2),
+        record("alice", "A", 2, verified=False),
+        record("bob", "A", 2, verified=False),
+        record("carol", "B", 2),
+        record("alice", "A", 3),
+        record("dave", "B", 5),
+    ])
+    return db
+
+
+def test_day_range():
+    since, until = day_range(date(2026, 3, 2), date(2026, 3, 3))
+    assert since == datetime(2026, 3, 2, tzinfo=timezone.utc)
+    assert until == datetime(2026, 3, 4, tzinfo=timezone.utc)
+    assert day_range(date(2026, 3, 2))[1] == datetime(2026, 3, 3, tzinfo=timezone.utc)
+    with pytest.raises(ValueError):
+        day_range(date(2026, 3, 3), date(2026, 3, 2))
+
+
+def test_pipeline_filters_before_grouping():
+    since, until = day_range(date(2026, 3, 2))
+    pipeline = stats_pipeline(since, until, class_name="A", breakdown="student")
+    assert pipeline[0] == {"$match": {"timestamp": {"$gte": since, "$lt": until}, "class_name": "A"}}
+    assert set(pipeline[-1]["$facet"]) == {"totals", "groups"}
+    with pytest.raises(ValueError):
+        stats_pipeline(since, until, breakdown="teacher")
+
+
+def test_summarize_counts():
+    assert summarize_counts({"present": 5, "on_time": 3, "students": ["a", "b"]}, 4, days=2) == {
+        "total_students": 4, "on_time_percentage": 37.5, "on_time_today": 3,
+        "late_today": 2, "present_today": 5, "unique_students": 2,
+    }
+    assert summarize_counts({}, 0)["on_time_percentage"] == 0
+
+
+def test_on_time_falls_back_to_verified(db):
+    assert [is_on_time(doc) for doc in ({"verified": True}, {"verified": False}, {"verified": False, "on_time": True},
+                                        {"verified": True, "on_time": False}, {"verified": True, "on_time": None})] == [
+        True, False, True, False, True,
+    ]
+    db.database.attendance_records.insert_one({**record("erin", "B", 5, verified=False), "on_time": True})
+    stats = asyncio.run(attendance_stats(db, date(2026, 3, 5), enrolled=4))
+    assert (stats["present_today"], stats["on_time_today"], stats["late_today"]) == (2, 2, 0)
+
+
+def test_one_day(db):
+    stats = asyncio.run(attendance_stats(db, date(2026, 3, 2), enrolled=4))
+    assert stats == {
+        "total_students": 4, "on_time_percentage": 50.0, "on_time_today": 2, "late_today": 2,
+        "present_today": 4, "unique_students": 3, "range": {"start": "2026-03-02", "end": "2026-03-02"},
+    }
+
+
+def test_range_with_class_breakdown(db):
+    stats = asyncio.run(attendance_stats(db, date(2026, 3, 1), date(2026, 3, 5), breakdown="class", enrolled=4))
+    assert stats["present_today"] == 6
+    assert stats["unique_students"] == 4
+    assert [(row["class"], row["present_today"], row["unique_students"]) for row in stats["breakdown"]] == [
+        ("A", 4, 2), ("B", 2, 2),
+    ]
+
+
+def test_student_filter_and_roster_collection(db):
+    stats = asyncio.run(attendance_stats(db, date(2026, 3, 2), date(2026, 3, 3), student_name="alice"))
+    assert (stats["total_students"], stats["present_today"], stats["on_time_today"]) == (1, 3, 2)
+
+    db.database.students.insert_many([{"name": "alice", "class_name": "A"}, {"name": "carol", "class_name": "B"}])
+    stats = asyncio.run(attendance_stats(db, date(2026, 3, 2), class_name="B", enrolled=40))
+    assert stats["total_students"] == 1
+
+
+def test_empty_range(db):
+    stats = asyncio.run(attendance_stats(db, date(2026, 4, 1), enrolled=4))
+    assert (stats["present_today"], stats["unique_students"], stats["on_time_percentage"]) == (0, 0, 0)
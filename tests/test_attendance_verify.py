@@ -0,0 +1,95 @@
+import asyncio
+
+import pytest
+
+from attendance_stats import ensure_attendance_indexes
+from inference_pool import PoolSaturated
+
+
+def card(name):
+    """read_id_card result for a card whose name matched ``name`` on the roster."""
+    match = {"name": name, "distance": 0} if name else None
+    return {"success": True, "parsed_info": {"name": name, "id_number": "12345", "roster_match": match}}
+
+
+@pytest.fixture
+def verify(api, app_server, monkeypatch):
+    """``verify(face_result, card_result)``: POST /api/attendance/verify with stubbed recognition and OCR."""
+    def run(face_result, card_result, headers=None, times=1):
+        async def recognize_frame(image_bytes, keep_embedding=False):
+            if isinstance(face_result, Exception):
+                raise face_result
+            return dict(face_result)
+
+        async def read_id_card(image_bytes):
+            return dict(card_result)
+
+        monkeypatch.setattr(app_server, "recognize_frame", recognize_frame)
+        monkeypatch.setattr(app_server, "read_id_card", read_id_card)
+
+        async def post():
+            await ensure_attendance_indexes(app_server.db.attendance_records)
+            app_server.attendance_writer.start()
+            try:
+                async with api() as client:
+                    return [
+                        await client.post(
+                            "/api/attendance/verify", headers=headers or {}, data={"class_name": "A"},
+                            files={"face": ("face.jpg", b"face"), "id_card": ("card.jpg", b"card")},
+                        )
+                        for _ in range(times)
+                    ]
+            finally:
+                await app_server.attendance_writer.stop()
+
+        responses = asyncio.run(post())
+        return responses if times > 1 else responses[0]
+    return run
+
+
+def records(app_server):
+    return list(app_server.db.database.attendance_records.find({}, {"_id": 0}))
+
+
+ALICE = {"success": True, "name": "Alice_Smith", "confidence": 91.5}
+
+
+def test_matching_card_records_a_verified_check_in(verify, app_server):
+    body = verify(ALICE, card("Alice_Smith")).json()
+    assert body["success"] and body["verified"]
+    assert body["message"] == "✅ Attendance verified: Alice_Smith"
+    assert set(body["timings"]) >= {"face", "id_card", "record_ms", "total_ms"}
+    [record] = records(app_server)
+    assert (record["student_name"], record["class_name"], record["verified"]) == ("Alice_Smith", "A", True)
+
+
+@pytest.mark.parametrize("card_result, reason", [
+    (card("Bob_Jones"), "belongs to Bob_Jones"),
+    ({**card(None), "parsed_info": {"name": "EVE", "id_number": None, "roster_match": None}},
+     "name 'EVE' is not enrolled"),
+    ({"success": False, "message": "no text"}, "could not be read"),
+])
+def test_other_cards_record_an_unverified_check_in(verify, app_server, card_result, reason):
+    body = verify(ALICE, card_result).json()
+    assert body["success"] and not body["verified"]
+    assert body["message"] == f"⚠️ Attendance recorded for Alice_Smith but the ID card {reason}"
+    assert records(app_server)[0]["verified"] is False
+
+
+def test_unrecognized_face_records_nothing(verify, app_server):
+    body = verify({"success": False, "message": "No match"}, card("Alice_Smith")).json()
+    assert body["success"] is False and body["message"] == "No match"
+    assert records(app_server) == []
+
+
+def test_a_retry_is_recorded_once(verify, app_server):
+    first, retry = verify(ALICE, card("Alice_Smith"), headers={"Idempotency-Key": "gate-2:41"}, times=2)
+    assert "duplicate" not in first.json()
+    assert retry.json()["duplicate"] is True
+    assert len(records(app_server)) == 1
+
+
+def test_saturated_pool_answers_503(verify, app_server):
+    response = verify(PoolSaturated("face", 5), card("Alice_Smith"))
+    assert response.status_code == 503
+    assert records(app_server) == []
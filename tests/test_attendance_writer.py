@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from attendance_stats import ensure_attendance_indexes
+from attendance_writer import AttendanceWriter, WriteBufferFull, insert_records
+
+pytest.importorskip("mongomock")
+
+from mongo_standin import StandInDatabase  # noqa: E402
+
+
+@pytest.fixture
+def collection():
+    collection = StandInDatabase().attendance_records
+    asyncio.run(ensure_attendance_indexes(collection))
+    return collection
+
+
+def test_insert_records_reports_duplicate_keys(collection):
+    docs = [{"idempotency_key": "a"}, {"idempotency_key": "a"}, {"student_name": "x"}, {"student_name": "y"}]
+    assert asyncio.run(insert_records(collection, docs)) == ["inserted", "duplicate", "inserted", "inserted"]
+    assert asyncio.run(insert_records(collection, [])) == []
+
+
+def test_writer_batches_and_answers_each_writer(collection):
+    inserted = []
+
+    async def after_insert(docs):
+        inserted.extend(docs)
+
+    async def run():
+        writer = AttendanceWriter(collection, max_batch_size=4, flush_ms=50, after_insert=after_insert)
+        writer.start()
+        docs = [{"student_name": f"s{i}", "idempotency_key": f"k{i % 5}"} for i in range(10)]
+        outcomes = await asyncio.gather(*(writer.write(doc) for doc in docs))
+        await writer.stop()
+        return writer, outcomes
+
+    writer, outcomes = asyncio.run(run())
+    # A retried key is stored once, whichever batch it lands in
+    assert outcomes == ["inserted"] * 5 + ["duplicate"] * 5
+    assert sorted(doc["idempotency_key"] for doc in inserted) == ["k0", "k1", "k2", "k3", "k4"]
+    assert writer.flushed_records == 10
+    assert writer.flushed_batches == 3
+    assert asyncio.run(collection.count_documents({})) == 5
+
+
+def test_stop_flushes_what_is_buffered(collection):
+    async def run():
+        writer = AttendanceWriter(collection, max_batch_size=100, flush_ms=60_000)
+        writer.start()
+        pending = [asyncio.create_task(writer.write({"student_name": f"s{i}"})) for i in range(3)]
+        await asyncio.sleep(0)
+        await writer.stop()
+        return await asyncio.gather(*pending)
+
+    assert asyncio.run(run()) == ["inserted"] * 3
+
+
+def test_full_buffer_is_rejected(collection):
+    async def run():
+        writer = AttendanceWriter(collection, max_batch_size=1, flush_ms=60_000, max_pending=2)
+        writer._queue = asyncio.Queue()
+        for i in range(2):
+            writer._queue.put_nowait(({"student_name": f"s{i}"}, None))
+        with pytest.raises(WriteBufferFull):
+            await writer.write({"student_name": "late"})
+
+    asyncio.run(run())
+
+
+def test_write_before_start_fails(collection):
+    with pytest.raises(RuntimeError):
+        asyncio.run(AttendanceWriter(collection).write({}))
+
+
+def test_record_endpoint_stores_a_retry_once(api, app_server):
+    async def run():
+        await ensure_attendance_indexes(app_server.db.attendance_records)
+        app_server.attendance_writer.start()
+        try:
+            async with api() as client:
+                return [
+                    await client.post("/api/attendance/record", params={"student_name": "alice"},
+                                      headers={"Idempotency-Key": "kiosk-1:7"})
+                    for _ in range(2)
+                ]
+        finally:
+            await app_server.attendance_writer.stop()
+
+    first, retry = asyncio.run(run())
+    assert first.status_code == retry.status_code == 200
+    assert "duplicate" not in first.json()
+    assert retry.json()["duplicate"] is True
+    assert retry.json()["record"]["student_name"] == "alice"
+    assert asyncio.run(app_server.db.attendance_records.count_documents({})) == 1
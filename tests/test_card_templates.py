@@ -0,0 +1,70 @@
+import json
+
+import pytest
+
+from card_templates import CardTemplate, load_templates, parse_card
+
+COLLEGE = {
+    "name": "rvce",
+    "match": r"R\s*V\s*COLLEGE",
+    "fields": {
+        "name": {"label": r"NAME", "value": r"[A-Z][A-Z ]*[A-Z]"},
+        "usn": {"label": r"USN", "value": r"1RV\d{2}[A-Z]{2}\d{3}"},
+        "branch": {"value": r"[A-Z]{2,4}", "line": -1},
+    },
+}
+
+
+@pytest.fixture
+def templates(tmp_path):
+    path = tmp_path / "templates.json"
+    path.write_text(json.dumps([COLLEGE]))
+    return load_templates(str(path))
+
+
+def test_generic_template_reads_captions_and_next_lines(templates):
+    info = parse_card("SOME UNIVERSITY\nName: ALICE SMITH\nRoll No\n21CS042\n", templates)
+    assert info == {"name": "ALICE SMITH", "id_number": "21CS042", "template": "generic"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("ID No: AB1234", "AB1234"),
+    ("Registration No. 2021/CS/17", "2021/CS/17"),
+    ("Enrolment No - EN99812", "EN99812"),
+    ("Identification Number: 77777", "77777"),
+    ("IDENTITY CARD NO 12345", "12345"),
+    ("Card No: 55555", "55555"),
+    ("Student ID: 1234567", "1234567"),
+    ("Roll Number: 22CS1001", "22CS1001"),
+])
+def test_generic_id_number_captions(templates, text, expected):
+    assert parse_card(text, templates)["id_number"] == expected
+
+
+def test_first_value_wins_and_words_are_not_ids(templates):
+    info = parse_card("Name: BOB\nID: STUDENT\nName: EVE\n", templates)
+    assert info["name"] == "BOB"
+    assert info["id_number"] is None
+
+
+def test_captions_sharing_a_line(templates):
+    info = parse_card("Name: John Smith  ID: 12345", templates)
+    assert (info["name"], info["id_number"]) == ("John Smith", "12345")
+    info = parse_card("Student Name: JOHN DOE Roll No\n22CS1001", templates)
+    assert (info["name"], info["id_number"]) == ("JOHN DOE", "22CS1001")
+
+
+def test_other_peoples_captions_are_ignored(templates):
+    info = parse_card("Father's Name: ROBERT SMITH\nPhone Number: 9876543210\nName: ALICE SMITH", templates)
+    assert (info["name"], info["id_number"]) == ("ALICE SMITH", None)
+
+
+def test_institution_template_applies_by_header(templates):
+    info = parse_card("R V COLLEGE OF ENGINEERING\nName  CAROL DSOUZA\nUSN: 1RV21CS017\nCSE", templates)
+    assert info == {"name": "CAROL DSOUZA", "usn": "1RV21CS017", "branch": "CSE", "template": "rvce"}
+    assert parse_card("Name: CAROL\n", templates)["template"] == "generic"
+
+
+def test_invalid_field_names_are_rejected():
+    with pytest.raises(ValueError):
+        CardTemplate("bad", {"_value": {"label": "X", "value": "X"}})
@@ -0,0 +1,75 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+import numpy as np
+import pytest
+
+from attendance_stats import attendance_stats, ensure_attendance_indexes
+from face_registry import FaceRegistry
+from inference_pool import InferencePool
+from tests.test_face_store import StubEmbedder, stub_embedding
+
+
+@pytest.fixture
+def classroom(api, app_server, tmp_path, monkeypatch):
+    """``classroom(photos)``: POST /api/attendance/classroom for a snapshot holding ``photos``.
+
+    The roster is alice, bob and carol, embedded with the stub embedder; a
+    photo is recognized as the student whose enrollment bytes it repeats.
+    """
+    for name in ("FACE_INDEX_BACKEND", "FACE_SHARD_NAME", "FACE_SHARD_NODES"):
+        monkeypatch.delenv(name, raising=False)
+    folder = tmp_path / "known_faces"
+    folder.mkdir()
+    for name in ("alice", "bob", "carol"):
+        (folder / f"{name}.jpg").write_bytes(name.encode())
+    registry = FaceRegistry(str(folder), cache_dir=str(tmp_path / "cache"))
+    registry.refresh(StubEmbedder())
+    monkeypatch.setattr(app_server, "face_registry", registry)
+    monkeypatch.setattr(app_server, "face_pool", InferencePool("face", ThreadPoolExecutor(max_workers=1), 1, 4))
+
+    def run(photos, headers=None, times=1):
+        def embed_classroom(frame):
+            faces = [{"quality": {"box": [i * 100, 0, 80, 80]}} for i in range(len(photos))]
+            return faces, np.asarray([stub_embedding(photo) for photo in photos], dtype=np.float32)
+
+        monkeypatch.setattr(app_server, "embed_classroom", embed_classroom)
+
+        async def post():
+            await ensure_attendance_indexes(app_server.db.attendance_records)
+            async with api() as client:
+                return [
+                    await client.post("/api/attendance/classroom", headers=headers or {},
+                                      data={"class_name": "A"}, files={"file": ("class.jpg", b"snapshot")})
+                    for _ in range(times)
+                ]
+
+        responses = asyncio.run(post())
+        return responses if times > 1 else responses[0]
+    return run
+
+
+def test_recognized_students_are_recorded_on_time(classroom, app_server):
+    body = classroom([b"alice", b"bob", b"stranger"]).json()
+    assert body["students"] == ["alice", "bob"]
+    assert body["recorded"] == {"inserted": 2, "duplicates": [], "failed": []}
+    assert [face["box"][0] for face in body["faces"]] == [0, 100, 200]
+
+    records = list(app_server.db.database.attendance_records.find({}, {"_id": 0}))
+    assert {(r["student_name"], r["verified"], r["on_time"]) for r in records} == {
+        ("alice", False, True), ("bob", False, True),
+    }
+    # Without an ID card the check-in is not verified, but nobody is counted late
+    today = datetime.now(timezone.utc).date()
+    counters = app_server.db.database.attendance_daily.find_one({"_id": f"{today}|class|A"})
+    assert (counters["present"], counters["on_time"], counters["late"]) == (2, 2, 0)
+    stats = asyncio.run(attendance_stats(app_server.db, today, enrolled=3))
+    assert (stats["on_time_today"], stats["late_today"]) == (2, 0)
+
+
+def test_a_retried_snapshot_records_nobody_twice(classroom, app_server):
+    first, retry = classroom([b"alice", b"carol"], headers={"Idempotency-Key": "room-4:0900"}, times=2)
+    assert first.json()["recorded"]["inserted"] == 2
+    assert retry.json()["recorded"] == {"inserted": 0, "duplicates": ["alice", "carol"], "failed": []}
+    assert app_server.db.database.attendance_records.count_documents({}) == 2
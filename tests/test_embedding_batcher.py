@@ -0,0 +1,98 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from embedding_batcher import EmbeddingBatcher
+from inference_pool import InferencePool, PoolSaturated
+
+
+def doubled(payloads):
+    """Stub batch_fn: one result per payload, an Exception for negative ones."""
+    return [ValueError(f"bad payload {p}") if p < 0 else p * 2 for p in payloads]
+
+
+def thread_pool(workers=1, queue_size=4):
+    return InferencePool("face", ThreadPoolExecutor(max_workers=workers), workers, queue_size)
+
+
+def test_concurrent_payloads_share_batches_and_get_their_own_result():
+    calls = []
+
+    def batch_fn(payloads):
+        calls.append(list(payloads))
+        return doubled(payloads)
+
+    async def run():
+        batcher = EmbeddingBatcher(thread_pool(), batch_fn, max_batch_size=8, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.embed(i) for i in range(20)))
+        await batcher.stop()
+        return results
+
+    results = asyncio.run(run())
+    assert [result for result, _ in results] == [i * 2 for i in range(20)]
+    assert sorted(p for call in calls for p in call) == list(range(20))
+    assert len(calls) < 20
+    assert max(timings["batch_size"] for _, timings in results) > 1
+
+
+def test_a_failing_payload_only_fails_its_caller():
+    async def run():
+        batcher = EmbeddingBatcher(thread_pool(), doubled, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.embed(p) for p in (1, -1, 3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    first, failed, last = asyncio.run(run())
+    assert first[0] == 2 and last[0] == 6
+    assert isinstance(failed, ValueError)
+
+
+def test_a_crashed_batch_fails_every_caller():
+    def crash(payloads):
+        raise RuntimeError("worker died")
+
+    async def run():
+        batcher = EmbeddingBatcher(thread_pool(), crash, max_batch_size=4, max_wait_ms=20)
+        batcher.start()
+        results = await asyncio.gather(*(batcher.embed(p) for p in range(3)), return_exceptions=True)
+        await batcher.stop()
+        return results
+
+    assert all(isinstance(result, RuntimeError) for result in asyncio.run(run()))
+
+
+def test_backlog_beyond_the_pool_is_rejected():
+    release = threading.Event()
+
+    def blocked(payloads):
+        release.wait()
+        return doubled(payloads)
+
+    async def run():
+        batcher = EmbeddingBatcher(thread_pool(workers=1, queue_size=1), blocked, max_batch_size=2, max_wait_ms=1)
+        batcher.start()
+        try:
+            # The only worker is busy: later payloads wait, up to capacity * batch size
+            waiting = [asyncio.create_task(batcher.embed(0))]
+            await asyncio.sleep(0.05)
+            waiting += [asyncio.create_task(batcher.embed(i)) for i in range(1, 5)]
+            await asyncio.sleep(0.05)
+            assert (batcher.pending, batcher.max_pending) == (4, 4)
+            with pytest.raises(PoolSaturated):
+                await batcher.embed(5)
+        finally:
+            release.set()
+        results = await asyncio.gather(*waiting)
+        await batcher.stop()
+        return results
+
+    assert [result for result, _ in asyncio.run(run())] == [0, 2, 4, 6, 8]
+
+
+def test_embed_before_start_fails():
+    with pytest.raises(RuntimeError):
+        asyncio.run(EmbeddingBatcher(thread_pool(), doubled).embed(1))
@@ -0,0 +1,122 @@
+import io
+import os
+import zipfile
+
+import numpy as np
+import pytest
+
+from enrollment import iter_images, run_enrollment, safe_key
+from face_store import FaceStore, list_images
+from tests.test_face_store import stub_embedding
+
+
+def archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    return buffer.getvalue()
+
+
+def stub_prepare(data):
+    if data == b"no face":
+        raise ValueError("No face detected")
+    return data
+
+
+def stub_embed(crops):
+    return [stub_embedding(crop) for crop in crops]
+
+
+def test_student_folders_survive_a_wrapping_folder():
+    data = archive({
+        "intake/alice/1.jpg": b"alice 1",
+        "intake/bob/1.jpg": b"bob 1",
+        "intake/carol.jpg": b"carol",
+        "intake/__MACOSX/intake/._carol.jpg": b"resource fork",
+        "intake/alice/.DS_Store.jpg": b"hidden",
+        "intake/readme.txt": b"not an image",
+    })
+    assert dict(iter_images(data)) == {"alice/1.jpg": b"alice 1", "bob/1.jpg": b"bob 1", "carol.jpg": b"carol"}
+
+
+def test_archive_without_wrapper_and_nested_folders():
+    data = archive({"alice.jpg": b"a", "year1/dave/2.jpg": b"d"})
+    assert sorted(key for key, _ in iter_images(data)) == ["alice.jpg", "dave/2.jpg"]
+
+
+def test_directory_source_uses_the_known_faces_layout(tmp_path):
+    (tmp_path / "erin").mkdir()
+    (tmp_path / "erin" / "1.jpg").write_bytes(b"e")
+    (tmp_path / "frank.png").write_bytes(b"f")
+    assert dict(iter_images(str(tmp_path))) == {"erin/1.jpg": b"e", "frank.png": b"f"}
+
+
+def test_safe_key_keeps_the_student_folder():
+    assert safe_key("Jo Ann/photo 1.jpg") == "Jo_Ann/photo_1.jpg"
+    assert safe_key("../../etc.jpg") == "etc.jpg"
+
+
+def test_run_enrollment_copies_and_stores_each_photo(tmp_path):
+    folder = tmp_path / "known_faces"
+    store = FaceStore(str(tmp_path / "cache"))
+    data = archive({
+        "intake/alice/1.jpg": b"alice 1",
+        "intake/bob/1.jpg": b"bob 1",
+        "intake/carol.jpg": b"carol",
+        "intake/dave.jpg": b"no face",
+        "intake/al ice.jpg": b"first",
+        "intake/al_ice.jpg": b"second",
+    })
+    job = run_enrollment(data, str(folder), store, embed_fn=stub_embed, prepare_fn=stub_prepare, batch_size=2)
+
+    assert job.status == "completed"
+    assert job.processed == 6
+    assert sorted(job.enrolled) == ["al_ice.jpg", "alice/1.jpg", "bob/1.jpg", "carol.jpg"]
+    assert sorted((f["file"], f["error"]) for f in job.failed) == [
+        ("al_ice.jpg", "another image in the intake has the same name"),
+        ("dave.jpg", "No face detected"),
+    ]
+    # Same-named photos of different students are kept apart, on disk and in the store
+    assert sorted(list_images(str(folder))) == ["al_ice.jpg", "alice/1.jpg", "bob/1.jpg", "carol.jpg"]
+    assert (folder / "alice" / "1.jpg").read_bytes() == b"alice 1"
+    assert sorted(FaceStore(str(tmp_path / "cache")).names) == sorted(job.enrolled)
+    assert np.allclose(store.as_dict()["bob/1.jpg"], stub_embedding(b"bob 1"))
+
+
+def test_enrolled_photos_are_unchanged_for_the_next_refresh(tmp_path):
+    folder = tmp_path / "known_faces"
+    store = FaceStore(str(tmp_path / "cache"))
+    run_enrollment(archive({"alice/1.jpg": b"a", "bob.jpg": b"b"}), str(folder), store,
+                   embed_fn=stub_embed, prepare_fn=stub_prepare)
+
+    def embed(path):
+        raise AssertionError(f"{path} was embedded again")
+
+    assert store.refresh(str(folder), embed)["unchanged"] == 2
+
+
+def test_commit_replaces_the_store_update(tmp_path):
+    committed = []
+    store = FaceStore(str(tmp_path / "cache"))
+    job = run_enrollment(archive({"alice.jpg": b"a"}), str(tmp_path / "known_faces"), store,
+                         embed_fn=stub_embed, prepare_fn=stub_prepare, commit=committed.extend)
+    assert job.status == "completed"
+    assert [key for key, _, _ in committed] == ["alice.jpg"]
+    assert len(store) == 0
+
+
+def test_unreadable_archive_fails_the_job(tmp_path):
+    job = run_enrollment(b"not a zip", str(tmp_path / "known_faces"), FaceStore(str(tmp_path / "cache")),
+                         embed_fn=stub_embed, prepare_fn=stub_prepare)
+    assert job.status == "failed"
+    assert job.failed[0]["file"] is None
+
+
+@pytest.fixture(autouse=True)
+def no_model(monkeypatch):
+    import model_registry
+
+    def deepface():
+        raise AssertionError("the face model must not be loaded")
+    monkeypatch.setattr(model_registry, "deepface", deepface)
@@ -0,0 +1,206 @@
+import numpy as np
+import pytest
+
+from face_index import BruteForceIndex, GalleryIndex, IVFIndex, QuantizedIndex, build_index, index_config_from_env
+
+
+def random_embeddings(n, dim=32, seed=0):
+    return np.random.default_rng(seed).normal(size=(n, dim)).astype(np.float32)
+
+
+def noisy(embedding, seed=1, scale=0.05):
+    return embedding + np.random.default_rng(seed).normal(scale=scale, size=embedding.shape).astype(np.float32)
+
+
+@pytest.fixture
+def roster():
+    return [f"student_{i}.jpg" for i in range(200)], random_embeddings(200)
+
+
+def test_brute_force_search_returns_nearest_first(roster):
+    names, embeddings = roster
+    index = BruteForceIndex(names, embeddings)
+    found = index.search(noisy(embeddings[17]), k=3)
+    assert found[0][0] == "student_17.jpg"
+    assert [d for _, d in found] == sorted(d for _, d in found)
+    assert index.search(embeddings[17])[0][1] == pytest.approx(0.0, abs=1e-5)
+
+
+@pytest.mark.parametrize("backend, params", [
+    ("ivf", {"nlist": 8, "nprobe": 8}),
+    ("quantized", {"dtype": "int8"}),
+    ("quantized", {"dtype": "float16"}),
+])
+def test_approximate_backends_agree_with_brute_force(roster, backend, params):
+    names, embeddings = roster
+    exact = BruteForceIndex(names, embeddings)
+    index = build_index(names, embeddings, backend=backend, **params)
+    queries = noisy(embeddings[:20])
+    for got, want in zip(index.search_many(queries, k=1), exact.search_many(queries, k=1)):
+        assert got[0][0] == want[0][0]
+        assert got[0][1] == pytest.approx(want[0][1], abs=1e-4)
+
+
+def test_ivf_nprobe_one_only_scores_the_closest_list(roster):
+    names, embeddings = roster
+    index = IVFIndex(names, embeddings, nlist=8, nprobe=1)
+    assert len(index.search(embeddings[5], k=len(names))) < len(names)
+
+
+@pytest.mark.parametrize("backend, params", [
+    ("brute", {}),
+    ("ivf", {"nlist": 8, "nprobe": 8}),
+    ("quantized", {"dtype": "int8"}),
+])
+def test_updated_adds_replaces_and_removes_in_a_copy(roster, backend, params):
+    names, embeddings = roster
+    index = build_index(names, embeddings, backend=backend, **params)
+    added = random_embeddings(5, seed=7)
+    new = index.updated(
+        ["new_0.jpg", "new_1.jpg", "new_2.jpg", "new_3.jpg", "student_3.jpg"], added,
+        remove=["student_10.jpg", "student_11.jpg"],
+    )
+    assert len(index) == 200
+    assert len(new) == 202
+    assert new.search(added[1])[0][0] == "new_1.jpg"
+    # Replaced rows answer with their new embedding, removed rows not at all
+    assert new.search(added[4])[0][0] == "student_3.jpg"
+    assert index.search(embeddings[3])[0][0] == "student_3.jpg"
+    assert "student_10.jpg" not in [name for name, _ in new.search(embeddings[10], k=len(new))]
+
+
+def test_quantized_index_reuses_its_file(tmp_path, roster):
+    names, embeddings = roster
+    first = QuantizedIndex(names, embeddings, path=str(tmp_path))
+    files = sorted(p.name for p in tmp_path.iterdir())
+    second = QuantizedIndex(names, embeddings, path=str(tmp_path))
+    assert sorted(p.name for p in tmp_path.iterdir()) == files
+    assert np.array_equal(np.asarray(first.codes), np.asarray(second.codes))
+    assert isinstance(second.codes, np.memmap)
+
+
+def test_quantized_index_rejects_unknown_dtype(roster):
+    with pytest.raises(ValueError):
+        QuantizedIndex(*roster, dtype="int4")
+
+
+def test_quantized_updated_keeps_reading_the_mapped_matrix(tmp_path, roster):
+    names, embeddings = roster
+    np.save(tmp_path / "store.npy", embeddings)
+    mapped = np.load(tmp_path / "store.npy", mmap_mode="r")
+    index = QuantizedIndex(names, mapped, path=str(tmp_path / "quantized"))
+    added = random_embeddings(3, seed=5)
+    new = index.updated(["new_0.jpg", "new_1.jpg", "student_4.jpg"], added, remove=["student_9.jpg"])
+    newer = new.updated(remove=["new_0.jpg"])
+    # Only the added rows are held in memory; kept rows are read in place
+    assert new.full is mapped and newer.full is mapped
+    assert new.extra.shape == (3, 32) and newer.extra.shape == (2, 32)
+    rebuilt = QuantizedIndex(newer.names, np.asarray(newer._full_rows(np.arange(len(newer)))))
+    queries = np.vstack([added, embeddings[:5]])
+    assert newer.search_many(queries, k=2) == rebuilt.search_many(queries, k=2)
+    assert newer.search(added[1])[0][0] == "new_1.jpg"
+
+
+@pytest.mark.parametrize("backend", ["brute", "ivf", "quantized"])
+def test_empty_index(backend):
+    index = build_index([], [], backend=backend)
+    assert index.search(random_embeddings(1)[0]) == []
+    assert index.search_many(random_embeddings(2)) == [[], []]
+    assert index.updated(["alice.jpg"], random_embeddings(1)).search(random_embeddings(1)[0])[0][0] == "alice.jpg"
+
+
+def test_unknown_backend_and_env_config(monkeypatch):
+    with pytest.raises(ValueError):
+        build_index([], [], backend="annoy")
+    monkeypatch.setenv("FACE_INDEX_BACKEND", "IVF")
+    monkeypatch.setenv("FACE_INDEX_NPROBE", "4")
+    assert index_config_from_env() == ("ivf", {"nprobe": 4})
+
+
+def gallery_roster():
+    """Three photos for each of 30 students, close to a per-student look."""
+    looks = random_embeddings(30, seed=3)
+    files, embeddings = [], []
+    for s, look in enumerate(looks):
+        for p in range(3):
+            files.append(f"student_{s}/{p}.jpg")
+            embeddings.append(noisy(look, seed=100 * s + p, scale=0.2))
+    return files, np.array(embeddings), looks
+
+
+@pytest.mark.parametrize("backend", ["brute", "ivf", "quantized"])
+def test_gallery_search_returns_students(backend):
+    files, embeddings, looks = gallery_roster()
+    index = GalleryIndex(files, embeddings, backend=backend, shortlist=4)
+    assert len(index) == 30
+    found = index.search_many(noisy(looks, seed=9, scale=0.1), k=2)
+    assert [hits[0][0] for hits in found] == [f"student_{s}" for s in range(30)]
+    assert all(len(hits) == 2 for hits in found)
+
+
+@pytest.mark.parametrize("backend", ["brute", "ivf", "quantized"])
+def test_gallery_updated_matches_a_rebuild(backend):
+    files, embeddings, looks = gallery_roster()
+    index = GalleryIndex(files, embeddings, backend=backend, shortlist=4)
+    added = random_embeddings(2, seed=11)
+    add_names = ["student_0/3.jpg", "newcomer.jpg"]
+    remove = ["student_1/0.jpg", "student_2/0.jpg", "student_2/1.jpg", "student_2/2.jpg"]
+    new = index.updated(add_names, added, remove=remove)
+
+    live = [i for i, f in enumerate(files) if f not in remove]
+    rebuilt = GalleryIndex(
+        [files[i] for i in live] + add_names, np.vstack([embeddings[live], added]), backend=backend, shortlist=4
+    )
+    assert sorted(new.names) == sorted(rebuilt.names)
+    assert "student_2" not in new.names
+    queries = np.vstack([looks, added])
+    for got, want in zip(new.search_many(queries, k=3), rebuilt.search_many(queries, k=3)):
+        assert [name for name, _ in got] == [name for name, _ in want]
+        assert [d for _, d in got] == pytest.approx([d for _, d in want], abs=1e-4)
+    # The original index still answers for the removed student
+    assert index.search(looks[2])[0][0] == "student_2"
+
+
+def test_gallery_with_one_photo_per_student_uses_them_as_templates(roster):
+    names, embeddings = roster
+    index = GalleryIndex(names, embeddings)
+    assert index.single
+    assert index.search(embeddings[42])[0][0] == "student_42"
+
+
+def test_gallery_empty_shortlist_is_no_match():
+    files, embeddings, looks = gallery_roster()
+    index = GalleryIndex(files, embeddings, backend="ivf", shortlist=4, nlist=30, nprobe=1)
+    # An IVF probe can land on an empty list; that is a miss, not an error
+    index.templates.offsets[:] = 0
+    assert index.search_many(looks[:3]) == [[], [], []]
+
+
+def test_empty_gallery():
+    index = GalleryIndex([], [])
+    assert len(index) == 0
+    assert index.search(random_embeddings(1)[0]) == []
+    grown = index.updated(["alice.jpg"], random_embeddings(1))
+    assert grown.names == ["alice"]
+
+
+def test_single_photo_gallery_reranks_from_the_mapped_matrix(tmp_path):
+    # File order differs from student order ("a-b.jpg" sorts before "a.jpg"),
+    # and the None row is another shard's student
+    files = ["a-b.jpg", "a.jpg", None, "c.jpg"] + [f"s{i}.jpg" for i in range(40)]
+    embeddings = random_embeddings(len(files), seed=4)
+    np.save(tmp_path / "store.npy", embeddings)
+    mapped = np.load(tmp_path / "store.npy", mmap_mode="r")
+    index = GalleryIndex(files, mapped, backend="quantized")
+    assert index.single and index.names[:3] == ["a", "a-b", "c"]
+    assert index.templates.full is mapped
+    assert index.search(embeddings[0])[0][0] == "a-b"
+    # The unindexed row is no one's photo
+    assert len(index) == len(files) - 1
+    assert index.search(embeddings[2])[0][1] > 0.5
+
+    added = random_embeddings(1, seed=6)
+    new = index.updated(["d.jpg"], added, remove=["c.jpg"])
+    assert new.templates.full is mapped and new.matrix is mapped
+    assert new.search(added[0])[0][0] == "d"
+    assert "c" not in new.names
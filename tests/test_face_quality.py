@@ -0,0 +1,114 @@
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+import pytest
+
+import face_recognition_utils
+from enrollment import prepare_image
+from face_quality import (
+    DECODE_FAILED, FACE_TOO_SMALL, NO_FACE, TOO_BLURRY, TOO_BRIGHT, TOO_DARK, FaceRejected, QualityGate,
+)
+
+
+def crop(brightness=128, sharp=True, size=64):
+    """A flat grey face crop; ``sharp`` adds noise so the Laplacian has edges."""
+    image = np.full((size, size, 3), brightness, dtype=np.int16)
+    if sharp:
+        image += np.random.default_rng(0).integers(-8, 9, image.shape, dtype=np.int16)
+    return image.clip(0, 255).astype(np.uint8)
+
+
+def face(x=0, w=64, h=64, img=None):
+    return SimpleNamespace(facial_area=SimpleNamespace(x=x, y=0, w=w, h=h), img=crop() if img is None else img)
+
+
+def stub_detect(gate, faces, scale=1):
+    def detect(image):
+        if image is None:
+            raise FaceRejected(DECODE_FAILED)
+        return faces, scale
+    gate._detect = detect
+    return gate
+
+
+def jpeg(image):
+    return cv2.imencode(".jpg", image)[1].tobytes()
+
+
+def test_check_returns_the_largest_face():
+    large = face(x=100, w=80, h=80)
+    gate = stub_detect(QualityGate(), [face(w=50, h=50), large], scale=0.5)
+    image, quality = gate.check(np.zeros((10, 10, 3), dtype=np.uint8))
+    assert image is large.img
+    assert quality["face_size"] == 80
+    assert quality["box"] == [200, 0, 160, 160]
+    assert {"sharpness", "brightness"} <= set(quality)
+
+
+@pytest.mark.parametrize("detected, reason", [
+    (face(w=20, h=64), FACE_TOO_SMALL),
+    (face(img=crop(brightness=10)), TOO_DARK),
+    (face(img=crop(brightness=250, sharp=False)), TOO_BRIGHT),
+    (face(img=crop(sharp=False)), TOO_BLURRY),
+    (face(img=np.zeros((0, 0, 3), dtype=np.uint8)), NO_FACE),
+])
+def test_rejections_carry_their_reason(detected, reason):
+    gate = stub_detect(QualityGate(), [detected])
+    with pytest.raises(FaceRejected) as raised:
+        gate.check(np.zeros((10, 10, 3), dtype=np.uint8))
+    assert raised.value.reason == reason
+
+
+def test_dark_or_undecodable_frames_skip_detection():
+    gate = QualityGate()
+    with pytest.raises(FaceRejected) as raised:
+        gate._detect(np.zeros((100, 100, 3), dtype=np.uint8))
+    assert raised.value.reason == TOO_DARK
+    with pytest.raises(FaceRejected) as raised:
+        gate._detect(None)
+    assert raised.value.reason == DECODE_FAILED
+
+
+def test_check_all_gates_every_face_left_to_right():
+    gate = stub_detect(QualityGate(), [face(x=200), face(x=0, w=20), face(x=100)])
+    outcomes = gate.check_all(np.zeros((10, 10, 3), dtype=np.uint8))
+    assert isinstance(outcomes[0], FaceRejected) and outcomes[0].reason == FACE_TOO_SMALL
+    assert [quality["box"][0] for _, quality in outcomes[1:]] == [100, 200]
+
+
+def test_from_env(monkeypatch):
+    monkeypatch.setenv("FACE_MIN_SIZE", "96")
+    monkeypatch.setenv("FACE_DETECT_MAX_SIDE", "640")
+    gate = QualityGate.from_env()
+    assert (gate.min_face_size, gate.max_side, gate.min_sharpness) == (96, 640, 25.0)
+
+
+def test_every_store_writer_applies_the_gate(tmp_path, monkeypatch):
+    embedded = []
+
+    def embed_crops(crops, model_name):
+        embedded.extend(crops)
+        return np.ones((len(crops), 4), dtype=np.float32)
+
+    monkeypatch.setattr(face_recognition_utils, "embed_crops", embed_crops)
+    photo = tmp_path / "alice.jpg"
+    photo.write_bytes(jpeg(crop()))
+    accepted = face()
+    gate = stub_detect(QualityGate(), [accepted])
+
+    # Bulk enrollment crops through the gate; refresh and single enrollment embed through it
+    assert prepare_image(photo.read_bytes(), gate) is accepted.img
+    face_recognition_utils.embed_file(str(photo), gate=gate)
+    face_recognition_utils.embed_face(photo.read_bytes(), gate=gate)
+    assert all(image is accepted.img for image in embedded) and len(embedded) == 2
+
+    small = stub_detect(QualityGate(), [face(w=20)])
+    for write in (prepare_image, face_recognition_utils.embed_face):
+        with pytest.raises(FaceRejected):
+            write(photo.read_bytes(), gate=small)
+    with pytest.raises(FaceRejected):
+        face_recognition_utils.embed_file(str(photo), gate=small)
+    with pytest.raises(FaceRejected) as raised:
+        prepare_image(b"not an image", gate)
+    assert raised.value.reason == DECODE_FAILED
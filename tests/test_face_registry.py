@@ -0,0 +1,135 @@
+import os
+
+import numpy as np
+import pytest
+
+from face_registry import FaceRegistry, folder_signature
+from tests.test_face_store import StubEmbedder, stub_embedding
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "known_faces"
+    folder.mkdir()
+    (folder / "alice.jpg").write_bytes(b"alice")
+    (folder / "bob.jpg").write_bytes(b"bob")
+    (folder / "carol").mkdir()
+    (folder / "carol" / "1.jpg").write_bytes(b"carol 1")
+    return folder
+
+
+@pytest.fixture
+def registry(tmp_path, folder, monkeypatch):
+    for name in ("FACE_INDEX_BACKEND", "FACE_SHARD_NAME", "FACE_SHARD_NODES"):
+        monkeypatch.delenv(name, raising=False)
+    registry = FaceRegistry(str(folder), cache_dir=str(tmp_path / "cache"))
+    registry.refresh(StubEmbedder())
+    return registry
+
+
+def best(snapshot, data):
+    return snapshot.index.search(stub_embedding(data))[0][0]
+
+
+def test_refresh_publishes_a_new_version(registry, folder):
+    first = registry.snapshot()
+    assert first.version == 1
+    assert sorted(first.index.names) == ["alice", "bob", "carol"]
+    assert best(first, b"carol 1") == "carol"
+
+    embed = StubEmbedder()
+    registry.refresh(embed)
+    assert registry.snapshot() is first
+    assert embed.calls == []
+
+    (folder / "dave.jpg").write_bytes(b"dave")
+    (folder / "bob.jpg").unlink()
+    registry.refresh(StubEmbedder())
+    assert registry.snapshot().version == 2
+    assert sorted(registry.snapshot().index.names) == ["alice", "carol", "dave"]
+    # Readers holding the old snapshot keep a consistent view
+    assert sorted(first.index.names) == ["alice", "bob", "carol"]
+
+
+def test_cached_roster_is_served_before_the_first_refresh(registry, tmp_path, folder):
+    reopened = FaceRegistry(str(folder), cache_dir=str(tmp_path / "cache"))
+    assert reopened.snapshot().version == 0
+    assert sorted(reopened.snapshot().index.names) == ["alice", "bob", "carol"]
+
+
+def test_enroll_replaces_a_photo_under_another_extension(registry, folder):
+    snapshot = registry.enroll("alice.png", b"alice, new", stub_embedding(b"alice, new"))
+    assert snapshot.version == 2
+    assert not (folder / "alice.jpg").exists()
+    assert (folder / "alice.png").read_bytes() == b"alice, new"
+    assert "alice.jpg" not in registry.store.names
+    assert best(snapshot, b"alice, new") == "alice"
+    with pytest.raises(ValueError):
+        registry.enroll("alice.gif", b"gif", stub_embedding(b"gif"))
+
+
+def test_add_photo_keeps_the_latest_check_in_photos(registry, folder):
+    for i in range(4):
+        registry.add_photo("carol", f"checkin_{i}.jpg", b"c%d" % i, stub_embedding(b"c%d" % i),
+                           keep_latest=2, prefix="checkin_")
+    assert registry.photos("carol") == ["carol/1.jpg", "carol/checkin_2.jpg", "carol/checkin_3.jpg"]
+    assert sorted(os.listdir(folder / "carol")) == ["1.jpg", "checkin_2.jpg", "checkin_3.jpg"]
+    assert best(registry.snapshot(), b"c3") == "carol"
+
+
+def test_remove_deletes_every_photo(registry, folder):
+    registry.add_photo("alice", "2.jpg", b"alice 2", stub_embedding(b"alice 2"))
+    assert registry.identity_for("alice.jpg") == "alice"
+    snapshot = registry.remove("alice")
+    assert "alice" not in snapshot.index.names
+    assert not (folder / "alice.jpg").exists() and not (folder / "alice").exists()
+    assert registry.remove("alice") is None
+    assert not registry.contains("alice")
+    assert registry.contains("carol")
+
+
+def test_upsert_photos_publishes_once(registry, folder):
+    (folder / "erin.jpg").write_bytes(b"erin")
+    (folder / "frank").mkdir()
+    (folder / "frank" / "1.jpg").write_bytes(b"frank")
+    snapshot = registry.upsert_photos([
+        ("erin.jpg", "0" * 40, stub_embedding(b"erin")),
+        ("frank/1.jpg", "1" * 40, stub_embedding(b"frank")),
+    ])
+    assert snapshot.version == 2
+    assert best(snapshot, b"frank") == "frank"
+    assert registry.upsert_photos([]) is snapshot
+
+
+def test_folder_signature_tracks_changes(folder, tmp_path):
+    signature = folder_signature(str(folder))
+    assert folder_signature(str(folder)) == signature
+    (folder / "carol" / "2.jpg").write_bytes(b"carol 2")
+    assert folder_signature(str(folder)) != signature
+    assert folder_signature(str(tmp_path / "missing")) == ()
+
+
+def test_compaction_rebuilds_from_the_mapped_store(registry, monkeypatch):
+    from face_index import GalleryIndex
+
+    # Added photos are held in memory up to max(COMPACT_ROWS, stored rows), 3 here
+    monkeypatch.setattr(GalleryIndex, "COMPACT_ROWS", 2)
+    for i in range(3):
+        registry.add_photo("alice", f"{i}.jpg", b"a%d" % i, stub_embedding(b"a%d" % i))
+    assert len(registry.snapshot().index.extra) == 3
+    snapshot = registry.add_photo("bob", "2.jpg", b"bob 2", stub_embedding(b"bob 2"))
+    # Rebuilt over the saved store rather than an in-memory copy of it
+    assert len(snapshot.index.extra) == 0
+    assert isinstance(snapshot.index.matrix, np.memmap)
+    assert best(snapshot, b"bob 2") == "bob"
+
+
+def test_other_shards_rows_are_left_out_without_copying(tmp_path, folder):
+    from face_recognition_utils import index_from_store
+    from face_store import FaceStore
+
+    store = FaceStore(str(tmp_path / "shared"))
+    store.refresh(str(folder), StubEmbedder())
+    index = index_from_store(store, "quantized", membership=lambda student: student != "bob")
+    assert sorted(index.names) == ["alice", "carol"]
+    assert index.matrix is store.matrix
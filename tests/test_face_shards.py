@@ -0,0 +1,155 @@
+import asyncio
+import os
+from collections import Counter
+
+import pytest
+
+from enrollment import run_enrollment
+from face_registry import FaceRegistry, NotOnShard
+from face_shards import HashRing, ShardMembership, ShardUnavailable
+from tests.test_enrollment import archive, stub_embed, stub_prepare
+from tests.test_face_store import StubEmbedder, stub_embedding
+
+STUDENTS = [f"student_{i}" for i in range(3000)]
+
+
+def test_ring_is_deterministic_and_balanced():
+    ring = HashRing(["a", "b", "c"])
+    owners = [ring.node_for(s) for s in STUDENTS]
+    assert owners == [HashRing(["c", "b", "a", "a"]).node_for(s) for s in STUDENTS]
+    counts = Counter(owners)
+    assert set(counts) == {"a", "b", "c"}
+    assert min(counts.values()) > 0.2 * len(STUDENTS)
+
+
+def test_adding_a_node_only_moves_students_to_it():
+    before = HashRing(["a", "b", "c"])
+    after = HashRing(["a", "b", "c", "d"])
+    moved = [s for s in STUDENTS if before.node_for(s) != after.node_for(s)]
+    assert moved
+    assert all(after.node_for(s) == "d" for s in moved)
+    assert len(moved) < 0.4 * len(STUDENTS)
+
+
+def test_membership_partitions_students():
+    ring = HashRing(["a", "b"])
+    shards = [ShardMembership(ring, "a"), ShardMembership(ring, "b")]
+    assert all(sum(member(s) for member in shards) == 1 for s in STUDENTS)
+
+
+def test_empty_ring():
+    with pytest.raises(ValueError):
+        HashRing([]).node_for("alice")
+
+
+def owned_and_foreign(shard="a", nodes=("a", "b")):
+    """A student ``shard`` owns and one it does not."""
+    ring = HashRing(nodes)
+    owned = next(s for s in STUDENTS if ring.node_for(s) == shard)
+    foreign = next(s for s in STUDENTS if ring.node_for(s) != shard)
+    return owned, foreign
+
+
+@pytest.fixture
+def shard_registry(tmp_path, monkeypatch):
+    """An empty registry running as shard "a" of "a,b"."""
+    monkeypatch.delenv("FACE_INDEX_BACKEND", raising=False)
+    monkeypatch.setenv("FACE_SHARD_NODES", "a,b")
+    monkeypatch.setenv("FACE_SHARD_NAME", "a")
+    folder = tmp_path / "known_faces"
+    folder.mkdir()
+    registry = FaceRegistry(str(folder), cache_dir=str(tmp_path / "cache"))
+    registry.refresh(StubEmbedder())
+    return registry
+
+
+def test_registry_refuses_students_of_other_shards(shard_registry):
+    owned, foreign = owned_and_foreign()
+    shard_registry.enroll(f"{owned}.jpg", b"owned", stub_embedding(b"owned"))
+    with pytest.raises(NotOnShard):
+        shard_registry.enroll(f"{foreign}.jpg", b"foreign", stub_embedding(b"foreign"))
+    with pytest.raises(NotOnShard):
+        shard_registry.add_photo(foreign, "2.jpg", b"foreign 2", stub_embedding(b"foreign 2"))
+    assert os.listdir(shard_registry.folder_path) == [f"{owned}.jpg"]
+
+    # Bulk rows of other shards' students are dropped
+    snapshot = shard_registry.upsert_photos([
+        (f"{owned}/2.jpg", "0" * 40, stub_embedding(b"owned 2")),
+        (f"{foreign}/1.jpg", "1" * 40, stub_embedding(b"foreign 1")),
+    ])
+    assert list(snapshot.index.names) == [owned]
+    assert shard_registry.photos(owned) == [f"{owned}.jpg", f"{owned}/2.jpg"]
+    assert not shard_registry.contains(foreign)
+
+
+def test_bulk_enrollment_skips_students_of_other_shards(shard_registry):
+    owned, foreign = owned_and_foreign()
+    job = run_enrollment(archive({f"{owned}.jpg": b"o", f"{foreign}.jpg": b"f"}), shard_registry.folder_path,
+                         shard_registry.store, embed_fn=stub_embed, prepare_fn=stub_prepare,
+                         commit=shard_registry.upsert_photos, include=shard_registry.owns)
+    assert job.enrolled == [f"{owned}.jpg"]
+    assert job.failed == [{"file": f"{foreign}.jpg", "error": "the student belongs to another shard"}]
+    assert os.listdir(shard_registry.folder_path) == [f"{owned}.jpg"]
+    assert list(shard_registry.snapshot().index.names) == [owned]
+
+
+class StubCoordinator:
+    """Answers ``roster()`` with ``names``, or fails like unreachable shards when None."""
+
+    shards = {"north": ["http://north"], "south": ["http://south"]}
+    version = (("north", 1), ("south", 1))
+
+    def __init__(self, names):
+        self.names = names
+
+    async def roster(self):
+        if self.names is None:
+            raise ShardUnavailable("No shard answered (north, south)")
+        return self.names, {"north": len(self.names) - 1, "south": 1}, []
+
+
+@pytest.fixture
+def coordinator(app_server, monkeypatch):
+    """``coordinator(names)`` turns the app into a coordinator with no local registry."""
+    monkeypatch.setattr(app_server, "face_registry", None)
+
+    def use(names):
+        monkeypatch.setattr(app_server, "shard_coordinator", StubCoordinator(names))
+        monkeypatch.setattr(app_server, "roster_lookup", (None, None))
+        monkeypatch.setattr(app_server, "shard_roster_fetch", [0.0, asyncio.Lock()])
+        app_server.stats_cache.clear()
+    yield use
+    app_server.stats_cache.clear()
+
+
+def test_coordinator_refuses_enrollment_writes(coordinator, api):
+    coordinator(["alice", "bob"])
+    photo = {"file": ("alice.jpg", b"alice")}
+
+    async def writes():
+        async with api() as client:
+            return [
+                await client.post("/api/known-faces", data={"name": "alice"}, files=photo),
+                await client.put("/api/known-faces/alice", files=photo),
+                await client.post("/api/known-faces/alice/photos", files=photo),
+                await client.delete("/api/known-faces/alice"),
+                await client.post("/api/enrollment/bulk", files={"file": ("intake.zip", b"zip")}),
+            ]
+
+    responses = asyncio.run(writes())
+    assert [response.status_code for response in responses] == [409] * 5
+    assert "shard" in responses[0].json()["detail"]
+
+
+def test_coordinator_stats_count_the_shards_roster(coordinator, api):
+    async def stats():
+        async with api() as client:
+            return await client.get("/api/attendance/stats")
+
+    coordinator(["alice", "bob", "carol"])
+    response = asyncio.run(stats())
+    assert response.status_code == 200
+    assert response.json()["total_students"] == 3
+
+    coordinator(None)
+    assert asyncio.run(stats()).status_code == 503
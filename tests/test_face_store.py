@@ -0,0 +1,123 @@
+import hashlib
+
+import numpy as np
+import pytest
+
+from face_store import FaceStore, identity_of, list_images
+
+
+def stub_embedding(data, dim=8):
+    """Deterministic stand-in for the face model: a vector derived from the bytes."""
+    seed = int.from_bytes(hashlib.sha1(data).digest()[:4], "big")
+    return np.random.default_rng(seed).normal(size=dim).astype(np.float32)
+
+
+class StubEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, filepath):
+        self.calls.append(filepath)
+        with open(filepath, "rb") as fh:
+            data = fh.read()
+        if data == b"no face":
+            raise ValueError("No face detected")
+        return stub_embedding(data)
+
+
+@pytest.fixture
+def folder(tmp_path):
+    folder = tmp_path / "known_faces"
+    folder.mkdir()
+    (folder / "alice.jpg").write_bytes(b"alice")
+    (folder / "bob.png").write_bytes(b"bob")
+    (folder / "carol").mkdir()
+    (folder / "carol" / "1.jpg").write_bytes(b"carol 1")
+    (folder / "carol" / "2.jpg").write_bytes(b"carol 2")
+    (folder / "notes.txt").write_bytes(b"not an image")
+    (folder / ".hidden.jpg").write_bytes(b"hidden")
+    return folder
+
+
+def test_list_images_and_identities(folder):
+    assert sorted(list_images(str(folder))) == ["alice.jpg", "bob.png", "carol/1.jpg", "carol/2.jpg"]
+    assert identity_of("carol/1.jpg") == "carol"
+    assert identity_of("alice.jpg") == "alice"
+
+
+def test_refresh_only_embeds_new_and_changed_files(tmp_path, folder):
+    store = FaceStore(str(tmp_path / "cache"))
+    embed = StubEmbedder()
+    summary = store.refresh(str(folder), embed)
+    assert sorted(summary["added"]) == ["alice.jpg", "bob.png", "carol/1.jpg", "carol/2.jpg"]
+    assert len(embed.calls) == 4
+
+    (folder / "bob.png").write_bytes(b"bob, new photo")
+    (folder / "carol" / "2.jpg").unlink()
+    (folder / "dave.jpg").write_bytes(b"dave")
+    embed = StubEmbedder()
+    summary = store.refresh(str(folder), embed)
+    assert summary == {"added": ["dave.jpg"], "updated": ["bob.png"], "removed": ["carol/2.jpg"],
+                       "unchanged": 2, "failed": []}
+    assert sorted(embed.calls) == sorted([str(folder / "bob.png"), str(folder / "dave.jpg")])
+    assert np.allclose(store.as_dict()["bob.png"], stub_embedding(b"bob, new photo"))
+
+
+def test_unchanged_folder_embeds_nothing_and_does_not_rewrite(tmp_path, folder):
+    store = FaceStore(str(tmp_path / "cache"))
+    store.refresh(str(folder), StubEmbedder())
+    written = (tmp_path / "cache" / f"{store.stem}.npy").stat().st_mtime_ns
+    embed = StubEmbedder()
+    assert store.refresh(str(folder), embed)["unchanged"] == 4
+    assert embed.calls == []
+    assert (tmp_path / "cache" / f"{store.stem}.npy").stat().st_mtime_ns == written
+
+
+def test_failed_images_are_reported_and_retried(tmp_path, folder):
+    (folder / "erin.jpg").write_bytes(b"no face")
+    store = FaceStore(str(tmp_path / "cache"))
+    assert store.refresh(str(folder), StubEmbedder())["failed"] == ["erin.jpg"]
+    assert "erin.jpg" not in store.names
+    embed = StubEmbedder()
+    store.refresh(str(folder), embed)
+    assert embed.calls == [str(folder / "erin.jpg")]
+
+
+def test_reload_reflects_the_saved_state(tmp_path, folder):
+    cache = str(tmp_path / "cache")
+    store = FaceStore(cache)
+    store.refresh(str(folder), StubEmbedder())
+    reopened = FaceStore(cache)
+    assert reopened.names == store.names
+    assert isinstance(reopened.matrix, np.memmap)
+    assert np.array_equal(np.asarray(reopened.matrix), np.asarray(store.matrix))
+
+    store.upsert([("erin.jpg", "0" * 40, stub_embedding(b"erin"))])
+    store.remove(["alice.jpg"])
+    store.save()
+    reopened.load()
+    assert reopened.names == store.names
+    assert "alice.jpg" not in reopened.names
+    assert np.allclose(reopened.as_dict()["erin.jpg"], stub_embedding(b"erin"))
+
+
+def test_stores_are_separate_per_model_and_shard(tmp_path, folder):
+    cache = str(tmp_path / "cache")
+    FaceStore(cache).refresh(str(folder), StubEmbedder())
+    assert len(FaceStore(cache, model_name="ArcFace")) == 0
+    assert len(FaceStore(cache, shard="node-b")) == 0
+    assert len(FaceStore(cache)) == 4
+
+
+def test_unreadable_index_is_ignored(tmp_path, folder):
+    cache = tmp_path / "cache"
+    store = FaceStore(str(cache))
+    store.refresh(str(folder), StubEmbedder())
+    (cache / f"{store.stem}.json").write_text("{not json")
+    assert len(FaceStore(str(cache))) == 0
+
+
+def test_include_keeps_only_a_shards_students(tmp_path, folder):
+    store = FaceStore(str(tmp_path / "cache"), shard="a")
+    store.refresh(str(folder), StubEmbedder(), include=lambda student: student in {"alice", "carol"})
+    assert sorted(store.names) == ["alice.jpg", "carol/1.jpg", "carol/2.jpg"]
@@ -0,0 +1,77 @@
+import time
+
+import cv2
+import numpy as np
+
+from identity_cache import IdentityCache, hamming, perceptual_hash
+
+
+def face(seed):
+    """A smooth random 'face': different seeds give unrelated hashes."""
+    rng = np.random.default_rng(seed)
+    return cv2.resize(rng.integers(0, 256, (8, 8, 3), dtype=np.uint8), (96, 96), interpolation=cv2.INTER_CUBIC)
+
+
+def test_hash_survives_recompression_but_not_another_face():
+    crop = face(1)
+    recompressed = cv2.imdecode(cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, 60])[1], cv2.IMREAD_COLOR)
+    brighter = cv2.convertScaleAbs(crop, alpha=1.0, beta=20)
+    assert hamming(perceptual_hash(crop), perceptual_hash(recompressed)) <= 5
+    assert hamming(perceptual_hash(crop), perceptual_hash(brighter)) <= 5
+    assert hamming(perceptual_hash(crop), perceptual_hash(face(2))) > 10
+
+
+def test_near_duplicates_hit_and_other_faces_miss():
+    cache = IdentityCache(max_distance=2)
+    cache.store(0b1111, {"name": "alice"})
+    assert cache.lookup(0b1110) == {"name": "alice"}
+    assert cache.lookup(0b1111_0000_0000) is None
+    assert cache.stats() == {"hits": 1, "track_hits": 0, "misses": 1, "hit_rate": 0.5, "size": 1}
+
+
+def test_the_nearest_cached_face_wins():
+    cache = IdentityCache(max_distance=3)
+    cache.store(0b0111, "alice")
+    cache.store(0b1110_0000, "bob")
+    assert cache.lookup(0b0011) == "alice"
+    assert cache.lookup(0b1100_0000) == "bob"
+
+
+def test_a_roster_change_invalidates_results():
+    cache = IdentityCache()
+    cache.store(42, "alice", version=1)
+    assert cache.lookup(42, version=2) is None
+    assert cache.lookup(42, version=1) == "alice"
+
+
+def test_a_track_tolerates_more_drift():
+    cache = IdentityCache(max_distance=1, track_distance=6)
+    cache.store(0, "alice", track_id=7)
+    drifted = 0b11111
+    assert cache.lookup(drifted) is None
+    assert cache.lookup(drifted, track_id=7) == "alice"
+    assert cache.lookup(drifted, track_id=8) is None
+    assert cache.track_hits == 1
+
+
+def test_entries_expire_and_are_evicted_least_recently_used_first():
+    cache = IdentityCache(maxsize=2, ttl_s=0.05, max_distance=0)
+    cache.store(1, "alice")
+    time.sleep(0.1)
+    assert cache.lookup(1) is None
+
+    cache = IdentityCache(maxsize=2, max_distance=0)
+    cache.store(1, "alice")
+    cache.store(2, "bob")
+    assert cache.lookup(1) == "alice"
+    cache.store(3, "carol")
+    assert cache.lookup(2) is None
+    assert cache.lookup(1) == "alice"
+
+
+def test_disabled_cache_never_answers(monkeypatch):
+    monkeypatch.setenv("IDENTITY_CACHE_SIZE", "0")
+    cache = IdentityCache.from_env()
+    cache.store(1, "alice")
+    assert cache.lookup(1) is None
+    assert cache.stats()["size"] == 0
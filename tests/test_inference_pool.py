@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from inference_pool import InferencePool, PoolSaturated
+
+
+def thread_pool(workers=1, queue_size=1):
+    return InferencePool("face", ThreadPoolExecutor(max_workers=workers), workers, queue_size)
+
+
+def test_run_returns_result_and_timings():
+    pool = thread_pool()
+    result, timings = asyncio.run(pool.run(pow, 2, 10))
+    assert result == 1024
+    assert set(timings) == {"queue_ms", "compute_ms"}
+    assert pool.in_flight == 0
+    pool.shutdown()
+
+
+def test_full_pool_rejects_instead_of_queueing():
+    pool = thread_pool(workers=1, queue_size=1)
+    release = threading.Event()
+
+    async def run():
+        running = [asyncio.create_task(pool.run(release.wait)) for _ in range(2)]
+        await asyncio.sleep(0.05)
+        assert pool.stats() == {"workers": 1, "capacity": 2, "in_flight": 2, "queued": 1}
+        with pytest.raises(PoolSaturated) as raised:
+            await pool.run(release.wait)
+        release.set()
+        await asyncio.gather(*running)
+        return raised.value
+
+    error = asyncio.run(run())
+    assert (error.name, error.capacity) == ("face", 2)
+    assert pool.in_flight == 0
+    pool.shutdown()
+
+
+def test_failures_free_their_slot():
+    pool = thread_pool()
+
+    async def run():
+        with pytest.raises(ZeroDivisionError):
+            await pool.run(divmod, 1, 0)
+        return pool.in_flight
+
+    assert asyncio.run(run()) == 0
+    pool.shutdown()
+
+
+@pytest.mark.parametrize("route, stage", [
+    ("/api/face-recognition", "recognize_frame"),
+    ("/api/ocr/id-card", "read_id_card"),
+])
+def test_saturated_pool_answers_503(api, app_server, monkeypatch, route, stage):
+    async def saturated(*args, **kwargs):
+        raise PoolSaturated("face", 5)
+
+    monkeypatch.setattr(app_server, stage, saturated)
+
+    async def run():
+        async with api() as client:
+            return await client.post(route, files={"file": ("frame.jpg", b"jpeg bytes")})
+
+    response = asyncio.run(run())
+    assert response.status_code == 503
+    assert response.json()["detail"] == "face pool is saturated (5 requests in flight)"
@@ -0,0 +1,53 @@
+"""Concurrent recognitions must each answer for their own upload.
+
+Runs the FastAPI app with the real face model (one face worker) on a copy
+of ``backend/known_faces``, so it is skipped where DeepFace is missing.
+"""
+import os
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+pytest.importorskip("deepface")
+
+
+@pytest.fixture(scope="module")
+def client(server):
+    from fastapi.testclient import TestClient
+    from bench_suite import standin_database
+
+    standin_database(server)
+    with TestClient(server.app) as client:
+        deadline = time.monotonic() + 600
+        while client.get("/api/ready").status_code != 200:
+            assert time.monotonic() < deadline, "face services did not become ready"
+            time.sleep(0.5)
+        yield client
+
+
+def test_concurrent_recognitions_answer_their_own_image(server, client):
+    # Photos where no face was detected are never enrolled
+    enrolled = set(client.get("/api/known-faces-count").json()["faces"])
+    uploads = []
+    for filename in sorted(os.listdir(server.KNOWN_FACES_DIR)):
+        if filename.split(".")[0] not in enrolled:
+            continue
+        with open(os.path.join(server.KNOWN_FACES_DIR, filename), "rb") as fh:
+            uploads.append((filename.split(".")[0], fh.read()))
+    assert len(uploads) > 1
+    jobs = uploads * 3
+    random.Random(0).shuffle(jobs)
+
+    def recognize(job):
+        student, data = job
+        response = client.post("/api/face-recognition", files={"file": (f"{student}.jpg", data)})
+        return student, response.status_code, response.json()
+
+    with ThreadPoolExecutor(max_workers=16) as pool:
+        results = list(pool.map(recognize, jobs))
+
+    assert [status for _, status, _ in results] == [200] * len(jobs)
+    assert [(student, body.get("name")) for student, _, body in results] == \
+        [(student, student) for student, _, _ in results]
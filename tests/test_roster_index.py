@@ -0,0 +1,40 @@
+from roster_index import RosterIndex, levenshtein, normalize_name
+
+ROSTER = ["Musmirathu_Saima", "Sehreen_Taj", "Risha_Gowda", "Suhas_Gowda", "VinayakaPM", "Abhinaya"]
+
+
+def test_normalize_name():
+    assert normalize_name("Musmirathu_Saima") == "MUSMIRATHU SAIMA"
+    assert normalize_name("  o'neil-2 ") == "O NEIL"
+
+
+def test_levenshtein_with_cutoff():
+    assert levenshtein("KITTEN", "SITTING") == 3
+    assert levenshtein("KITTEN", "SITTING", max_distance=1) == 2
+    assert levenshtein("", "ABC") == 3
+
+
+def test_match_absorbs_ocr_slips():
+    index = RosterIndex(ROSTER)
+    assert len(index) == 6
+    assert index.match("MUSMIRATHU SAIMA") == {"name": "Musmirathu_Saima", "distance": 0}
+    assert index.match("MUSMlRATHU SAlMA") == {"name": "Musmirathu_Saima", "distance": 2}
+    assert index.match("Sehreen Taj.") == {"name": "Sehreen_Taj", "distance": 0}
+
+
+def test_initials_printed_on_the_card_are_ignored():
+    assert RosterIndex(ROSTER).match("ABHINAYA S")["name"] == "Abhinaya"
+
+
+def test_close_names_keep_their_own_entry():
+    index = RosterIndex(ROSTER)
+    assert index.match("RISHA GOWDA")["name"] == "Risha_Gowda"
+    assert index.match("SUHAS GOWDA")["name"] == "Suhas_Gowda"
+    assert [key for _, key in index.search("RISHA GOWDA", 2)] == ["RISHA GOWDA"]
+
+
+def test_no_match():
+    index = RosterIndex(ROSTER)
+    assert index.match("COMPLETELY DIFFERENT") is None
+    assert index.match("") is None
+    assert index.match(None) is None